@@ -1,12 +1,15 @@
-"""Агрегаты (упрощённо, считаем в БД выборкой)."""
+"""Агрегаты (читаем из инкрементальной сводки request_stats)."""
+
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.infrastructure.cache.redis_client import get_cache
 from app.infrastructure.db.repositories.requests_repo import RequestsRepo
+from app.infrastructure.db.repositories.stats_repo import StatsRepo
 from app.infrastructure.db.session import get_session
-from app.infrastructure.db.tables import PublicationDB
 
 router = APIRouter()
 
@@ -16,7 +19,50 @@ async def analytics_summary(
     request_id: str = Query(...),
     session: AsyncSession = Depends(get_session),
 ) -> dict:
-    """Вернуть компактные агрегаты по публикациям."""
+    """Вернуть компактные агрегаты по публикациям (источники, языки, тональность)."""
+
+    async def load() -> tuple[dict, Optional[str]]:
+        status = await _request_status(request_id, session)
+        return await StatsRepo(session).summary(request_id), status
+
+    return await get_cache().cached(request_id, "summary", None, load)
+
+
+@router.get("/analytics/timeseries")
+async def analytics_timeseries(
+    request_id: str = Query(...),
+    bucket: Literal["hour", "day", "week"] = "day",
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Вернуть число публикаций по временным корзинам с разбивкой по источникам и тональности."""
+
+    async def load() -> tuple[dict, Optional[str]]:
+        status = await _request_status(request_id, session)
+        items = await StatsRepo(session).timeseries(request_id, bucket)
+        return {"request_id": request_id, "bucket": bucket, "items": items}, status
+
+    return await get_cache().cached(request_id, "timeseries", {"bucket": bucket}, load)
+
+
+@router.get("/analytics/entities")
+async def analytics_entities(
+    request_id: str = Query(...),
+    top: int = Query(20, ge=1, le=200),
+    session: AsyncSession = Depends(get_session),
+) -> dict:
+    """Вернуть самые частые сущности и пары сущностей, встречающиеся вместе."""
+
+    async def load() -> tuple[dict, Optional[str]]:
+        status = await _request_status(request_id, session)
+        stats = await StatsRepo(session).entities(request_id, top, settings.entities_max_per_doc)
+        return {"request_id": request_id, **stats}, status
+
+    # для READY-заявки результат кэшируется надолго (TTL по статусу)
+    return await get_cache().cached(request_id, "entities", {"top": top}, load)
+
+
+async def _request_status(request_id: str, session: AsyncSession) -> Optional[str]:
+    """Статус заявки (None для демо); 404, если нет ни заявки, ни активного демо."""
     req = await RequestsRepo(session).get(request_id)
     if not req:
         # допускаем демо
@@ -24,29 +70,5 @@ async def analytics_summary(
 
         if not await DemoRepo(session).is_active(request_id):
             raise HTTPException(status_code=404, detail="request_not_found")
-
-    # Подсчёты
-    total = (
-        await session.execute(
-            select(func.count()).select_from(PublicationDB).where(PublicationDB.request_id == request_id)
-        )
-    ).scalar_one()
-
-    def count_by(col, value):
-        return (
-            session.execute(
-                select(func.count())
-                .select_from(PublicationDB)
-                .where(PublicationDB.request_id == request_id)
-                .where(col == value)
-            )
-        )
-
-    rss = (await count_by(PublicationDB.source, "rss")).scalar_one()
-    web = (await count_by(PublicationDB.source, "web")).scalar_one()
-
-    neg = (await count_by(PublicationDB.sentiment, "neg")).scalar_one()
-    neu = (await count_by(PublicationDB.sentiment, "neu")).scalar_one()
-    pos = (await count_by(PublicationDB.sentiment, "pos")).scalar_one()
-
-    return {"count": total, "sources": {"rss": rss, "web": web}, "sentiments": {"neg": neg, "neu": neu, "pos": pos}}
+        return None
+    return req.status
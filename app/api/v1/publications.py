@@ -1,14 +1,21 @@
-"""Список публикаций c фильтрами (SQLAlchemy)."""
+"""Список публикаций c фильтрами и потоковая выгрузка (SQLAlchemy)."""
 
+import csv
+import io
+import json
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.infrastructure.cache.redis_client import get_cache
 from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
 from app.infrastructure.db.repositories.requests_repo import RequestsRepo
-from app.infrastructure.db.session import get_session
+from app.infrastructure.db.session import get_session, get_session_factory
+from app.infrastructure.db.tables import PublicationDB
 from app.schemas.publications import PublicationsResponse
 
 router = APIRouter()
@@ -25,31 +32,57 @@ async def list_publications(
     offset: int = 0,
     limit: int = 50,
     sort: str = "-published_at",
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    approximate_total: bool = Query(False, description="Оценка total планировщиком (PostgreSQL)"),
+    collapse: bool = Query(False, description="По одной публикации на сюжет (почти-дубли скрываются)"),
     session: AsyncSession = Depends(get_session),
 ) -> PublicationsResponse:
     """Вернуть публикации по фильтрам/пагинации."""
+    cache = get_cache()
+    params = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "source": source,
+        "sentiment": sentiment,
+        "lang": lang,
+        "offset": offset,
+        "limit": limit,
+        "sort": sort,
+        "cursor": cursor,
+        "approximate_total": approximate_total,
+        "collapse": collapse,
+    }
+    hit = await cache.get_json(request_id, "publications", params)
+    if hit is not None:
+        return PublicationsResponse.model_validate(hit)
+
     req = await RequestsRepo(session).get(request_id)
     is_demo = await _is_demo(request_id, session)
     if not req and not is_demo:
         raise HTTPException(status_code=404, detail="request_not_found")
 
-    def _set(val: Optional[str]) -> Optional[set[str]]:
-        return set(v.strip() for v in val.split(",")) if val else None
-
     repo = PublicationsRepo(session)
-    page = await repo.list_filtered(
-        request_id=request_id,
-        date_from=date_from,
-        date_to=date_to,
-        sources=_set(source),
-        sentiments=_set(sentiment),
-        langs=_set(lang),
-        offset=offset,
-        limit=limit,
-        sort=sort,
-    )
-    return PublicationsResponse(
+    try:
+        page = await repo.list_filtered(
+            request_id=request_id,
+            date_from=date_from,
+            date_to=date_to,
+            sources=_csv_set(source),
+            sentiments=_csv_set(sentiment),
+            langs=_csv_set(lang),
+            offset=offset,
+            limit=limit,
+            sort=sort,
+            cursor=cursor,
+            approximate_total=approximate_total,
+            final=bool(req and req.status == "READY"),
+            collapse=collapse,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response = PublicationsResponse(
         total=page["total"],
+        total_kind=page["total_kind"],
         items=[
             # Pydantic сам преобразует ORM-объекты; можно вернуть напрямую
             p
@@ -57,10 +90,97 @@ async def list_publications(
         ],
         offset=offset,
         limit=limit,
+        next_cursor=page["next_cursor"],
     )
+    await cache.set_json(request_id, "publications", params, response, req.status if req else None)
+    return response
 
 
 async def _is_demo(rid: str, session: AsyncSession) -> bool:
     from app.infrastructure.db.repositories.demo_repo import DemoRepo
 
     return await DemoRepo(session).is_active(rid)
+
+
+_EXPORT_FIELDS = (
+    "id", "request_id", "published_at", "source", "lang", "sentiment", "title", "url", "entities", "cluster_id"
+)
+_EXPORT_MEDIA = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+@router.get("/publications/export")
+async def export_publications(
+    request_id: str = Query(..., description="ID заявки или demo_id"),
+    format: Literal["ndjson", "csv"] = "ndjson",  # noqa: A002
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    source: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    lang: Optional[str] = None,
+    sort: str = "-published_at",
+    collapse: bool = Query(False, description="По одной публикации на сюжет (почти-дубли скрываются)"),
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    """Выгрузить все публикации заявки потоком (NDJSON или CSV)."""
+    if not await RequestsRepo(session).get(request_id) and not await _is_demo(request_id, session):
+        raise HTTPException(status_code=404, detail="request_not_found")
+
+    filters = {
+        "request_id": request_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "sources": _csv_set(source),
+        "sentiments": _csv_set(sentiment),
+        "langs": _csv_set(lang),
+        "sort": sort,
+        "collapse": collapse,
+    }
+    return StreamingResponse(
+        _export_chunks(filters, format),
+        media_type=_EXPORT_MEDIA[format],
+        headers={"Content-Disposition": f'attachment; filename="{request_id}.{format}"'},
+    )
+
+
+async def _export_chunks(filters: dict, fmt: str) -> AsyncIterator[bytes]:
+    """Сериализовать пачки строк из серверного курсора.
+
+    Сессия своя: зависимость get_session закрывается до начала отдачи тела.
+    """
+    async with get_session_factory()() as session:
+        if fmt == "csv":
+            yield _csv_chunk([_EXPORT_FIELDS])
+        chunks = PublicationsRepo(session).stream_filtered(**filters, chunk_size=settings.export_chunk_size)
+        async for chunk in chunks:
+            rows = [_export_row(p) for p in chunk]
+            if fmt == "csv":
+                yield _csv_chunk([[r[f] for f in _EXPORT_FIELDS] for r in rows])
+            else:
+                yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode()
+
+
+def _export_row(p: PublicationDB) -> dict:
+    return {
+        "id": str(p.id),
+        "request_id": p.request_id,
+        "published_at": p.published_at.isoformat(),
+        "source": p.source,
+        "lang": p.lang,
+        "sentiment": p.sentiment,
+        "title": p.title,
+        "url": p.url,
+        "entities": p.entities or [],
+        "cluster_id": None if p.cluster_id is None else str(p.cluster_id),
+    }
+
+
+def _csv_chunk(rows: list) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(";".join(v) if isinstance(v, list) else v for v in row)
+    return buf.getvalue().encode()
+
+
+def _csv_set(val: Optional[str]) -> Optional[set[str]]:
+    return set(v.strip() for v in val.split(",")) if val else None
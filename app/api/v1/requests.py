@@ -1,18 +1,24 @@
-"""Запросы: валидация (1.1), создание (1.3), статус (SQLAlchemy)."""
+"""Запросы: валидация (1.1), создание (1.3), дозагрузка, статус и SSE-поток статуса (SQLAlchemy)."""
 
+import asyncio
+import json
 from datetime import date, timedelta
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.security import get_current_user
-from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.cache.pubsub import get_broker
+from app.infrastructure.cache.redis_client import FINAL_STATUSES, get_cache
+from app.infrastructure.cache.totals_cache import totals_cache
+from app.infrastructure.db.repositories.jobs_repo import JobsRepo
 from app.infrastructure.db.repositories.requests_repo import RequestsRepo
-from app.infrastructure.db.session import get_session
-from app.infrastructure.db.tables import RequestDB
+from app.infrastructure.db.session import get_session, get_session_factory
 from app.schemas.common import Period, Price, User
+from app.tasks.collect import REFRESH_TASK, enqueue_collect
 from app.schemas.requests import (
     CreateRequestIn,
     CreateRequestOut,
@@ -46,11 +52,10 @@ def _period_from_tariff(tariff_code: str, start: Optional[date]) -> Period:
 @router.post("/requests", response_model=CreateRequestOut, status_code=status.HTTP_202_ACCEPTED)
 async def create_request(
     payload: CreateRequestIn,
-    bg: BackgroundTasks,
     session: AsyncSession = Depends(get_session),
     user: Optional[User] = Depends(get_current_user),
 ) -> CreateRequestOut:
-    """Создать заявку и запустить фоновую эмуляцию сбора данных (1.3)."""
+    """Создать заявку и поставить сбор данных в очередь воркеров (1.3)."""
     if payload.tariff_code not in {"WEEK", "MONTH", "QUARTER"}:
         raise HTTPException(status_code=400, detail="unknown_tariff")
 
@@ -67,10 +72,12 @@ async def create_request(
         period_start=period.start_date,
         period_end=period.end_date,
         applied_promo=payload.apply_promocode,
+        tariff_code=payload.tariff_code,
     )
+    # задача пишется в той же транзакции: заявка не останется без сбора
+    await enqueue_collect(session, row)
     await session.commit()
 
-    bg.add_task(_background_collect, rid)
     price = Price(currency=settings.currency, amount=_quote(payload.tariff_code), discount=0)
     return CreateRequestOut(request_id=row.id, status=row.status, price=price, period=period)
 
@@ -80,19 +87,118 @@ async def request_status(
     request_id: str,
     session: AsyncSession = Depends(get_session),
 ) -> RequestStatusOut:
-    """Опросить статус обработки заявки."""
+    """Опросить статус обработки заявки.
+
+    Статус — из БД (через кэш ответов), прогресс и ETA — живые значения
+    трекера задачи, если он сейчас работает с тем же статусом. Пока заявка
+    ждёт в очереди, ETA учитывает задачи впереди неё.
+    """
+
+    async def load() -> tuple[RequestStatusOut, str]:
+        row = await RequestsRepo(session).get(request_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="request_not_found")
+        eta = row.eta_seconds
+        if row.status == "PENDING":
+            eta = await JobsRepo(session).queue_eta(request_id) or eta
+        out = RequestStatusOut(
+            request_id=row.id,
+            status=row.status,
+            progress=row.progress,
+            eta_seconds=eta,
+        )
+        return out, row.status
+
+    cache = get_cache()
+    out = RequestStatusOut.model_validate(await cache.cached(request_id, "status", None, load))
+    live = await cache.get_live(request_id)
+    if live and live["status"] == out.status:
+        out = out.model_copy(update={"progress": live["progress"], "eta_seconds": live["eta_seconds"]})
+    return out
+
+
+@router.post(
+    "/requests/{request_id}/refresh",
+    response_model=RequestStatusOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def refresh_request(
+    request_id: str,
+    session: AsyncSession = Depends(get_session),
+) -> RequestStatusOut:
+    """Дозагрузить готовую заявку: собрать только публикации новее уже собранных."""
     repo = RequestsRepo(session)
     row = await repo.get(request_id)
     if not row:
         raise HTTPException(status_code=404, detail="request_not_found")
-    return RequestStatusOut(
-        request_id=row.id,
-        status=row.status,
-        progress=row.progress,
-        eta_seconds=row.eta_seconds,
+    # условный переход READY -> PENDING: параллельный refresh получит 409
+    if not await repo.mark_status(request_id, "PENDING", expected="READY"):
+        raise HTTPException(status_code=409, detail="request_not_ready")
+    await enqueue_collect(session, row, REFRESH_TASK)
+    await session.commit()
+    # total'ы READY-заявки в кэше этого процесса; публикации дозагрузит воркер
+    totals_cache.invalidate(request_id)
+    eta = await JobsRepo(session).queue_eta(request_id)
+    return RequestStatusOut(request_id=request_id, status="PENDING", progress=0, eta_seconds=eta)
+
+
+@router.get("/requests/{request_id}/events")
+async def request_events(
+    request_id: str,
+    session: AsyncSession = Depends(get_session),
+) -> StreamingResponse:
+    """SSE-поток изменений статуса, прогресса и ETA заявки вместо частого опроса.
+
+    Поток закрывается после финального статуса (READY / NO_DATA / FAILED).
+    """
+    if not await RequestsRepo(session).get(request_id):
+        raise HTTPException(status_code=404, detail="request_not_found")
+    return StreamingResponse(
+        _status_events(request_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+async def _status_events(request_id: str) -> AsyncIterator[str]:
+    async with get_broker().subscribe(request_id) as queue:
+        # состояние читаем уже после подписки (она подтверждена), чтобы не потерять событие между ними
+        state = await _current_state(request_id)
+        if state is None:
+            return
+        yield _sse(state)
+        while state["status"] not in FINAL_STATUSES:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.sse_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # событие могло не дойти (переподключение канала, воркер без Redis) — сверяемся с БД
+                fresh = await _current_state(request_id)
+                if fresh is None:
+                    return
+                if fresh == state:
+                    yield ": keep-alive\n\n"
+                    continue
+                state = fresh
+                yield _sse(state)
+                continue
+            state.update(event)
+            yield _sse(state)
+
+
+async def _current_state(request_id: str) -> Optional[dict]:
+    async with get_session_factory()() as session:
+        row = await RequestsRepo(session).get(request_id)
+    if row is None:
+        return None
+    return RequestStatusOut(
+        request_id=row.id, status=row.status, progress=row.progress, eta_seconds=row.eta_seconds
+    ).model_dump()
+
+
+def _sse(state: dict) -> str:
+    return f"event: status\ndata: {json.dumps(state)}\n\n"
+
+
 def _quote(tariff_code: str) -> int:
     return {"WEEK": 199, "MONTH": 499, "QUARTER": 1299}[tariff_code]
 
@@ -101,27 +207,3 @@ def _gen_id(prefix: str) -> str:
     import secrets
     return f"{prefix}_{secrets.token_hex(4)}"
 
-
-async def _background_collect(request_id: str) -> None:
-    """Асинхронная «фоновая» эмуляция парсинга с записью в БД."""
-    from asyncio import sleep
-    from sqlalchemy.ext.asyncio import AsyncSession
-
-    session_maker = __import__("app.infrastructure.db.session", fromlist=["get_session"]).infrastructure.db.session
-    session_factory = session_maker.get_session_factory()
-
-    async with session_factory() as session:  # type: AsyncSession
-        req_repo = RequestsRepo(session)
-        pubs_repo = PublicationsRepo(session)
-
-        # Прогресс (эмуляция)
-        for p in (10, 25, 40, 65, 85):
-            await req_repo.update_progress(request_id, p)
-            await session.commit()
-            await sleep(0.25)
-
-        # После «сбора» — сгенерируем публикации
-        await pubs_repo.seed_fake(request_id, count=16)
-        await req_repo.update_progress(request_id, 100)
-        await req_repo.mark_status(request_id, "READY")
-        await session.commit()
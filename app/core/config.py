@@ -32,6 +32,181 @@ class Settings(BaseSettings):
     demo_ttl_days: int = Field(default=7)
     promo_default_percent: int = Field(default=10)
 
+    # --- Кэш total'ов списка публикаций ---
+    totals_cache_ttl_seconds: int = Field(
+        default=15,
+        description="TTL total'а для заявок в процессе сбора.",
+    )
+    totals_cache_ready_ttl_seconds: int = Field(
+        default=300,
+        description="TTL total'а завершённых заявок: кэш в памяти процесса, а дозагрузку "
+        "может записать воркер или другая реплика API.",
+    )
+    totals_cache_max_entries: int = Field(default=10_000)
+
+    # --- Кэш ответов API (Redis или in-process) ---
+    redis_url: str | None = Field(default=None, description="redis://host:6379/0; пусто — кэш в памяти процесса.")
+    redis_max_connections: int = Field(default=50)
+    cache_prefix: str = Field(default="repa")
+    cache_ttl_seconds: int = Field(default=5, description="TTL ответов для заявок в процессе сбора.")
+    cache_ready_ttl_seconds: int = Field(default=7 * 24 * 3600, description="TTL ответов для завершённых заявок.")
+    cache_memory_max_entries: int = Field(default=10_000)
+
+    # --- Очередь задач и воркеры ---
+    worker_concurrency: int = Field(default=4, description="Сколько задач воркер выполняет одновременно.")
+    worker_poll_interval_seconds: float = Field(default=1.0)
+    job_visibility_timeout_seconds: int = Field(
+        default=300,
+        description="Через сколько секунд без heartbeat задачу может забрать другой воркер.",
+    )
+    job_max_attempts: int = Field(default=5)
+    job_retry_base_seconds: float = Field(default=5.0, description="База экспоненциальной задержки повтора.")
+    job_retry_max_seconds: float = Field(default=600.0)
+    scheduler_max_running: int = Field(
+        default=16, description="Сколько задач одновременно выполняется во всех воркерах вместе."
+    )
+    scheduler_max_per_owner: int = Field(
+        default=2, description="Сколько задач одного владельца (и всех гостей вместе) выполняется одновременно."
+    )
+    scheduler_weights: dict[str, float] = Field(
+        default={"QUARTER": 3.0, "MONTH": 2.0, "WEEK": 1.0, "guest": 0.0},
+        description="Вес класса приоритета (тариф; 'guest' — заявки без владельца).",
+    )
+    scheduler_aging_seconds: float = Field(
+        default=60.0, description="Каждые N секунд ожидания прибавляют задаче +1 к весу (защита от голодания)."
+    )
+    scheduler_default_job_seconds: float = Field(
+        default=10.0, description="Длительность задачи для ETA, пока нет статистики выполненных."
+    )
+    worker_metrics_interval_seconds: int = Field(
+        default=10, description="Как часто воркер публикует счётчики (тональность, сущности, обход) для /metrics/*."
+    )
+    worker_metrics_max_age_seconds: int = Field(
+        default=60, description="Снимки старше этого /metrics/* не учитывают (воркер остановлен)."
+    )
+    embedded_worker: bool = Field(
+        default=False,
+        description="Запускать воркер внутри API-процесса (только для локальной разработки).",
+    )
+
+    progress_flush_interval_seconds: float = Field(
+        default=5.0,
+        description="Как часто живой прогресс задачи сбрасывается в requests (смена статуса — всегда сразу).",
+    )
+    progress_live_ttl_seconds: int = Field(default=120, description="TTL живого прогресса в кэше.")
+
+    # --- Переиспользование результатов сбора ---
+    collection_reuse_hours: int = Field(
+        default=24,
+        description="Сколько часов собранный отрезок (запрос+язык+источники+даты) переиспользуется другими заявками.",
+    )
+
+    # --- Почти-дубли публикаций (MinHash + LSH по заголовкам) ---
+    dedup_enabled: bool = Field(default=True, description="Группировать почти-дубли в сюжеты при загрузке.")
+    dedup_jaccard: float = Field(
+        default=0.65, description="Порог сходства заголовков (Жаккар по словам), с которого статьи — один сюжет."
+    )
+    dedup_window_hours: int = Field(
+        default=72, description="Почти-дубли ищутся среди статей не дальше этого по времени публикации."
+    )
+
+    # --- Аналитика ---
+    entities_max_per_doc: int = Field(
+        default=20,
+        description="Сколько сущностей одной публикации учитывать в парах (ограничивает O(k^2)).",
+    )
+    entities_backend: str = Field(
+        default="gazetteer", description="Извлечение сущностей: gazetteer (справочник, офлайн) | spacy."
+    )
+    entities_gazetteer_path: str | None = Field(
+        default=None, description="JSON {каноническое название: [варианты]} вместо встроенного справочника."
+    )
+    entities_spacy_model: str = Field(default="ru_core_news_sm", description="Модель spaCy для backend=spacy.")
+
+    # --- SSE-поток статуса заявки ---
+    sse_heartbeat_seconds: int = Field(default=15, description="Интервал keep-alive комментариев в SSE.")
+
+    # --- Выгрузка публикаций ---
+    export_chunk_size: int = Field(default=1000, description="Строк в одной пачке серверного курсора.")
+
+    # --- Загрузка публикаций ---
+    ingest_batch_size: int = Field(
+        default=2000,
+        description="Строк в одной пачке массовой загрузки (executemany на SQLite, COPY на PostgreSQL).",
+    )
+
+    # --- Сбор RSS/Atom ---
+    rss_feeds: list[str] = Field(
+        default=[],
+        description="Ленты RSS/Atom для источника 'rss' (пусто — демо-данные).",
+    )
+    rss_max_connections: int = Field(default=100, description="Размер пула keep-alive соединений сборщика лент.")
+    rss_timeout_seconds: float = Field(default=15.0)
+    rss_user_agent: str = Field(default="REPA-MVP/0.2 (+rss)")
+
+    # --- Регулятор обхода (окна доменов по AIMD, robots.txt) ---
+    crawl_max_in_flight: int = Field(
+        default=64, description="Общий бюджет одновременных запросов процесса ко всем доменам."
+    )
+    crawl_domain_initial: float = Field(default=2.0, description="Начальное окно домена (запросов одновременно).")
+    crawl_domain_min: float = Field(default=1.0)
+    crawl_domain_max: float = Field(default=16.0)
+    crawl_latency_factor: float = Field(
+        default=2.0, description="Задержка выше лучшей во столько раз считается перегрузкой домена."
+    )
+    crawl_decrease_factor: float = Field(default=0.5, description="Во сколько раз сжимается окно при перегрузке.")
+    crawl_obey_robots: bool = Field(default=True, description="Соблюдать Disallow и Crawl-delay из robots.txt.")
+    crawl_robots_ttl_seconds: int = Field(default=3600, description="Как долго robots.txt домена считается свежим.")
+    crawl_max_pause_seconds: float = Field(default=300.0, description="Предел паузы домена по Retry-After.")
+
+    # --- Пайплайн Scrapy ---
+    scrapy_batch_size: int = Field(default=500, description="Элементов в пачке записи пайплайна Scrapy.")
+    scrapy_flush_seconds: float = Field(
+        default=2.0, description="Неполная пачка пишется, если копится дольше этого времени."
+    )
+    scrapy_max_pending_batches: int = Field(
+        default=4, description="Сколько пачек ждёт записи; при переполнении обход приостанавливается."
+    )
+
+    # --- Тональность (микро-пачки) ---
+    sentiment_backend: str = Field(
+        default="lexicon", description="Модель тональности: lexicon (словарь, офлайн) | transformers."
+    )
+    sentiment_model: str = Field(
+        default="blanchefort/rubert-base-cased-sentiment", description="Модель Hugging Face для backend=transformers."
+    )
+    sentiment_batch_size: int = Field(default=32, description="Текстов в микро-пачке модели.")
+    sentiment_max_wait_ms: float = Field(
+        default=10.0, description="Сколько неполная пачка ждёт добора после первого текста."
+    )
+    sentiment_workers: int = Field(
+        default=0,
+        description="Процессов пула модели (каждый грузит модель один раз); 0 — модель в потоке процесса.",
+    )
+    sentiment_threads_per_worker: int = Field(
+        default=1, description="Потоков BLAS/torch в процессе пула (процессы × потоки ≈ ядра)."
+    )
+
+    # --- Прогрев моделей при старте воркера ---
+    warmup_components: List[str] = Field(
+        default=[],
+        description="Модели, загружаемые воркером при старте до первых задач (sentiment, entities); "
+        "остальные грузятся при первом использовании. API модели не загружает.",
+    )
+
+    # --- Кэш результатов моделей (тональность, сущности) ---
+    inference_cache_enabled: bool = Field(
+        default=True, description="Не отправлять в модель тексты, уже обработанные этой версией модели."
+    )
+    inference_cache_memory_entries: int = Field(
+        default=100_000, description="Результатов в LRU процесса перед таблицей inference_cache."
+    )
+    inference_cache_stale_days: int = Field(
+        default=7,
+        description="Результаты других версий моделей старше стольких дней удаляет "
+        "python -m app.tasks.purge_inference_cache.",
+    )
+
     # --- Метаданные приложения ---
     app_name: str = Field(default="REPA-MVP")
     app_version: str = Field(default="0.2.0")
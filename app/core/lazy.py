@@ -0,0 +1,131 @@
+"""Ленивая загрузка тяжёлых модулей и фоновый прогрев моделей.
+
+API сам не обходит сайты и не запускает модели, поэтому парсеры, модели и их
+зависимости (httpx, Scrapy, transformers/torch, spaCy) при старте не
+импортируются: модуль объявляется через ``lazy_module`` и загружается при
+первом обращении к атрибуту. Время импорта таких модулей запоминается
+(``import_report``), там же видно, какие тяжёлые пакеты уже в памяти.
+
+``Warmup`` загружает выбранные модели по очереди — воркер делает это при
+старте, до первых задач. Без прогрева модель грузится при первом использовании.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import sys
+import time
+import types
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Пакеты, появление которых в процессе стоит видеть в отчёте (секунды импорта, сотни МБ)
+HEAVY_PACKAGES = ("httpx", "redis", "scrapy", "twisted", "transformers", "torch", "spacy")
+
+_lazy: dict[str, "LazyModule"] = {}
+
+
+class LazyModule(types.ModuleType):
+    """Заместитель модуля: настоящий импорт — при первом обращении к атрибуту."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self.__dict__["_module"] = None
+        self.__dict__["_import_seconds"] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def load(self) -> types.ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_import_seconds"] = time.perf_counter() - started
+            self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self.__name__!r} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Заместитель модуля ``name`` (один на процесс)."""
+    module = _lazy.get(name)
+    if module is None:
+        module = _lazy[name] = LazyModule(name)
+    return module
+
+
+def import_report() -> dict:
+    """Ленивые модули (загружен ли, сколько стоил импорт) и тяжёлые пакеты в памяти."""
+    return {
+        "lazy": {
+            name: {
+                "loaded": module.loaded,
+                "import_ms": None if not module.loaded else round(module.__dict__["_import_seconds"] * 1000, 1),
+            }
+            for name, module in sorted(_lazy.items())
+        },
+        "heavy": {name: name in sys.modules for name in HEAVY_PACKAGES},
+    }
+
+
+@dataclass
+class ComponentState:
+    """Состояние прогрева компонента: pending | loading | ready | failed."""
+
+    state: str = "pending"
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        out = {"state": self.state, "seconds": round(self.seconds, 3)}
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+class Warmup:
+    """Фоновая загрузка компонентов по очереди (по одному — без пика памяти и CPU).
+
+    :param targets: {компонент: "модуль:корутинная функция без аргументов"}.
+    :param names: какие компоненты прогревать.
+    """
+
+    def __init__(self, targets: Mapping[str, str], names: Iterable[str]) -> None:
+        names = list(dict.fromkeys(names))
+        unknown = [name for name in names if name not in targets]
+        if unknown:
+            raise ValueError(f"unknown warm-up components: {unknown}; known: {sorted(targets)}")
+        self.targets = {name: targets[name] for name in names}
+        self.components = {name: ComponentState() for name in names}
+
+    @property
+    def done(self) -> bool:
+        return all(state.state in ("ready", "failed") for state in self.components.values())
+
+    async def run(self) -> None:
+        for name, target in self.targets.items():
+            state = self.components[name]
+            state.state = "loading"
+            started = time.perf_counter()
+            try:
+                module, func = target.split(":")
+                await getattr(importlib.import_module(module), func)()
+                state.state = "ready"
+            except Exception as exc:  # noqa: BLE001 — компонент догрузится при первом использовании
+                logger.exception("warm-up of %s failed", name)
+                state.state = "failed"
+                state.error = repr(exc)
+            state.seconds = time.perf_counter() - started
+
+    def snapshot(self) -> dict:
+        return {name: state.as_dict() for name, state in self.components.items()}
@@ -0,0 +1,22 @@
+"""Сложение счётчиков нескольких процессов (снимки воркеров в ``/metrics/*``)."""
+
+from __future__ import annotations
+
+from dataclasses import fields
+from typing import Iterable, Mapping, TypeVar
+
+T = TypeVar("T")
+
+
+def merge_counters(cls: type[T], snapshots: Iterable[Mapping], *, maximum: Iterable[str] = ()) -> T:
+    """Датакласс счётчиков ``cls`` с суммой полей снимков (поля из ``maximum`` — максимум).
+
+    Производные величины (скорость, доли) считает сам датакласс по сумме.
+    """
+    snapshots = list(snapshots)
+    maximum = set(maximum)
+    values = {}
+    for field in fields(cls):
+        items = [snap.get(field.name, 0) for snap in snapshots]
+        values[field.name] = max(items, default=0) if field.name in maximum else sum(items)
+    return cls(**values)
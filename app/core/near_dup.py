@@ -0,0 +1,75 @@
+"""Почти-дубли заголовков: MinHash-сигнатуры и LSH-корзины.
+
+Заголовок превращается в множество слов; сходство двух заголовков — их
+коэффициент Жаккара. Вместо сравнения каждой пары сигнатура MinHash
+(``PERMUTATIONS`` минимумов) режется на ``BANDS`` полос по ``ROWS``
+значений, и каждая полоса хэшируется в одно число — LSH-корзину. Заголовки
+с Жаккаром от ~0.7 почти наверняка делят хотя бы одну корзину, случайные —
+почти никогда, поэтому кандидаты ищутся точным совпадением корзин по индексу,
+а окончательно проверяются точным Жаккаром.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import struct
+from functools import lru_cache
+
+BANDS = 10
+ROWS = 3
+PERMUTATIONS = BANDS * ROWS
+
+_WORD = re.compile(r"\w+")
+_WORD_HASHES = struct.Struct(f"<{PERMUTATIONS}I")
+
+
+def shingles(title: str) -> frozenset[str]:
+    """Множество значимых слов заголовка: регистр, «ё» и пунктуация не важны.
+
+    Предлоги и союзы (слова короче трёх букв) отбрасываются — они есть почти
+    в каждом заголовке и только сближают несвязанные; числа остаются.
+    """
+    words = _WORD.findall(title.lower().replace("ё", "е"))
+    return frozenset(w for w in words if len(w) > 2 or w.isdigit())
+
+
+@lru_cache(maxsize=200_000)
+def _word_hashes(word: str) -> tuple[int, ...]:
+    """``PERMUTATIONS`` независимых 32-битных хэшей слова из двух дайджестов blake2b.
+
+    Без зерна и соли, зависящих от процесса: сигнатуры совпадают между
+    воркерами и перезапусками. Словарь заголовков повторяется, поэтому кэш.
+    """
+    raw = word.encode()
+    digest = hashlib.blake2b(raw, digest_size=64).digest() + hashlib.blake2b(raw, digest_size=64, salt=b"near").digest()
+    return _WORD_HASHES.unpack_from(digest)
+
+
+def signature(words: frozenset[str]) -> list[int]:
+    """MinHash-сигнатура: минимум каждой из ``PERMUTATIONS`` хэш-функций по словам."""
+    return [min(column) for column in zip(*map(_word_hashes, words))]
+
+
+def bands(words: frozenset[str]) -> list[int]:
+    """LSH-корзины заголовка (знаковые 63-битные числа — для BIGINT).
+
+    Номер полосы входит в хэш, поэтому корзины разных полос не смешиваются
+    и хранятся в одной колонке. Для слишком коротких заголовков (меньше
+    двух слов) корзин нет: сходство на них ничего не значит.
+    """
+    if len(words) < 2:
+        return []
+    sig = signature(words)
+    out = []
+    for band in range(BANDS):
+        packed = struct.pack(f"<B{ROWS}I", band, *sig[band * ROWS : (band + 1) * ROWS])
+        out.append(int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little") >> 1)
+    return out
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    """Коэффициент Жаккара двух множеств слов."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
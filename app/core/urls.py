@@ -0,0 +1,33 @@
+# app/core/urls.py
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Параметры, которые не меняют содержимое страницы (метки рекламных кампаний)
+_TRACKING_PARAMS = {"fbclid", "gclid", "yclid", "_openstat", "from", "ref"}
+
+
+def canonical_url(url: str) -> str:
+    """Канонический вид URL: одна статья — одна строка независимо от меток и регистра хоста."""
+    parts = urlsplit(url.strip())
+    host = parts.hostname or ""
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and (parts.scheme, parts.port) not in {("http", 80), ("https", 443)}:
+        host = f"{host}:{parts.port}"
+    query = ""
+    if parts.query:
+        query = urlencode(
+            sorted(
+                (k, v)
+                for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                if not k.startswith("utm_") and k not in _TRACKING_PARAMS
+            )
+        )
+    path = parts.path.rstrip("/") or "/"
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme.lower()
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_hash(url: str) -> str:
+    """sha1 канонического URL (ключ дедупликации статей)."""
+    return hashlib.sha1(canonical_url(url).encode()).hexdigest()
@@ -0,0 +1,142 @@
+"""Рассылка событий заявок подписчикам (SSE) из одного источника уведомлений."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EventBroker:
+    """Fan-out событий заявок внутри процесса.
+
+    Источник уведомлений один на процесс: с Redis — канал pub/sub
+    (события приходят и от воркеров в других процессах), без Redis —
+    in-memory заглушка, где ``publish`` сразу раздаёт событие локальным
+    подписчикам. Подписчики не опрашивают БД — они ждут свою очередь.
+
+    ``subscribe`` с Redis возвращает очередь только после подтверждения
+    SUBSCRIBE, поэтому состояние, прочитанное после подписки, не разминётся
+    с событиями. Во время переподключения канала события теряются — поток
+    SSE сверяется с БД на каждом keep-alive.
+    """
+
+    def __init__(self, redis_url: Optional[str], channel: str, queue_size: int = 100) -> None:
+        self.redis_url = redis_url
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    @asynccontextmanager
+    async def subscribe(self, request_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Подписаться на события заявки на время блока ``async with``."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[request_id].add(queue)
+        try:
+            if self.redis_url:
+                await self._wait_subscribed()
+            yield queue
+        finally:
+            subs = self._subscribers.get(request_id)
+            if subs is not None:
+                subs.discard(queue)
+                if not subs:
+                    del self._subscribers[request_id]
+
+    async def publish(self, request_id: str, event: dict) -> None:
+        """Опубликовать изменение заявки (status / progress / eta_seconds)."""
+        if not self.redis_url:
+            self._fan_out(request_id, event)
+            return
+        try:
+            await self._client().publish(self.channel, json.dumps({"request_id": request_id, "event": event}))
+        except Exception:  # noqa: BLE001 - уведомление не должно ронять запись
+            logger.warning("Не удалось опубликовать событие заявки %s", request_id, exc_info=True)
+
+    def subscribers(self) -> int:
+        """Число активных подписчиков в процессе."""
+        return sum(len(s) for s in self._subscribers.values())
+
+    async def close(self) -> None:
+        """Остановить слушателя и закрыть соединение."""
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    def _fan_out(self, request_id: str, event: dict) -> None:
+        for queue in list(self._subscribers.get(request_id, ())):
+            if queue.full():
+                # медленный клиент: старое состояние уже неактуально
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _client(self):
+        if self._redis is None:
+            from redis.asyncio import Redis
+
+            self._redis = Redis.from_url(self.redis_url, decode_responses=True)
+        return self._redis
+
+    async def _wait_subscribed(self) -> None:
+        """Дождаться, пока канал Redis подписан (слушатель запускается при первой подписке)."""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=settings.sse_heartbeat_seconds)
+        except asyncio.TimeoutError:
+            # Redis недоступен: подписчик всё равно получит итог из БД на keep-alive
+            logger.warning("Канал событий не подписан за %s с", settings.sse_heartbeat_seconds)
+
+    async def _listen(self) -> None:
+        """Единственный на процесс цикл чтения канала Redis."""
+        while True:
+            pubsub = self._client().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "subscribe":
+                        self._subscribed.set()
+                    if message.get("type") != "message":
+                        continue
+                    data = json.loads(message["data"])
+                    self._fan_out(data["request_id"], data["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                logger.warning("Канал событий оборвался, переподключение", exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                self._subscribed.clear()
+                await pubsub.aclose()
+
+
+_broker: EventBroker | None = None
+
+
+def get_broker() -> EventBroker:
+    """Вернуть (или создать) брокер событий процесса."""
+    global _broker  # noqa: PLW0603
+    if _broker is None:
+        _broker = EventBroker(settings.redis_url, channel=f"{settings.cache_prefix}:request-events")
+    return _broker
+
+
+async def close_broker() -> None:
+    """Закрыть брокер событий (shutdown приложения)."""
+    global _broker  # noqa: PLW0603
+    if _broker is not None:
+        await _broker.close()
+        _broker = None
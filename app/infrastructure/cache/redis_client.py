@@ -0,0 +1,219 @@
+"""Общий асинхронный кэш ответов API: Redis или in-process fallback."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Статусы, после которых данные заявки больше не меняются
+FINAL_STATUSES = frozenset({"READY", "NO_DATA", "FAILED"})
+
+
+class CacheBackend(Protocol):
+    """Минимальный key-value интерфейс, который нужен ResponseCache."""
+
+    async def get(self, key: str) -> Optional[str]: ...
+
+    async def set(self, key: str, value: str, ttl: Optional[int]) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryBackend:
+    """In-process LRU с TTL — для dev, тестов и запуска без Redis."""
+
+    def __init__(self, max_entries: int = 10_000) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[str, Optional[float]]] = OrderedDict()
+        # счётчики (версии заявок) не вытесняются LRU, иначе ожили бы старые ключи
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        if key in self._counters:
+            return str(self._counters[key])
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        self._data[key] = (value, None if ttl is None else time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def close(self) -> None:
+        self._data.clear()
+        self._counters.clear()
+
+
+class RedisBackend:
+    """Redis через общий пул соединений (redis.asyncio)."""
+
+    def __init__(self, url: str, max_connections: int) -> None:
+        from redis.asyncio import ConnectionPool, Redis
+
+        self.pool = ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+        self.client = Redis(connection_pool=self.pool)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int]) -> None:
+        await self.client.set(key, value, ex=ttl)
+
+    async def incr(self, key: str) -> int:
+        return int(await self.client.incr(key))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+
+class ResponseCache:
+    """Кэш JSON-ответов с пространством ключей на каждую заявку.
+
+    Ключ: ``<prefix>:<request_id>:v<версия>:<имя>:<хэш параметров>``.
+    Инвалидация заявки — инкремент её версии: старые ключи перестают
+    читаться и истекают сами, без сканирования пространства ключей.
+    """
+
+    def __init__(self, backend: CacheBackend, prefix: str) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def ttl_for_status(status: Optional[str]) -> Optional[int]:
+        """TTL записи по статусу заявки: короткий в процессе сбора, длинный после."""
+        if status in FINAL_STATUSES:
+            return settings.cache_ready_ttl_seconds
+        return settings.cache_ttl_seconds
+
+    async def get_json(self, request_id: str, name: str, params: Optional[dict] = None) -> Optional[Any]:
+        """Прочитать значение; None — промах."""
+        try:
+            raw = await self.backend.get(await self._key(request_id, name, params))
+        except Exception:  # noqa: BLE001 - кэш не должен ронять запрос
+            logger.warning("Кэш недоступен при чтении %s/%s", request_id, name, exc_info=True)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set_json(
+        self, request_id: str, name: str, params: Optional[dict], value: Any, status: Optional[str]
+    ) -> None:
+        """Сохранить значение с TTL по статусу заявки."""
+        try:
+            raw = json.dumps(jsonable_encoder(value), ensure_ascii=False)
+            await self.backend.set(await self._key(request_id, name, params), raw, self.ttl_for_status(status))
+        except Exception:  # noqa: BLE001
+            logger.warning("Кэш недоступен при записи %s/%s", request_id, name, exc_info=True)
+
+    async def cached(
+        self,
+        request_id: str,
+        name: str,
+        params: Optional[dict],
+        loader: Callable[[], Awaitable[tuple[Any, Optional[str]]]],
+    ) -> Any:
+        """get-or-set: ``loader`` возвращает (значение, статус заявки для TTL)."""
+        hit = await self.get_json(request_id, name, params)
+        if hit is not None:
+            return hit
+        value, status = await loader()
+        await self.set_json(request_id, name, params, value, status)
+        return value
+
+    async def set_live(self, request_id: str, state: dict, ttl: int) -> None:
+        """Записать «живое» состояние заявки (прогресс/ETA между записями в БД)."""
+        try:
+            await self.backend.set(self._live_key(request_id), json.dumps(jsonable_encoder(state)), ttl)
+        except Exception:  # noqa: BLE001
+            logger.warning("Кэш недоступен при записи прогресса %s", request_id, exc_info=True)
+
+    async def get_live(self, request_id: str) -> Optional[dict]:
+        """Прочитать «живое» состояние заявки или None."""
+        try:
+            raw = await self.backend.get(self._live_key(request_id))
+        except Exception:  # noqa: BLE001
+            logger.warning("Кэш недоступен при чтении прогресса %s", request_id, exc_info=True)
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def invalidate(self, request_id: str) -> None:
+        """Сбросить все закэшированные ответы заявки."""
+        try:
+            await self.backend.incr(self._version_key(request_id))
+        except Exception:  # noqa: BLE001
+            logger.warning("Не удалось инвалидировать кэш заявки %s", request_id, exc_info=True)
+
+    def stats(self) -> dict:
+        """Счётчики попаданий/промахов."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _live_key(self, request_id: str) -> str:
+        # не версионируется: живое состояние переживает инвалидацию ответов
+        return f"{self.prefix}:{request_id}:live"
+
+    def _version_key(self, request_id: str) -> str:
+        return f"{self.prefix}:{request_id}:v"
+
+    async def _key(self, request_id: str, name: str, params: Optional[dict]) -> str:
+        version = await self.backend.get(self._version_key(request_id)) or "0"
+        digest = hashlib.sha1(json.dumps(params or {}, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f"{self.prefix}:{request_id}:v{version}:{name}:{digest}"
+
+
+_cache: ResponseCache | None = None
+
+
+def get_cache() -> ResponseCache:
+    """Вернуть (или создать) общий кэш: Redis, если задан redis_url, иначе in-process."""
+    global _cache  # noqa: PLW0603
+    if _cache is None:
+        if settings.redis_url:
+            backend: CacheBackend = RedisBackend(settings.redis_url, settings.redis_max_connections)
+        else:
+            backend = MemoryBackend(settings.cache_memory_max_entries)
+        _cache = ResponseCache(backend, prefix=settings.cache_prefix)
+    return _cache
+
+
+async def close_cache() -> None:
+    """Закрыть пул соединений кэша (shutdown приложения)."""
+    global _cache  # noqa: PLW0603
+    if _cache is not None:
+        await _cache.backend.close()
+        _cache = None
@@ -0,0 +1,60 @@
+"""In-process кэш total'ов для отфильтрованных списков публикаций."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+
+class TotalsCache:
+    """LRU-кэш ``count(*)`` по ключу (request_id, сигнатура фильтров).
+
+    Кэш в памяти процесса: дозагрузку, записанную воркером или другой
+    репликой, он не видит, поэтому и у готовых (READY) заявок TTL конечный;
+    для заявок в процессе сбора — короткий.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[tuple[str, str], tuple[int, Optional[float]]] = OrderedDict()
+
+    @staticmethod
+    def signature(**filters: object) -> str:
+        """Стабильная сигнатура набора фильтров (порядок значений не важен)."""
+        norm = {k: sorted(v) if isinstance(v, (set, frozenset)) else v for k, v in filters.items()}
+        raw = json.dumps(norm, sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+    def get(self, request_id: str, signature: str) -> Optional[int]:
+        """Вернуть total из кэша или None, если записи нет или она истекла."""
+        key = (request_id, signature)
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        total, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return total
+
+    def set(self, request_id: str, signature: str, total: int, ttl: Optional[float]) -> None:
+        """Сохранить total; ``ttl=None`` — без истечения."""
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        self._data[(request_id, signature)] = (total, expires_at)
+        self._data.move_to_end((request_id, signature))
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, request_id: str) -> None:
+        """Сбросить все total'ы заявки (например, после вставки публикаций)."""
+        for key in [k for k in self._data if k[0] == request_id]:
+            del self._data[key]
+
+
+totals_cache = TotalsCache(max_entries=settings.totals_cache_max_entries)
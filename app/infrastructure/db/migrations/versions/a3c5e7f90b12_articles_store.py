@@ -0,0 +1,180 @@
+"""Global articles store with per-request links
+
+Revision ID: a3c5e7f90b12
+Revises: 62f91461008a
+Create Date: 2026-10-18 12:00:00.000000
+
+Таблица ``publications`` (копия статьи на каждую заявку) разделяется на
+``articles`` (одна строка на канонический URL) и ``request_publications``
+(связь заявки со статьёй). Бэкфилл идёт пачками: статьи с одинаковым
+каноническим URL склеиваются, тональность и сущности берутся из первой
+оценённой копии.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.urls import url_hash
+
+
+# revision identifiers
+revision = 'a3c5e7f90b12'
+down_revision = '62f91461008a'
+branch_labels = None
+depends_on = None
+
+BATCH = 5000
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    if "articles" not in tables:
+        op.create_table(
+            "articles",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("url_hash", sa.String(40), nullable=False, unique=True),
+            sa.Column("title", sa.Text(), nullable=False),
+            sa.Column("url", sa.Text(), nullable=False),
+            sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("source", sa.String(16), nullable=False),
+            sa.Column("lang", sa.String(8), nullable=False),
+            sa.Column("sentiment", sa.String(8), nullable=True),
+            sa.Column("entities", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_articles_id", "articles", ["id"])
+        op.create_index("ix_articles_published_at", "articles", ["published_at"])
+        op.create_index("ix_articles_source_lang", "articles", ["source", "lang"])
+    if "request_publications" not in tables:
+        op.create_table(
+            "request_publications",
+            sa.Column(
+                "request_id", sa.String(32), sa.ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+            ),
+            sa.Column("article_id", sa.Integer(), sa.ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+        )
+        op.create_index("ix_request_publications_article_id", "request_publications", ["article_id"])
+        op.create_index(
+            "ix_request_publications_request_published",
+            "request_publications",
+            ["request_id", "published_at", "article_id"],
+        )
+
+    if "publications" in tables:
+        _backfill(bind)
+        op.drop_table("publications")
+
+
+def _backfill(bind) -> None:
+    """Перенести publications в articles + request_publications пачками по id."""
+    meta = sa.MetaData()
+    pubs = sa.Table("publications", meta, autoload_with=bind)
+    articles = sa.Table("articles", meta, autoload_with=bind)
+    links = sa.Table("request_publications", meta, autoload_with=bind)
+
+    known: dict[str, int] = {}  # url_hash -> articles.id
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(pubs).where(pubs.c.id > last_id).order_by(pubs.c.id).limit(BATCH)
+        ).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        fresh: dict[str, dict] = {}
+        scored: dict[str, dict] = {}
+        for row in rows:
+            h = url_hash(row["url"])
+            if h in known:
+                if row["sentiment"] is not None or row["entities"]:
+                    scored.setdefault(h, row)
+                continue
+            article = fresh.get(h)
+            if article is None:
+                fresh[h] = {
+                    "url_hash": h,
+                    "title": row["title"],
+                    "url": row["url"],
+                    "published_at": row["published_at"],
+                    "source": row["source"],
+                    "lang": row["lang"],
+                    "sentiment": row["sentiment"],
+                    "entities": row["entities"],
+                }
+                continue
+            # копия с оценкой дополняет статью, у которой оценки ещё нет
+            article["sentiment"] = article["sentiment"] or row["sentiment"]
+            article["entities"] = article["entities"] or row["entities"]
+        if fresh:
+            bind.execute(articles.insert(), list(fresh.values()))
+            res = bind.execute(
+                sa.select(articles.c.id, articles.c.url_hash).where(articles.c.url_hash.in_(list(fresh)))
+            )
+            known.update({h: aid for aid, h in res.all()})
+        # то же для статей из прошлых пачек (JSON null хранится строкой 'null')
+        for h, row in scored.items():
+            aid = known[h]
+            if row["sentiment"] is not None:
+                bind.execute(
+                    articles.update()
+                    .where(articles.c.id == aid, articles.c.sentiment.is_(None))
+                    .values(sentiment=row["sentiment"])
+                )
+            if row["entities"]:
+                no_entities = sa.or_(articles.c.entities.is_(None), sa.cast(articles.c.entities, sa.Text) == "null")
+                bind.execute(
+                    articles.update().where(articles.c.id == aid, no_entities).values(entities=row["entities"])
+                )
+
+        seen: set[tuple[str, int]] = set()
+        link_rows = []
+        for row in rows:
+            key = (row["request_id"], known[url_hash(row["url"])])
+            if key not in seen:
+                seen.add(key)
+                link_rows.append({"request_id": key[0], "article_id": key[1], "published_at": row["published_at"]})
+        existing = bind.execute(
+            sa.select(links.c.request_id, links.c.article_id).where(
+                links.c.article_id.in_([aid for _, aid in seen])
+            )
+        ).all()
+        existing_keys = {tuple(r) for r in existing}
+        link_rows = [r for r in link_rows if (r["request_id"], r["article_id"]) not in existing_keys]
+        if link_rows:
+            bind.execute(links.insert(), link_rows)
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.create_table(
+        "publications",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("request_id", sa.String(32), sa.ForeignKey("requests.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("published_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("source", sa.String(16), nullable=False),
+        sa.Column("lang", sa.String(8), nullable=False),
+        sa.Column("sentiment", sa.String(8), nullable=True),
+        sa.Column("entities", sa.JSON(), nullable=True),
+    )
+    op.create_index("ix_publications_id", "publications", ["id"])
+    op.create_index("ix_publications_request_id", "publications", ["request_id"])
+    op.create_index("ix_publications_published", "publications", ["published_at"])
+    op.create_index("ix_publications_source_lang", "publications", ["source", "lang"])
+    op.create_index(
+        "ix_publications_request_published_id", "publications", ["request_id", "published_at", "id"]
+    )
+    op.execute(
+        """
+        INSERT INTO publications (request_id, title, url, published_at, source, lang, sentiment, entities)
+        SELECT rp.request_id, a.title, a.url, rp.published_at, a.source, a.lang, a.sentiment, a.entities
+        FROM request_publications rp JOIN articles a ON a.id = rp.article_id
+        """
+    )
+    op.drop_table("request_publications")
+    op.drop_table("articles")
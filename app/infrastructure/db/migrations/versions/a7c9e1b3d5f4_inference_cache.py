@@ -0,0 +1,37 @@
+"""Persistent cache of model inference results
+
+Revision ID: a7c9e1b3d5f4
+Revises: f2b4d6e8a0c1
+Create Date: 2026-10-18 17:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'a7c9e1b3d5f4'
+down_revision = 'f2b4d6e8a0c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    if "inference_cache" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "inference_cache",
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("text_hash", sa.String(length=40), nullable=False),
+        sa.Column("model_version", sa.String(length=128), nullable=False),
+        sa.Column("value", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("kind", "text_hash"),
+    )
+    op.create_index("ix_inference_cache_kind_version", "inference_cache", ["kind", "model_version"])
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.drop_index("ix_inference_cache_kind_version", table_name="inference_cache")
+    op.drop_table("inference_cache")
@@ -0,0 +1,36 @@
+"""Worker metric snapshots
+
+Revision ID: b8d0f2a4c6e7
+Revises: a7c9e1b3d5f4
+Create Date: 2026-10-19 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'b8d0f2a4c6e7'
+down_revision = 'a7c9e1b3d5f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    if "worker_metrics" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "worker_metrics",
+        sa.Column("worker_id", sa.String(length=64), nullable=False),
+        sa.Column("kind", sa.String(length=16), nullable=False),
+        sa.Column("snapshot", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("worker_id", "kind"),
+    )
+    op.create_index("ix_worker_metrics_updated_at", "worker_metrics", ["updated_at"])
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.drop_index("ix_worker_metrics_updated_at", table_name="worker_metrics")
+    op.drop_table("worker_metrics")
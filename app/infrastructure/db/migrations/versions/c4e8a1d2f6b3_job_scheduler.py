@@ -0,0 +1,66 @@
+"""Job scheduler: priority class, owner and request on jobs; tariff on requests
+
+Revision ID: c4e8a1d2f6b3
+Revises: a3c5e7f90b12
+Create Date: 2026-10-18 13:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'c4e8a1d2f6b3'
+down_revision = 'a3c5e7f90b12'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set[str]:
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table: str) -> set[str]:
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _has_table(table: str) -> bool:
+    return table in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    if "tariff_code" not in _columns("requests"):
+        op.add_column("requests", sa.Column("tariff_code", sa.String(16), nullable=True))
+
+    if not _has_table("jobs"):
+        # таблицы очереди ещё нет: create_all создаст её сразу с этими колонками
+        return
+    existing = _columns("jobs")
+    with op.batch_alter_table("jobs") as batch:
+        if "priority_class" not in existing:
+            batch.add_column(sa.Column("priority_class", sa.String(16), nullable=False, server_default="guest"))
+        if "owner_id" not in existing:
+            batch.add_column(sa.Column("owner_id", sa.String(64), nullable=True))
+        if "request_id" not in existing:
+            batch.add_column(sa.Column("request_id", sa.String(32), nullable=True))
+        if "started_at" not in existing:
+            batch.add_column(sa.Column("started_at", sa.DateTime(timezone=True), nullable=True))
+
+    indexes = _indexes("jobs")
+    if "ix_jobs_request_id" not in indexes:
+        op.create_index("ix_jobs_request_id", "jobs", ["request_id"])
+    if "ix_jobs_class_claim" not in indexes:
+        op.create_index("ix_jobs_class_claim", "jobs", ["priority_class", "status", "run_after"])
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    if _has_table("jobs"):
+        op.drop_index("ix_jobs_class_claim", table_name="jobs")
+        op.drop_index("ix_jobs_request_id", table_name="jobs")
+        with op.batch_alter_table("jobs") as batch:
+            batch.drop_column("started_at")
+            batch.drop_column("request_id")
+            batch.drop_column("owner_id")
+            batch.drop_column("priority_class")
+    op.drop_column("requests", "tariff_code")
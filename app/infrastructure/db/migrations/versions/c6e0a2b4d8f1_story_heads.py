@@ -0,0 +1,66 @@
+"""Story representatives per request: request_publications.story_id, story_head
+
+Revision ID: c6e0a2b4d8f1
+Revises: b8d0f2a4c6e7
+Create Date: 2026-10-19 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'c6e0a2b4d8f1'
+down_revision = 'b8d0f2a4c6e7'
+branch_labels = None
+depends_on = None
+
+# Представитель сюжета — самая ранняя публикация сюжета в заявке (тай-брейк по id статьи)
+_MARK_HEADS = """
+UPDATE request_publications SET story_head = NOT EXISTS (
+    SELECT 1 FROM request_publications AS other
+    WHERE other.request_id = request_publications.request_id
+      AND other.story_id = request_publications.story_id
+      AND (other.published_at < request_publications.published_at
+           OR (other.published_at = request_publications.published_at
+               AND other.article_id < request_publications.article_id))
+)
+"""
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    inspector = sa.inspect(op.get_bind())
+    if "request_publications" not in inspector.get_table_names():
+        return
+    columns = {c["name"] for c in inspector.get_columns("request_publications")}
+    indexes = {i["name"] for i in inspector.get_indexes("request_publications")}
+    if "story_id" not in columns:
+        op.add_column("request_publications", sa.Column("story_id", sa.Integer(), nullable=True))
+        op.add_column(
+            "request_publications",
+            sa.Column("story_head", sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+        op.execute(
+            "UPDATE request_publications SET story_id = ("
+            "SELECT coalesce(articles.cluster_id, articles.id) FROM articles "
+            "WHERE articles.id = request_publications.article_id)"
+        )
+    if "ix_request_publications_request_story" not in indexes:
+        op.create_index("ix_request_publications_request_story", "request_publications", ["request_id", "story_id"])
+    if "story_id" not in columns:
+        # по индексу сюжетов: каждая связь сверяется только с публикациями своего сюжета
+        op.execute(_MARK_HEADS)
+    if "ix_request_publications_story_heads" not in indexes:
+        op.create_index(
+            "ix_request_publications_story_heads",
+            "request_publications",
+            ["request_id", "story_head", "published_at", "article_id"],
+        )
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.drop_index("ix_request_publications_story_heads", table_name="request_publications")
+    op.drop_index("ix_request_publications_request_story", table_name="request_publications")
+    with op.batch_alter_table("request_publications") as batch:
+        batch.drop_column("story_head")
+        batch.drop_column("story_id")
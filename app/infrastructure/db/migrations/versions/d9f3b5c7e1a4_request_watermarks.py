@@ -0,0 +1,28 @@
+"""Per-source high-water marks on requests
+
+Revision ID: d9f3b5c7e1a4
+Revises: c4e8a1d2f6b3
+Create Date: 2026-10-18 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'd9f3b5c7e1a4'
+down_revision = 'c4e8a1d2f6b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("requests")}
+    if "watermarks" not in columns:
+        # пустые границы: первый refresh посчитает их по уже собранным публикациям
+        op.add_column("requests", sa.Column("watermarks", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.drop_column("requests", "watermarks")
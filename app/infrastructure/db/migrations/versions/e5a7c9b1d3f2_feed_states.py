@@ -0,0 +1,36 @@
+"""Conditional GET validators for RSS/Atom feeds
+
+Revision ID: e5a7c9b1d3f2
+Revises: d9f3b5c7e1a4
+Create Date: 2026-10-18 15:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'e5a7c9b1d3f2'
+down_revision = 'd9f3b5c7e1a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    if "feed_states" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "feed_states",
+        sa.Column("request_id", sa.String(length=32), nullable=False),
+        sa.Column("feed_url", sa.String(length=512), nullable=False),
+        sa.Column("etag", sa.String(length=256), nullable=True),
+        sa.Column("last_modified", sa.String(length=64), nullable=True),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["request_id"], ["requests.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("request_id", "feed_url"),
+    )
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    op.drop_table("feed_states")
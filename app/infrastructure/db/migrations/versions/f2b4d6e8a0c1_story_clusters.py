@@ -0,0 +1,54 @@
+"""Near-duplicate story clusters: articles.cluster_id, article_bands, request_stats.stories
+
+Revision ID: f2b4d6e8a0c1
+Revises: e5a7c9b1d3f2
+Create Date: 2026-10-18 16:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers
+revision = 'f2b4d6e8a0c1'
+down_revision = 'e5a7c9b1d3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Apply migration."""
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("articles")}
+    if "cluster_id" not in columns:
+        # NULL — статья ещё не кластеризована и считается отдельным сюжетом
+        op.add_column("articles", sa.Column("cluster_id", sa.Integer(), nullable=True))
+    indexes = {i["name"] for i in inspector.get_indexes("articles")}
+    if "ix_articles_cluster_id" not in indexes:
+        op.create_index("ix_articles_cluster_id", "articles", ["cluster_id"])
+    if "article_bands" not in inspector.get_table_names():
+        op.create_table(
+            "article_bands",
+            sa.Column("band", sa.BigInteger(), nullable=False),
+            sa.Column("article_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["article_id"], ["articles.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("band", "article_id"),
+        )
+        op.create_index("ix_article_bands_article_id", "article_bands", ["article_id"])
+    # request_stats создаёт create_all (сразу со столбцом stories)
+    if "request_stats" in inspector.get_table_names() and "stories" not in {
+        c["name"] for c in inspector.get_columns("request_stats")
+    }:
+        # у старых заявок сюжеты появятся после пересборки агрегатов (StatsRepo.rebuild)
+        op.add_column(
+            "request_stats", sa.Column("stories", sa.Integer(), nullable=False, server_default="0")
+        )
+
+
+def downgrade() -> None:
+    """Revert migration."""
+    if "request_stats" in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_column("request_stats", "stories")
+    op.drop_index("ix_article_bands_article_id", table_name="article_bands")
+    op.drop_table("article_bands")
+    op.drop_index("ix_articles_cluster_id", table_name="articles")
+    op.drop_column("articles", "cluster_id")
@@ -0,0 +1,98 @@
+"""Репозиторий сюжетов: группировка почти-дублей статей (articles.cluster_id)."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.near_dup import bands, jaccard, shingles
+from app.infrastructure.db.tables import ArticleBandDB, ArticleDB
+from app.infrastructure.db.upsert import dialect_insert
+
+# Корзин в одном IN (...) при поиске кандидатов
+_BAND_CHUNK = 500
+
+
+class ClustersRepo:
+    """Назначение статьям сюжета по LSH-корзинам заголовков (см. app.core.near_dup).
+
+    Сюжет статьи — id первой статьи группы; статья без похожих открывает
+    свой сюжет (``cluster_id = id``). Сюжет назначается один раз и потом не
+    меняется, поэтому счётчики сюжетов заявок можно вести инкрементально.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.threshold = settings.dedup_jaccard
+        self.window = timedelta(hours=settings.dedup_window_hours)
+
+    async def assign(self, articles: Sequence[tuple[int, str, datetime]]) -> dict[int, int]:
+        """Назначить сюжеты статьям без сюжета и сохранить их корзины.
+
+        Кандидаты — статьи, делящие с новой хотя бы одну корзину и
+        опубликованные в пределах ``dedup_window_hours``; из них берётся
+        самая похожая по точному Жаккару не ниже ``dedup_jaccard``. Новые
+        статьи обходятся по времени публикации, так что дубли внутри одной
+        пачки тоже сходятся в один сюжет.
+
+        :param articles: (id, title, published_at) статей с ``cluster_id IS NULL``.
+        :return: {id статьи: id сюжета}.
+        """
+        if not articles:
+            return {}
+        words = {aid: shingles(title or "") for aid, title, _ in articles}
+        keys = {aid: bands(words[aid]) for aid in words}
+        published = {aid: ts for aid, _, ts in articles}
+
+        # кандидаты из БД: (сюжет, слова, время) и корзины -> статьи
+        known: dict[int, tuple[int, frozenset[str], datetime]] = {}
+        buckets: dict[int, list[int]] = defaultdict(list)
+        wanted = sorted({band for values in keys.values() for band in values})
+        lo = min(published.values()) - self.window
+        hi = max(published.values()) + self.window
+        for i in range(0, len(wanted), _BAND_CHUNK):
+            res = await self.session.execute(
+                select(
+                    ArticleBandDB.band, ArticleDB.id, ArticleDB.cluster_id, ArticleDB.title, ArticleDB.published_at
+                )
+                .join(ArticleDB, ArticleDB.id == ArticleBandDB.article_id)
+                .where(ArticleBandDB.band.in_(wanted[i : i + _BAND_CHUNK]))
+                .where(ArticleDB.published_at >= lo)
+                .where(ArticleDB.published_at <= hi)
+            )
+            for band, aid, cluster_id, title, ts in res.all():
+                if aid in words:
+                    continue
+                if aid not in known:
+                    known[aid] = (cluster_id or aid, shingles(title or ""), ts)
+                buckets[band].append(aid)
+
+        assigned: dict[int, int] = {}
+        for aid in sorted(words, key=lambda a: (published[a], a)):
+            best: Optional[int] = None
+            best_score = self.threshold
+            for other in {o for band in keys[aid] for o in buckets.get(band, ())}:
+                cluster_id, other_words, ts = known[other]
+                if abs(ts - published[aid]) > self.window:
+                    continue
+                score = jaccard(words[aid], other_words)
+                if score > best_score or (score == best_score and (best is None or other < best)):
+                    best, best_score = other, score
+            assigned[aid] = known[best][0] if best is not None else aid
+            known[aid] = (assigned[aid], words[aid], published[aid])
+            for band in keys[aid]:
+                buckets[band].append(aid)
+
+        rows = [{"band": band, "article_id": aid} for aid, values in keys.items() for band in values]
+        if rows:
+            stmt = dialect_insert(self.session, ArticleBandDB.__table__).on_conflict_do_nothing()
+            await self.session.execute(stmt, rows)
+        await self.session.execute(
+            update(ArticleDB), [{"id": aid, "cluster_id": cluster_id} for aid, cluster_id in assigned.items()]
+        )
+        return assigned
@@ -0,0 +1,82 @@
+"""Репозиторий кэша результатов сбора (collections)."""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.db.tables import CollectionDB
+
+DateRange = tuple[date, date]
+
+
+class CollectionsRepo:
+    """Какие отрезки дат по какому запросу уже собраны и в какой заявке лежат."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    @staticmethod
+    def key_for(query: str, language: str | None, sources_csv: str | None) -> str:
+        """Контентный ключ сбора: регистр, пробелы и порядок источников не важны."""
+        norm_query = " ".join(query.lower().split())
+        sources = ",".join(sorted(s.strip() for s in (sources_csv or "").split(",") if s.strip()))
+        raw = f"{norm_query}|{language or ''}|{sources}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    async def covering(self, key: str, start: date, end: date, fresh_since: datetime) -> list[CollectionDB]:
+        """Свежие отрезки с тем же ключом, пересекающие [start, end]; новые — первыми."""
+        res = await self.session.execute(
+            select(CollectionDB)
+            .where(CollectionDB.key == key)
+            .where(CollectionDB.created_at >= fresh_since)
+            .where(CollectionDB.period_start <= end)
+            .where(CollectionDB.period_end >= start)
+            .order_by(CollectionDB.created_at.desc())
+        )
+        return list(res.scalars().all())
+
+    async def record(self, key: str, start: date, end: date, request_id: str) -> CollectionDB:
+        """Запомнить, что отрезок собран и лежит в заявке ``request_id``."""
+        row = CollectionDB(key=key, period_start=start, period_end=end, request_id=request_id)
+        self.session.add(row)
+        await self.session.flush()
+        return row
+
+    async def forget(self, request_id: str) -> None:
+        """Забыть отрезки, собранные в заявке (перед повторным сбором)."""
+        await self.session.execute(delete(CollectionDB).where(CollectionDB.request_id == request_id))
+
+    @staticmethod
+    def plan(
+        start: date, end: date, segments: Sequence[CollectionDB]
+    ) -> tuple[list[tuple[CollectionDB, date, date]], list[DateRange]]:
+        """Разложить [start, end] на переиспользуемые куски и недостающие дыры.
+
+        Куски не пересекаются (каждый день берётся из одного, самого свежего
+        отрезка), поэтому копирование не создаёт дублей.
+
+        :return: (список (отрезок, с, по) для копирования, список дыр (с, по) для сбора)
+        """
+        gaps: list[DateRange] = [(start, end)]
+        reuse: list[tuple[CollectionDB, date, date]] = []
+        for seg in segments:
+            next_gaps: list[DateRange] = []
+            for g_start, g_end in gaps:
+                lo, hi = max(g_start, seg.period_start), min(g_end, seg.period_end)
+                if lo > hi:
+                    next_gaps.append((g_start, g_end))
+                    continue
+                reuse.append((seg, lo, hi))
+                if g_start < lo:
+                    next_gaps.append((g_start, lo - timedelta(days=1)))
+                if hi < g_end:
+                    next_gaps.append((hi + timedelta(days=1), g_end))
+            gaps = next_gaps
+            if not gaps:
+                break
+        return reuse, sorted(gaps)
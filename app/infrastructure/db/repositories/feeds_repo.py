@@ -0,0 +1,58 @@
+"""Репозиторий состояний лент RSS/Atom (валидаторы условного GET)."""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.utctime import utcnow
+from app.infrastructure.db.tables import FeedStateDB
+from app.infrastructure.db.upsert import dialect_insert
+
+
+class FeedsRepo:
+    """ETag / Last-Modified последнего успешного опроса ленты для заявки."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def validators(self, request_id: str, feeds: Iterable[str]) -> dict[str, tuple[Optional[str], Optional[str]]]:
+        """{лента: (etag, last_modified)} для известных лент."""
+        feeds = list(feeds)
+        if not feeds:
+            return {}
+        res = await self.session.execute(
+            select(FeedStateDB.feed_url, FeedStateDB.etag, FeedStateDB.last_modified)
+            .where(FeedStateDB.request_id == request_id)
+            .where(FeedStateDB.feed_url.in_(feeds))
+        )
+        return {url: (etag, modified) for url, etag, modified in res.all()}
+
+    async def save(self, request_id: str, results: Iterable) -> None:
+        """Запомнить валидаторы по итогам опроса (``FeedResult``); ленты без валидаторов пропускаются."""
+        now = utcnow()
+        values = [
+            {
+                "request_id": request_id,
+                "feed_url": r.url,
+                "etag": r.etag,
+                "last_modified": r.last_modified,
+                "checked_at": now,
+            }
+            for r in results
+            if r.etag or r.last_modified
+        ]
+        if not values:
+            return
+        stmt = dialect_insert(self.session, FeedStateDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FeedStateDB.request_id, FeedStateDB.feed_url],
+            set_={
+                "etag": stmt.excluded.etag,
+                "last_modified": stmt.excluded.last_modified,
+                "checked_at": stmt.excluded.checked_at,
+            },
+        )
+        await self.session.execute(stmt)
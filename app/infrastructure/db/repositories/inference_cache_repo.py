@@ -0,0 +1,66 @@
+"""Репозиторий кэша результатов моделей (inference_cache)."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Iterable, Mapping
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.utctime import utcnow
+from app.infrastructure.db.tables import InferenceCacheDB
+from app.infrastructure.db.upsert import dialect_insert
+
+# Ключей в одном IN (...)
+_KEY_CHUNK = 500
+
+
+class InferenceCacheRepo:
+    """Результаты модели по ключу (вид, хэш версии модели и текста)."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def get_many(self, kind: str, keys: Iterable[str]) -> dict[str, Any]:
+        """{ключ: результат} для найденных ключей."""
+        keys = list(keys)
+        found: dict[str, Any] = {}
+        for i in range(0, len(keys), _KEY_CHUNK):
+            res = await self.session.execute(
+                select(InferenceCacheDB.text_hash, InferenceCacheDB.value)
+                .where(InferenceCacheDB.kind == kind)
+                .where(InferenceCacheDB.text_hash.in_(keys[i : i + _KEY_CHUNK]))
+            )
+            found.update(res.all())
+        return found
+
+    async def put_many(self, kind: str, version: str, values: Mapping[str, Any]) -> None:
+        """Сохранить результаты; уже сохранённые ключи не перезаписываются."""
+        if not values:
+            return
+        now = utcnow()
+        stmt = dialect_insert(self.session, InferenceCacheDB.__table__).on_conflict_do_nothing()
+        await self.session.execute(
+            stmt,
+            [
+                {"kind": kind, "text_hash": key, "model_version": version, "value": value, "created_at": now}
+                for key, value in values.items()
+            ],
+        )
+
+    async def purge_stale(self, kind: str, version: str, older_than_days: int, limit: int) -> int:
+        """Удалить до ``limit`` результатов других версий модели старше ``older_than_days``; вернуть число строк."""
+        doomed = (
+            select(InferenceCacheDB.text_hash)
+            .where(InferenceCacheDB.kind == kind)
+            .where(InferenceCacheDB.model_version != version)
+            .where(InferenceCacheDB.created_at < utcnow() - timedelta(days=older_than_days))
+            .limit(limit)
+        )
+        res = await self.session.execute(
+            delete(InferenceCacheDB)
+            .where(InferenceCacheDB.kind == kind)
+            .where(InferenceCacheDB.text_hash.in_(doomed))
+        )
+        return res.rowcount or 0
@@ -0,0 +1,313 @@
+"""Репозиторий очереди фоновых задач (jobs)."""
+
+from __future__ import annotations
+
+import math
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.utctime import utcnow
+from app.infrastructure.db.tables import JobDB
+
+# Класс приоритета заявок без владельца (гости, демо)
+GUEST_CLASS = "guest"
+# Сколько последних задач берётся для средних времён ожидания и выполнения
+_STATS_SAMPLE = 200
+
+
+def _aware(dt: datetime) -> datetime:
+    """SQLite отдаёт наивные даты (в UTC) — приводим к aware для арифметики."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
+
+
+class JobsRepo:
+    """Постановка, захват и завершение задач.
+
+    Захват — условный UPDATE «если задачу ещё никто не взял»: он атомарен
+    и на SQLite, и на PostgreSQL, поэтому несколько воркеров не получат
+    одну задачу дважды. Задача в статусе running с истёкшим ``locked_until``
+    (воркер умер или завис) снова становится доступной — visibility timeout.
+
+    Порядок захвата задаёт планировщик: очки задачи = вес её класса
+    (тариф, у гостей — минимальный) + время ожидания / ``scheduler_aging_seconds``,
+    так что гости не голодают вечно. Одновременно выполняется не больше
+    ``scheduler_max_running`` задач и не больше ``scheduler_max_per_owner``
+    задач одного владельца (гости делят один лимит). Лимиты считаются по
+    таблице jobs и при одновременном захвате несколькими воркерами могут
+    быть превышены на единицы.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        *,
+        delay_seconds: float = 0,
+        max_attempts: Optional[int] = None,
+        priority_class: str = GUEST_CLASS,
+        owner_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+    ) -> JobDB:
+        """Поставить задачу в очередь (коммит — на вызывающей стороне)."""
+        job = JobDB(
+            kind=kind,
+            payload=payload,
+            status="queued",
+            attempts=0,
+            max_attempts=max_attempts or settings.job_max_attempts,
+            run_after=utcnow() + timedelta(seconds=delay_seconds),
+            priority_class=priority_class,
+            owner_id=owner_id,
+            request_id=request_id,
+        )
+        self.session.add(job)
+        await self.session.flush()
+        return job
+
+    async def claim(self, worker_id: str, limit: int, visibility_timeout: int) -> list[JobDB]:
+        """Забрать до ``limit`` готовых к выполнению задач в порядке планировщика."""
+        now = utcnow()
+        running = await self._running_by_owner(now)
+        limit = min(limit, settings.scheduler_max_running - sum(running.values()))
+        if limit <= 0:
+            await self.session.commit()
+            return []
+
+        available = self._available(now)
+        claimed: list[int] = []
+        capped = {owner for owner, n in running.items() if n >= settings.scheduler_max_per_owner}
+        for job_id, owner_key in await self._candidates(now, limit, capped):
+            if running[owner_key] >= settings.scheduler_max_per_owner:
+                continue
+            upd = await self.session.execute(
+                update(JobDB)
+                .where(JobDB.id == job_id)
+                .where(available)
+                .values(
+                    status="running",
+                    attempts=JobDB.attempts + 1,
+                    locked_by=worker_id,
+                    locked_until=now + timedelta(seconds=visibility_timeout),
+                    started_at=now,
+                )
+            )
+            if upd.rowcount == 1:
+                claimed.append(job_id)
+                running[owner_key] += 1
+            if len(claimed) >= limit:
+                break
+        await self.session.commit()
+        if not claimed:
+            return []
+        res = await self.session.execute(select(JobDB).where(JobDB.id.in_(claimed)))
+        return list(res.scalars().all())
+
+    async def queue_stats(self) -> dict:
+        """Глубина очереди и ожидание по классам приоритета (для /metrics/queue)."""
+        now = utcnow()
+        out: dict[str, dict] = {}
+
+        def bucket(cls: str) -> dict:
+            return out.setdefault(
+                cls,
+                {
+                    "weight": self.weight(cls),
+                    "queued": 0,
+                    "running": 0,
+                    "oldest_wait_seconds": 0.0,
+                    "avg_wait_seconds": None,
+                },
+            )
+
+        res = await self.session.execute(
+            select(JobDB.priority_class, JobDB.status, func.count(), func.min(JobDB.run_after))
+            .where(JobDB.status.in_(("queued", "running")))
+            .group_by(JobDB.priority_class, JobDB.status)
+        )
+        for cls, status, n, oldest in res.all():
+            item = bucket(cls)
+            item[status] = n
+            if status == "queued" and oldest is not None:
+                item["oldest_wait_seconds"] = round(max(0.0, (now - _aware(oldest)).total_seconds()), 1)
+
+        # среднее ожидание: created_at -> started_at у недавно запущенных задач
+        res = await self.session.execute(
+            select(JobDB.priority_class, JobDB.created_at, JobDB.started_at)
+            .where(JobDB.started_at.is_not(None))
+            .order_by(JobDB.started_at.desc())
+            .limit(_STATS_SAMPLE)
+        )
+        waits: dict[str, list[float]] = {}
+        for cls, created, started in res.all():
+            waits.setdefault(cls, []).append((_aware(started) - _aware(created)).total_seconds())
+        for cls, values in waits.items():
+            bucket(cls)["avg_wait_seconds"] = round(sum(values) / len(values), 1)
+        return out
+
+    async def queue_eta(self, request_id: str) -> Optional[int]:
+        """ETA заявки, чья задача ещё в очереди: ожидание слота + время выполнения.
+
+        Впереди считаются задачи классов с большим весом и задачи того же
+        класса, вставшие раньше; старение не учитывается (оценка сверху).
+
+        :return: секунды или None, если задачи заявки в очереди нет.
+        """
+        res = await self.session.execute(
+            select(JobDB)
+            .where(JobDB.request_id == request_id, JobDB.status == "queued")
+            .order_by(JobDB.id.desc())
+            .limit(1)
+        )
+        job = res.scalar_one_or_none()
+        if job is None:
+            return None
+        now = utcnow()
+        weight = self.weight(job.priority_class)
+        higher = [cls for cls, w in settings.scheduler_weights.items() if w > weight]
+        ahead = or_(
+            JobDB.priority_class.in_(higher),
+            and_(JobDB.priority_class == job.priority_class, JobDB.run_after < job.run_after),
+        )
+        queued_ahead = await self._count(and_(JobDB.status == "queued", ahead))
+        running = sum((await self._running_by_owner(now)).values())
+
+        owner_cond = JobDB.owner_id == job.owner_id if job.owner_id else JobDB.owner_id.is_(None)
+        owner_ahead = await self._count(
+            and_(
+                owner_cond,
+                or_(
+                    and_(JobDB.status == "running", JobDB.locked_until >= now),
+                    and_(JobDB.status == "queued", ahead),
+                ),
+            )
+        )
+
+        duration = await self.avg_duration(job.kind)
+        # очередь разбирается «волнами» по числу слотов: глобальных и владельца
+        waves = max(
+            (running + queued_ahead) / settings.scheduler_max_running,
+            owner_ahead // settings.scheduler_max_per_owner,
+        )
+        delay = max(0.0, (_aware(job.run_after) - now).total_seconds())
+        return math.ceil(delay + waves * duration + duration)
+
+    async def avg_duration(self, kind: str) -> float:
+        """Средняя длительность недавно выполненных задач данного вида (секунды)."""
+        res = await self.session.execute(
+            select(JobDB.started_at, JobDB.updated_at)
+            .where(JobDB.kind == kind, JobDB.status == "done", JobDB.started_at.is_not(None))
+            .order_by(JobDB.updated_at.desc())
+            .limit(_STATS_SAMPLE)
+        )
+        values = [(_aware(done) - _aware(started)).total_seconds() for started, done in res.all()]
+        return sum(values) / len(values) if values else settings.scheduler_default_job_seconds
+
+    @staticmethod
+    def weight(priority_class: str) -> float:
+        """Вес класса приоритета; неизвестный класс приравнивается к гостям."""
+        weights = settings.scheduler_weights
+        return weights.get(priority_class, weights.get(GUEST_CLASS, 0.0))
+
+    @staticmethod
+    def _available(now: datetime):
+        return or_(
+            and_(JobDB.status == "queued", JobDB.run_after <= now),
+            and_(JobDB.status == "running", JobDB.locked_until < now),
+        )
+
+    async def _running_by_owner(self, now: datetime) -> Counter:
+        """Выполняющиеся сейчас задачи (с живой арендой) по владельцам."""
+        res = await self.session.execute(
+            select(JobDB.owner_id, func.count())
+            .where(JobDB.status == "running", JobDB.locked_until >= now)
+            .group_by(JobDB.owner_id)
+        )
+        return Counter({owner or GUEST_CLASS: n for owner, n in res.all()})
+
+    async def _candidates(self, now: datetime, limit: int, capped: set[str]) -> list[tuple[int, str]]:
+        """Старейшие доступные задачи каждого класса, по убыванию очков планировщика.
+
+        Владельцы, уже упёршиеся в лимит, отсекаются в SQL — иначе пачка
+        задач одного владельца заслонила бы остальных в своём классе.
+        """
+        available = self._available(now)
+        owners = [owner for owner in capped if owner != GUEST_CLASS]
+        if owners:
+            available = and_(available, or_(JobDB.owner_id.is_(None), JobDB.owner_id.not_in(owners)))
+        if GUEST_CLASS in capped:
+            available = and_(available, JobDB.owner_id.is_not(None))
+        known = list(settings.scheduler_weights)
+        # запас на задачи владельцев, упёршихся в лимит
+        per_class = limit * (settings.scheduler_max_per_owner + 2)
+        scored: list[tuple[float, int, str]] = []
+        for cond in [JobDB.priority_class == cls for cls in known] + [JobDB.priority_class.not_in(known)]:
+            res = await self.session.execute(
+                select(JobDB.id, JobDB.priority_class, JobDB.owner_id, JobDB.run_after)
+                .where(available, cond)
+                .order_by(JobDB.run_after)
+                .limit(per_class)
+            )
+            for job_id, cls, owner, run_after in res.all():
+                waited = max(0.0, (now - _aware(run_after)).total_seconds())
+                score = self.weight(cls) + waited / settings.scheduler_aging_seconds
+                scored.append((score, job_id, owner or GUEST_CLASS))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(job_id, owner_key) for _, job_id, owner_key in scored]
+
+    async def _count(self, cond) -> int:
+        return (await self.session.execute(select(func.count()).select_from(JobDB).where(cond))).scalar_one()
+
+    async def heartbeat(self, job_id: int, worker_id: str, visibility_timeout: int) -> bool:
+        """Продлить аренду задачи; False — задачу уже перехватил другой воркер."""
+        res = await self.session.execute(
+            update(JobDB)
+            .where(self._owned(job_id, worker_id))
+            .values(locked_until=utcnow() + timedelta(seconds=visibility_timeout))
+        )
+        return res.rowcount == 1
+
+    async def complete(self, job_id: int, worker_id: str) -> bool:
+        """Отметить задачу выполненной; False — аренда уже у другого воркера (задача не тронута)."""
+        res = await self.session.execute(
+            update(JobDB)
+            .where(self._owned(job_id, worker_id))
+            .values(status="done", locked_until=None, last_error=None)
+        )
+        return res.rowcount == 1
+
+    async def fail(self, job: JobDB, error: str, worker_id: str) -> bool:
+        """Зафиксировать ошибку: повтор с экспоненциальной задержкой или окончательный провал.
+
+        Задачу, аренду которой уже перехватил другой воркер, не трогает.
+
+        :return: True, если попытки исчерпаны и задача помечена failed.
+        """
+        dead = job.attempts >= job.max_attempts
+        values: dict = {"locked_until": None, "last_error": error[-4000:]}
+        if dead:
+            values["status"] = "failed"
+        else:
+            values["status"] = "queued"
+            values["run_after"] = utcnow() + timedelta(seconds=self.backoff(job.attempts))
+        res = await self.session.execute(update(JobDB).where(self._owned(job.id, worker_id)).values(**values))
+        return dead and res.rowcount == 1
+
+    @staticmethod
+    def _owned(job_id: int, worker_id: str):
+        """Задача выполняется воркером ``worker_id`` (его аренду никто не перехватил)."""
+        return and_(JobDB.id == job_id, JobDB.locked_by == worker_id, JobDB.status == "running")
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Задержка перед повтором: base * 2^(n-1) с джиттером, не больше максимума."""
+        delay = settings.job_retry_base_seconds * 2 ** max(0, attempts - 1)
+        return min(delay, settings.job_retry_max_seconds) * random.uniform(0.8, 1.2)
@@ -2,13 +2,38 @@
 
 from __future__ import annotations
 
-from datetime import datetime
-from typing import Optional
+import base64
+import json
+import secrets
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import AsyncIterable, AsyncIterator, Iterable, Literal, Mapping, Optional, Sequence
 
-from sqlalchemy import Select, asc, desc, func, select
+from sqlalchemy import Select, and_, asc, delete, desc, func, insert, literal, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.db.tables import PublicationDB
+from app.core.config import settings
+from app.core.urls import url_hash
+from app.infrastructure.cache.redis_client import get_cache
+from app.infrastructure.cache.totals_cache import totals_cache
+from app.infrastructure.db.repositories.clusters_repo import ClustersRepo
+from app.infrastructure.db.repositories.stats_repo import PubFacts, StatsRepo
+from app.infrastructure.db.session import after_commit
+from app.infrastructure.db.tables import ArticleDB, PublicationDB, RequestPublicationDB
+from app.infrastructure.db.upsert import dialect_insert
+
+TotalKind = Literal["exact", "cached", "estimated"]
+# Поля статьи, которые принимает массовая загрузка (url_hash считается из url)
+_ARTICLE_COLUMNS = ("title", "url", "published_at", "source", "lang", "sentiment", "entities")
+
+
+def _copy_value(column: str, value):
+    """Значение для COPY: JSON — строкой, даты — с часовым поясом."""
+    if column == "entities":
+        return None if value is None else json.dumps(value, ensure_ascii=False)
+    if column == "published_at" and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 class PublicationsRepo:
@@ -17,34 +42,348 @@ class PublicationsRepo:
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def seed_fake(self, request_id: str, count: int = 16) -> None:
-        """Сгенерировать фейковые публикации (эмуляция Scrapy)."""
+    async def seed_fake(
+        self,
+        request_id: str,
+        count: int = 16,
+        period_start: Optional[date] = None,
+        period_end: Optional[date] = None,
+        *,
+        since: Optional[datetime] = None,
+        sources: Sequence[str] = ("rss", "web"),
+    ) -> None:
+        """Сгенерировать фейковые публикации (эмуляция Scrapy).
+
+        С ``period_start``/``period_end`` даты публикаций ложатся в этот
+        отрезок (включительно), со ``since`` — строго после него и до
+        текущего момента (дозагрузка), иначе — в последние 20 дней.
+        """
         import random
 
-        items = []
-        for i in range(count):
-            dt = datetime.utcnow() - func.random() * 10000  # типовой приём не сработает: fallback
-            # из-за func.random в python — сделаем без SQL:
-            from datetime import timedelta
-
-            dt_py = datetime.utcnow() - timedelta(days=random.randint(0, 20), hours=random.randint(0, 23))
-            items.append(
-                PublicationDB(
-                    request_id=request_id,
-                    title=f"Публикация №{i + 1} для {request_id}",
-                    url=f"https://news.example/{request_id}/{i}",
-                    published_at=dt_py,
-                    source=random.choice(["rss", "web"]),
-                    lang=random.choice(["ru", "en"]),
-                    sentiment=random.choice([None, "neg", "neu", "pos"]),
-                    entities=None,
+        if since is not None:
+            lo = since + timedelta(seconds=1)
+            span = max(1.0, (datetime.utcnow() - lo).total_seconds())
+        elif period_start is not None and period_end is not None:
+            lo = datetime.combine(period_start, time.min)
+            span = (datetime.combine(period_end, time.min) + timedelta(days=1) - lo).total_seconds()
+        else:
+            lo = datetime.utcnow() - timedelta(days=20)
+            span = timedelta(days=20).total_seconds()
+
+        batch = secrets.token_hex(4)
+        items = [
+            {
+                "title": f"Публикация №{i + 1} для {request_id}",
+                "url": f"https://news.example/{request_id}/{batch}/{i}",
+                "published_at": lo + timedelta(seconds=random.uniform(0, span - 1)),
+                "source": random.choice(sources),
+                "lang": random.choice(["ru", "en"]),
+                "sentiment": None,  # оценит сервис тональности
+                "entities": None,
+            }
+            for i in range(count)
+        ]
+        await self.ingest(request_id, items)
+
+    async def ingest(
+        self,
+        request_id: str,
+        rows: Iterable[Mapping] | AsyncIterable[Mapping],
+        *,
+        batch_size: Optional[int] = None,
+    ) -> int:
+        """Массово загрузить собранные статьи и привязать их к заявке.
+
+        Строки идут пачками по ``batch_size`` мимо ORM: на PostgreSQL — COPY
+        во временную таблицу и ``INSERT … SELECT … ON CONFLICT DO NOTHING``,
+        на SQLite — Core executemany с тем же ``ON CONFLICT``. Статья с уже
+        известным каноническим URL не дублируется: заявка получает ссылку на
+        существующую строку (её тональность и сущности уже посчитаны).
+        Агрегаты заявки обновляются только по новым связям. Коммит — на
+        вызывающей стороне.
+
+        :param rows: словари с полями title, url, published_at, source, lang,
+            sentiment, entities (синхронный или асинхронный итератор).
+        :return: число новых публикаций заявки (дубли не считаются).
+        """
+        batch_size = batch_size or settings.ingest_batch_size
+        ingested = 0
+        batch: list[Mapping] = []
+        if isinstance(rows, AsyncIterable):
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    ingested += await self._ingest_batch(request_id, batch)
+                    batch = []
+        else:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    ingested += await self._ingest_batch(request_id, batch)
+                    batch = []
+        if batch:
+            ingested += await self._ingest_batch(request_id, batch)
+        if ingested:
+            self._invalidate(request_id)
+        return ingested
+
+    async def _ingest_batch(self, request_id: str, items: Sequence[Mapping]) -> int:
+        """Одна пачка: статьи (без дублей по url_hash) + новые связи + агрегаты."""
+        by_hash = {url_hash(item["url"]): item for item in items}
+        articles = [
+            {**{col: item.get(col) for col in _ARTICLE_COLUMNS}, "url_hash": h, "lang": item.get("lang") or "ru"}
+            for h, item in by_hash.items()
+        ]
+        if self.session.bind.dialect.name == "postgresql":
+            await self._copy_articles(articles)
+        else:
+            # Core-таблица, а не ORM-сущность: обычный executemany без bulk-ORM
+            stmt = dialect_insert(self.session, ArticleDB.__table__).on_conflict_do_nothing(
+                index_elements=[ArticleDB.url_hash]
+            )
+            await self.session.execute(stmt, articles)
+
+        res = await self.session.execute(
+            select(
+                ArticleDB.id,
+                ArticleDB.cluster_id,
+                ArticleDB.title,
+                ArticleDB.published_at,
+                ArticleDB.source,
+                ArticleDB.lang,
+                ArticleDB.sentiment,
+            ).where(ArticleDB.url_hash.in_(list(by_hash)))
+        )
+        found: dict[int, PubFacts] = {}
+        stories: dict[int, int] = {}
+        unclustered = []
+        for aid, cluster_id, title, *facts in res.all():
+            found[aid] = PubFacts(*facts)
+            stories[aid] = cluster_id or aid
+            if cluster_id is None:
+                unclustered.append((aid, title, facts[0]))
+        if unclustered and settings.dedup_enabled:
+            stories.update(await ClustersRepo(self.session).assign(unclustered))
+        res = await self.session.execute(
+            select(RequestPublicationDB.article_id)
+            .where(RequestPublicationDB.request_id == request_id)
+            .where(RequestPublicationDB.article_id.in_(list(found)))
+        )
+        linked = set(res.scalars().all())
+        new = {aid: facts for aid, facts in found.items() if aid not in linked}
+        if not new:
+            return 0
+
+        # представитель сюжета — самая ранняя публикация; новая может сменить прежнего
+        earliest: dict[int, int] = {}
+        for aid, facts in new.items():
+            cur = earliest.get(stories[aid])
+            if cur is None or (facts.published_at, aid) < (new[cur].published_at, cur):
+                earliest[stories[aid]] = aid
+        heads = await self._story_heads(request_id, set(earliest))
+        promoted: set[int] = set()
+        demoted: list[int] = []
+        for story, aid in earliest.items():
+            head = heads.get(story)
+            if head is None or (new[aid].published_at, aid) < (head[1], head[0]):
+                promoted.add(aid)
+                if head is not None:
+                    demoted.append(head[0])
+        if demoted:
+            await self.session.execute(
+                update(RequestPublicationDB)
+                .where(RequestPublicationDB.request_id == request_id)
+                .where(RequestPublicationDB.article_id.in_(demoted))
+                .values(story_head=False)
+            )
+        stmt = dialect_insert(self.session, RequestPublicationDB.__table__).on_conflict_do_nothing()
+        await self.session.execute(
+            stmt,
+            [
+                {
+                    "request_id": request_id,
+                    "article_id": aid,
+                    "published_at": facts.published_at,
+                    "story_id": stories[aid],
+                    "story_head": aid in promoted,
+                }
+                for aid, facts in new.items()
+            ],
+        )
+        await StatsRepo(self.session).add_publications(
+            request_id, new.values(), stories=len(earliest) - len(heads)
+        )
+        return len(new)
+
+    async def _story_heads(self, request_id: str, story_ids: set[int]) -> dict[int, tuple[int, datetime]]:
+        """Представители сюжетов ``story_ids`` в заявке: {сюжет: (id статьи, published_at)}."""
+        res = await self.session.execute(
+            select(RequestPublicationDB.story_id, RequestPublicationDB.article_id, RequestPublicationDB.published_at)
+            .where(RequestPublicationDB.request_id == request_id)
+            .where(RequestPublicationDB.story_id.in_(story_ids))
+            .where(RequestPublicationDB.story_head.is_(True))
+        )
+        return {story: (aid, published_at) for story, aid, published_at in res.all()}
+
+    async def mark_story_heads(self, request_id: str) -> None:
+        """Заново выбрать представителей всех сюжетов заявки (после массового копирования связей)."""
+        rp = RequestPublicationDB.__table__
+        other = rp.alias("other")
+        earlier = (
+            select(other.c.article_id)
+            .where(other.c.request_id == rp.c.request_id)
+            .where(other.c.story_id == rp.c.story_id)
+            .where(
+                or_(
+                    other.c.published_at < rp.c.published_at,
+                    and_(other.c.published_at == rp.c.published_at, other.c.article_id < rp.c.article_id),
                 )
             )
-        self.session.add_all(items)
-        await self.session.flush()
+            .exists()
+        )
+        await self.session.execute(update(rp).where(rp.c.request_id == request_id).values(story_head=~earlier))
 
-    async def list_filtered(
-        self,
+    async def _copy_articles(self, articles: list[dict]) -> None:
+        """PostgreSQL: COPY пачки во временную таблицу и перенос без дублей."""
+        conn = await self.session.connection()
+        raw = (await conn.get_raw_connection()).driver_connection  # asyncpg.Connection
+        await raw.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS articles_stage ("
+            "url_hash text, title text, url text, published_at timestamptz,"
+            " source text, lang text, sentiment text, entities text)"
+        )
+        columns = ("url_hash", *_ARTICLE_COLUMNS)
+        await raw.copy_records_to_table(
+            "articles_stage",
+            records=[tuple(_copy_value(col, a[col]) for col in columns) for a in articles],
+            columns=columns,
+        )
+        await raw.execute(
+            "INSERT INTO articles (url_hash, title, url, published_at, source, lang, sentiment, entities, created_at) "
+            "SELECT url_hash, title, url, published_at, source, lang, sentiment, entities::json, now() "
+            "FROM articles_stage ON CONFLICT (url_hash) DO NOTHING"
+        )
+        await raw.execute("TRUNCATE articles_stage")
+
+    async def watermarks(self, request_id: str, since: Optional[datetime] = None) -> dict[str, datetime]:
+        """Время самой свежей публикации заявки по каждому источнику.
+
+        ``since`` ограничивает проход хвостом по индексу (request_id, published_at).
+        """
+        q = select(PublicationDB.source, func.max(PublicationDB.published_at)).where(
+            PublicationDB.request_id == request_id
+        )
+        if since is not None:
+            q = q.where(PublicationDB.published_at >= since)
+        res = await self.session.execute(q.group_by(PublicationDB.source))
+        return {source: latest for source, latest in res.all() if latest is not None}
+
+    async def copy_from(self, src_request_id: str, dst_request_id: str, start: date, end: date) -> int:
+        """Привязать к заявке статьи другой заявки за [start, end] одним INSERT … SELECT.
+
+        Копируются только связи — сами статьи общие. Агрегаты и
+        представителей сюжетов заявки-получателя не трогает: после всех
+        копирований вызывающая сторона делает ``mark_story_heads`` и
+        ``StatsRepo.rebuild``.
+
+        :return: число новых связей.
+        """
+        cols = ("article_id", "published_at", "story_id")
+        src = (
+            select(literal(dst_request_id), *(getattr(RequestPublicationDB, c) for c in cols))
+            .where(RequestPublicationDB.request_id == src_request_id)
+            .where(RequestPublicationDB.published_at >= datetime.combine(start, time.min))
+            .where(RequestPublicationDB.published_at < datetime.combine(end, time.min) + timedelta(days=1))
+        )
+        stmt = dialect_insert(self.session, RequestPublicationDB).from_select(("request_id", *cols), src)
+        res = await self.session.execute(stmt.on_conflict_do_nothing())
+        self._invalidate(dst_request_id)
+        return res.rowcount or 0
+
+    async def delete_for_request(self, request_id: str) -> int:
+        """Отвязать публикации от заявки (агрегаты пересчитывает вызывающая сторона).
+
+        Статьи остаются в общем хранилище — на них могут ссылаться другие заявки.
+
+        :return: число удалённых связей.
+        """
+        res = await self.session.execute(
+            delete(RequestPublicationDB).where(RequestPublicationDB.request_id == request_id)
+        )
+        if res.rowcount:
+            self._invalidate(request_id)
+        return res.rowcount or 0
+
+    async def set_sentiments(self, sentiments: Mapping[int, Optional[str]]) -> None:
+        """Массово записать тональность статей и поправить агрегаты всех заявок с ними.
+
+        Тональность хранится у статьи, поэтому одна оценка видна во всех
+        заявках, куда статья попала.
+
+        :param sentiments: {id статьи (= id публикации): 'neg' | 'neu' | 'pos' | None}.
+        """
+        if not sentiments:
+            return
+        res = await self.session.execute(
+            select(
+                PublicationDB.request_id,
+                PublicationDB.id,
+                PublicationDB.published_at,
+                PublicationDB.source,
+                PublicationDB.lang,
+                PublicationDB.sentiment,
+            ).where(PublicationDB.id.in_(list(sentiments)))
+        )
+        changes: dict[str, list[tuple[PubFacts, PubFacts]]] = defaultdict(list)
+        found: set[int] = set()
+        for request_id, aid, *facts in res.all():
+            old = PubFacts(*facts)
+            changes[request_id].append((old, old._replace(sentiment=sentiments[aid])))
+            found.add(aid)
+        if not found:
+            return
+        await self.session.execute(
+            update(ArticleDB),
+            [{"id": aid, "sentiment": sentiments[aid]} for aid in found],
+        )
+        stats = StatsRepo(self.session)
+        for request_id, pairs in changes.items():
+            await stats.change_publications(request_id, pairs)
+            self._invalidate(request_id)
+
+    async def set_entities(self, entities: Mapping[int, list[str]]) -> None:
+        """Массово записать сущности статей и сбросить кэши всех заявок с ними.
+
+        Сущности в агрегатах не участвуют (``/analytics/entities`` считается по
+        строкам), поэтому сводки не трогаются.
+
+        :param entities: {id статьи: список названий}; пустой список — «сущностей нет».
+        """
+        if not entities:
+            return
+        await self.session.execute(
+            update(ArticleDB),
+            [{"id": aid, "entities": names} for aid, names in entities.items()],
+        )
+        res = await self.session.execute(
+            select(RequestPublicationDB.request_id)
+            .where(RequestPublicationDB.article_id.in_(list(entities)))
+            .distinct()
+        )
+        for request_id in res.scalars():
+            self._invalidate(request_id)
+
+    def _invalidate(self, request_id: str) -> None:
+        """Сбросить total'ы и кэш ответов заявки после коммита (до него читатель закэшировал бы старое)."""
+
+        async def invalidate() -> None:
+            totals_cache.invalidate(request_id)
+            await get_cache().invalidate(request_id)
+
+        after_commit(self.session, invalidate, key=("publications", request_id))
+
+    @staticmethod
+    def _filtered(
         *,
         request_id: str,
         date_from: Optional[datetime],
@@ -52,11 +391,16 @@ class PublicationsRepo:
         sources: Optional[set[str]],
         sentiments: Optional[set[str]],
         langs: Optional[set[str]],
-        offset: int,
-        limit: int,
-        sort: str,
-    ) -> dict:
-        """Вернуть публикации по фильтрам и пагинации."""
+        collapse: bool = False,
+    ) -> Select:
+        """Базовый SELECT публикаций заявки с общими фильтрами.
+
+        ``collapse=True`` оставляет только представителей сюжетов — самую
+        раннюю публикацию каждого сюжета в заявке (флаг ``story_head`` ведётся
+        при загрузке, так что оконной функции по всей заявке нет). Фильтры
+        применяются к представителю: сюжет, чья первая публикация под них не
+        подходит, скрывается целиком.
+        """
         q: Select = select(PublicationDB).where(PublicationDB.request_id == request_id)
 
         if date_from:
@@ -70,16 +414,175 @@ class PublicationsRepo:
             q = q.where(PublicationDB.sentiment.in_(sentiments))
         if langs:
             q = q.where(PublicationDB.lang.in_(langs))
+        if collapse:
+            q = q.where(PublicationDB.story_head.is_(True))
+        return q
+
+    async def list_filtered(
+        self,
+        *,
+        request_id: str,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        sources: Optional[set[str]],
+        sentiments: Optional[set[str]],
+        langs: Optional[set[str]],
+        offset: int,
+        limit: int,
+        sort: str,
+        cursor: Optional[str] = None,
+        approximate_total: bool = False,
+        final: bool = False,
+        collapse: bool = False,
+    ) -> dict:
+        """Вернуть публикации по фильтрам и пагинации.
+
+        При сортировке по ``published_at`` без ``offset`` (или с ``cursor``)
+        страница выбирается keyset-методом по ``(published_at, id)``: запрос
+        «прыгает» сразу к курсору по индексу, а не пропускает строки.
+        ``next_cursor`` в ответе — курсор следующей страницы или None.
+
+        Total берётся из кэша по (request_id, фильтры); ``final=True`` (заявка
+        READY) кэширует его бессрочно. ``approximate_total`` на PostgreSQL
+        подставляет оценку планировщика вместо ``count(*)``. Откуда взят
+        total, сообщает ``total_kind``: exact / cached / estimated.
+
+        ``collapse=True`` — по одной публикации на сюжет (total — число сюжетов).
+
+        :raises ValueError: если курсор повреждён.
+        """
+        q = self._filtered(
+            request_id=request_id,
+            date_from=date_from,
+            date_to=date_to,
+            sources=sources,
+            sentiments=sentiments,
+            langs=langs,
+            collapse=collapse,
+        )
+
+        # total
+        signature = totals_cache.signature(
+            date_from=date_from,
+            date_to=date_to,
+            sources=sources,
+            sentiments=sentiments,
+            langs=langs,
+            collapse=collapse,
+        )
+        total, total_kind = await self._total(q, request_id, signature, approximate_total, final)
 
-        # сортировка
+        # сортировка: id — тай-брейкер, чтобы порядок (и курсор) был однозначным
         dir_desc = sort.startswith("-")
         key = sort.lstrip("-")
+        order = desc if dir_desc else asc
+        keyset = key == "published_at" and (cursor is not None or not offset)
         if key == "published_at":
-            q = q.order_by(desc(PublicationDB.published_at) if dir_desc else asc(PublicationDB.published_at))
+            q = q.order_by(order(PublicationDB.published_at), order(PublicationDB.id))
+
+        page_size = min(limit, 100)
+        if not keyset:
+            rows = (await self.session.execute(q.offset(offset).limit(page_size))).scalars().all()
+            return {"total": total, "total_kind": total_kind, "items": rows, "next_cursor": None}
+
+        if cursor is not None:
+            q = q.where(self._seek(self.decode_cursor(cursor), dir_desc))
+
+        # page: берём на одну строку больше, чтобы понять, есть ли продолжение
+        rows = (await self.session.execute(q.limit(page_size + 1))).scalars().all()
+        next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        return {"total": total, "total_kind": total_kind, "items": rows[:page_size], "next_cursor": next_cursor}
+
+    async def stream_filtered(
+        self,
+        *,
+        request_id: str,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        sources: Optional[set[str]],
+        sentiments: Optional[set[str]],
+        langs: Optional[set[str]],
+        sort: str = "-published_at",
+        chunk_size: int = 1000,
+        collapse: bool = False,
+    ) -> AsyncIterator[Sequence[PublicationDB]]:
+        """Отдавать публикации пачками через серверный курсор.
+
+        В памяти одновременно держится не больше ``chunk_size`` строк,
+        поэтому выгрузка любого объёма идёт в постоянной памяти.
+        """
+        q = self._filtered(
+            request_id=request_id,
+            date_from=date_from,
+            date_to=date_to,
+            sources=sources,
+            sentiments=sentiments,
+            langs=langs,
+            collapse=collapse,
+        )
+        order = desc if sort.startswith("-") else asc
+        q = q.order_by(order(PublicationDB.published_at), order(PublicationDB.id))
+
+        result = await self.session.stream_scalars(q.execution_options(yield_per=chunk_size))
+        async for chunk in result.partitions(chunk_size):
+            yield chunk
+
+    async def _total(
+        self, q: Select, request_id: str, signature: str, approximate: bool, final: bool
+    ) -> tuple[int, TotalKind]:
+        """Посчитать total с учётом кэша и режима оценки."""
+        cached = totals_cache.get(request_id, signature)
+        if cached is not None:
+            return cached, "cached"
+
+        if approximate and self.session.bind.dialect.name == "postgresql":
+            return await self._estimate_rows(q), "estimated"
 
-        # total
         total = (await self.session.execute(select(func.count()).select_from(q.subquery()))).scalar_one()
+        ttl = settings.totals_cache_ready_ttl_seconds if final else settings.totals_cache_ttl_seconds
+        totals_cache.set(request_id, signature, total, ttl)
+        return total, "exact"
+
+    async def _estimate_rows(self, q: Select) -> int:
+        """Оценка числа строк планировщиком PostgreSQL (EXPLAIN без выполнения)."""
+        conn = await self.session.connection()
+        # IN (...) фильтров раскрывается сразу: иначе в SQL остаётся __[POSTCOMPILE_*],
+        # а positiontup не совпадает с параметрами
+        compiled = q.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+        params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        res = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+        plan = res.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    def _seek(key: tuple[datetime, int], dir_desc: bool):
+        """Условие «строго после курсора» в порядке сортировки по (published_at, id)."""
+        published_at, pub_id = key
+        if dir_desc:
+            return or_(
+                PublicationDB.published_at < published_at,
+                and_(PublicationDB.published_at == published_at, PublicationDB.id < pub_id),
+            )
+        return or_(
+            PublicationDB.published_at > published_at,
+            and_(PublicationDB.published_at == published_at, PublicationDB.id > pub_id),
+        )
+
+    @staticmethod
+    def encode_cursor(row: PublicationDB) -> str:
+        """Упаковать позицию строки в непрозрачный курсор."""
+        raw = json.dumps([row.published_at.isoformat(), row.id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-        # page
-        rows = (await self.session.execute(q.offset(offset).limit(min(limit, 100)))).scalars().all()
-        return {"total": total, "items": rows}
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        """Распаковать курсор в ключ (published_at, id)."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            published_at, pub_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            dt = datetime.fromisoformat(published_at)
+            return dt, int(pub_id)
+        except (ValueError, TypeError) as exc:
+            raise ValueError("invalid_cursor") from exc
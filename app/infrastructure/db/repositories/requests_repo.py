@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
-from datetime import date, datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta, timezone
+from typing import Mapping, Optional
 
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.infrastructure.cache.pubsub import get_broker
+from app.infrastructure.cache.redis_client import get_cache
+from app.infrastructure.db.session import after_commit
 from app.infrastructure.db.tables import RequestDB
 
 
@@ -28,6 +31,7 @@ class RequestsRepo:
         period_start: date,
         period_end: date,
         applied_promo: Optional[str],
+        tariff_code: Optional[str] = None,
     ) -> RequestDB:
         """Создать новую заявку."""
         row = RequestDB(
@@ -42,6 +46,7 @@ class RequestsRepo:
             progress=0,
             eta_seconds=10,
             applied_promo=applied_promo,
+            tariff_code=tariff_code,
         )
         self.session.add(row)
         await self.session.flush()
@@ -57,17 +62,65 @@ class RequestsRepo:
         res = await self.session.execute(select(RequestDB).where(RequestDB.owner_id == owner_id))
         return list(res.scalars().all())
 
-    async def update_progress(self, request_id: str, step: int) -> None:
-        """Обновить прогресс и ETA (эмуляция фоновой работы)."""
+    async def update_progress(self, request_id: str, step: int, eta_seconds: Optional[int]) -> None:
+        """Обновить прогресс и ETA (ETA считает ProgressTracker по замеренной скорости)."""
         await self.session.execute(
             update(RequestDB)
             .where(RequestDB.id == request_id)
-            .values(progress=step, eta_seconds=max(0, 10 - step // 10))
+            .values(progress=step, eta_seconds=eta_seconds)
         )
+        self._changed(request_id, {"progress": step, "eta_seconds": eta_seconds})
 
-    async def mark_status(self, request_id: str, status: str) -> None:
-        """Изменить статус заявки."""
-        await self.session.execute(update(RequestDB).where(RequestDB.id == request_id).values(status=status))
+    async def mark_status(self, request_id: str, status: str, *, expected: Optional[str] = None) -> bool:
+        """Изменить статус заявки.
+
+        :param expected: менять, только если текущий статус такой (защита от гонок).
+        :return: True, если статус изменён.
+        """
+        q = update(RequestDB).where(RequestDB.id == request_id)
+        if expected is not None:
+            q = q.where(RequestDB.status == expected)
+        res = await self.session.execute(q.values(status=status))
+        if res.rowcount != 1:
+            return False
+        self._changed(request_id, {"status": status})
+        return True
+
+    async def set_watermarks(
+        self, request_id: str, watermarks: Mapping[str, datetime], *, period_end: Optional[date] = None
+    ) -> None:
+        """Запомнить границы собранного по источникам (и, при дозагрузке, новый конец периода)."""
+        values: dict = {"watermarks": {src: dt.isoformat() for src, dt in watermarks.items()}}
+        if period_end is not None:
+            values["period_end"] = period_end
+        await self.session.execute(update(RequestDB).where(RequestDB.id == request_id).values(**values))
+
+    @staticmethod
+    def watermarks(row: RequestDB) -> dict[str, datetime]:
+        """Границы собранного по источникам (наивное UTC, как в публикациях)."""
+        out: dict[str, datetime] = {}
+        for src, raw in (row.watermarks or {}).items():
+            dt = datetime.fromisoformat(raw)
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+            out[src] = dt
+        return out
+
+    def _changed(self, request_id: str, event: dict) -> None:
+        """После коммита сбросить кэш ответов заявки и оповестить подписчиков (SSE).
+
+        До коммита читатель успел бы закэшировать старое состояние под новой
+        версией (для READY — на весь длинный TTL), а подписчик — перечитать его.
+        """
+
+        async def invalidate() -> None:
+            await get_cache().invalidate(request_id)
+
+        async def publish() -> None:
+            await get_broker().publish(request_id, event)
+
+        after_commit(self.session, invalidate, key=("request", request_id))
+        after_commit(self.session, publish)
 
     @staticmethod
     def calc_period(tariff_code: str, start: Optional[date]) -> tuple[date, date]:
@@ -0,0 +1,389 @@
+"""Репозиторий инкрементальных агрегатов заявки (request_stats)."""
+
+from __future__ import annotations
+
+import json
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import chain, combinations
+from typing import Any, Iterable, NamedTuple, Optional
+
+from sqlalchemy import Text, case, cast, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.utctime import utcnow
+from app.infrastructure.db.tables import (
+    PublicationDB,
+    RequestPublicationDB,
+    RequestStatBucketDB,
+    RequestStatsDB,
+    RequestTimeseriesDB,
+)
+from app.infrastructure.db.upsert import dialect_insert
+
+# Измерения сводки: ключ ответа -> (колонка, корзины, которые отдаются всегда).
+# Новое измерение добавляется строкой здесь и не требует лишнего прохода по таблице.
+SUMMARY_DIMENSIONS = {
+    "sources": (PublicationDB.source, ("rss", "web")),
+    "langs": (PublicationDB.lang, ()),
+    "sentiments": (PublicationDB.sentiment, ("neg", "neu", "pos", "unscored")),
+}
+# Корзина для NULL-значений (например, ещё не оценённая тональность)
+UNSCORED = "unscored"
+# Строк в одной пачке при потоковых проходах по publications
+STREAM_CHUNK = 5000
+# Гранулярности, которые хранятся в request_timeseries; неделя собирается из дней
+TIMESERIES_GRANULARITIES = ("hour", "day")
+
+
+class PubFacts(NamedTuple):
+    """Поля публикации, от которых зависят агрегаты."""
+
+    published_at: datetime
+    source: str
+    lang: str
+    sentiment: Optional[str]
+
+
+def bucket_of(value: Optional[str]) -> str:
+    """Имя корзины для значения измерения."""
+    return UNSCORED if value is None else value
+
+
+def truncate(dt: datetime, granularity: str) -> datetime:
+    """Начало часа / дня / недели (понедельник) в UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    dt = dt.replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return dt
+    dt = dt.replace(hour=0)
+    if granularity == "day":
+        return dt
+    if granularity == "week":
+        return dt - timedelta(days=dt.weekday())
+    raise ValueError(f"unknown granularity: {granularity}")
+
+
+class StatsRepo:
+    """Сводка по заявке: инкрементальные обновления, чтение за O(1), пересборка."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def add_publications(self, request_id: str, rows: Iterable[Any], *, stories: Optional[int] = None) -> None:
+        """Учесть новые публикации (ORM-объекты или объекты с теми же атрибутами).
+
+        :param stories: сколько среди них новых для заявки сюжетов; по умолчанию
+            каждая публикация — отдельный сюжет.
+        """
+        total = 0
+        lo: Optional[datetime] = None
+        hi: Optional[datetime] = None
+        deltas: dict[str, Counter] = {name: Counter() for name in SUMMARY_DIMENSIONS}
+        series: Counter = Counter()
+        for row in rows:
+            total += 1
+            lo = row.published_at if lo is None or row.published_at < lo else lo
+            hi = row.published_at if hi is None or row.published_at > hi else hi
+            self._count(row, deltas, series, 1)
+        if not total:
+            return
+        await self._bump_totals(request_id, total, total if stories is None else stories, lo, hi)
+        await self._bump_buckets(request_id, deltas)
+        await self._bump_series(request_id, series)
+
+    async def change_publications(self, request_id: str, changes: Iterable[tuple[PubFacts, PubFacts]]) -> None:
+        """Учесть изменение уже посчитанных публикаций: пары (было, стало).
+
+        Общее число и границы периода не меняются — переезжают только корзины
+        (например, при записи тональности).
+        """
+        deltas: dict[str, Counter] = {name: Counter() for name in SUMMARY_DIMENSIONS}
+        series: Counter = Counter()
+        for old, new in changes:
+            if old != new:
+                self._count(old, deltas, series, -1)
+                self._count(new, deltas, series, 1)
+        await self._bump_buckets(request_id, deltas)
+        await self._bump_series(request_id, series)
+
+    async def timeseries(self, request_id: str, bucket: str) -> list[dict]:
+        """Гистограмма публикаций по времени из предпосчитанных корзин.
+
+        ``bucket``: hour | day | week (неделя складывается из дневных корзин).
+        Возвращаются только непустые корзины, по возрастанию времени.
+        """
+        granularity = "hour" if bucket == "hour" else "day"
+        res = await self.session.execute(
+            select(
+                RequestTimeseriesDB.bucket_start,
+                RequestTimeseriesDB.source,
+                RequestTimeseriesDB.sentiment,
+                RequestTimeseriesDB.count,
+            )
+            .where(RequestTimeseriesDB.request_id == request_id)
+            .where(RequestTimeseriesDB.granularity == granularity)
+        )
+        merged: Counter = Counter()
+        for start, source, sentiment, n in res.all():
+            merged[(truncate(start, bucket), source, sentiment)] += n
+        return self._shape_series(merged)
+
+    async def summary(self, request_id: str) -> dict:
+        """Прочитать готовую сводку (без прохода по publications)."""
+        stats = await self.session.get(RequestStatsDB, request_id)
+        res = await self.session.execute(
+            select(RequestStatBucketDB.dimension, RequestStatBucketDB.bucket, RequestStatBucketDB.count).where(
+                RequestStatBucketDB.request_id == request_id
+            )
+        )
+        return self._shape(
+            total=stats.total if stats else 0,
+            stories=stats.stories if stats else 0,
+            lo=stats.min_published_at if stats else None,
+            hi=stats.max_published_at if stats else None,
+            buckets=((d, b, n) for d, b, n in res.all() if n),
+        )
+
+    async def compute(self, request_id: str) -> dict:
+        """Посчитать сводку по сырым строкам одним GROUP BY по всем измерениям.
+
+        Комбинаций (source, lang, sentiment) единицы, поэтому группировка
+        возвращает несколько строк, а корзины каждого измерения
+        складываются уже в Python. Сюжеты (почти-дубли — один раз) — число
+        представителей сюжетов (``request_publications.story_head``).
+        """
+        names = list(SUMMARY_DIMENSIONS)
+        cols = [SUMMARY_DIMENSIONS[name][0] for name in names]
+        q = (
+            select(*cols, func.count(), func.min(PublicationDB.published_at), func.max(PublicationDB.published_at))
+            .where(PublicationDB.request_id == request_id)
+            .group_by(*cols)
+        )
+        total = 0
+        lo: Optional[datetime] = None
+        hi: Optional[datetime] = None
+        buckets: Counter = Counter()
+        for *values, n, row_lo, row_hi in (await self.session.execute(q)).all():
+            total += n
+            lo = row_lo if lo is None or row_lo < lo else lo
+            hi = row_hi if hi is None or row_hi > hi else hi
+            for name, value in zip(names, values):
+                buckets[(name, bucket_of(value))] += n
+        stories = (
+            await self.session.execute(
+                select(func.count())
+                .select_from(RequestPublicationDB)
+                .where(RequestPublicationDB.request_id == request_id, RequestPublicationDB.story_head.is_(True))
+            )
+        ).scalar_one()
+        return self._shape(
+            total=total, stories=stories, lo=lo, hi=hi, buckets=((d, b, n) for (d, b), n in buckets.items())
+        )
+
+    async def compute_series(self, request_id: str) -> Counter:
+        """Посчитать корзины временного ряда по сырым строкам (потоково, для пересборки)."""
+        series: Counter = Counter()
+        q = select(PublicationDB.published_at, PublicationDB.source, PublicationDB.sentiment).where(
+            PublicationDB.request_id == request_id
+        )
+        result = await self.session.stream(q.execution_options(yield_per=STREAM_CHUNK))
+        async for published_at, source, sentiment in result:
+            for granularity in TIMESERIES_GRANULARITIES:
+                series[(granularity, truncate(published_at, granularity), source, bucket_of(sentiment))] += 1
+        return series
+
+    async def entities(self, request_id: str, top: int, max_per_doc: int) -> dict:
+        """Частые сущности и самые сильные пары совместной встречаемости.
+
+        Один потоковый проход пачками: JSON каждой пачки декодируется одним
+        вызовом ``json.loads``, а подсчёт идёт через ``Counter.update`` по всей
+        пачке сразу (цикл на C). В частоты идут все сущности публикации, в
+        пары — первые ``max_per_doc`` в порядке извлечения, чтобы число пар
+        было ограничено.
+        """
+        singles: Counter = Counter()
+        pairs: Counter = Counter()
+        docs = 0
+        q = select(cast(PublicationDB.entities, Text)).where(PublicationDB.request_id == request_id)
+        result = await self.session.stream_scalars(q.execution_options(yield_per=STREAM_CHUNK))
+        async for chunk in result.partitions(STREAM_CHUNK):
+            raw = [text for text in chunk if text and text != "null"]
+            lists = [list(dict.fromkeys(ents)) for ents in json.loads(f"[{','.join(raw)}]") if ents]
+            docs += len(lists)
+            singles.update(chain.from_iterable(lists))
+            pairs.update(chain.from_iterable(combinations(sorted(ents[:max_per_doc]), 2) for ents in lists))
+        return {
+            "documents": docs,
+            "entities": [{"entity": e, "count": n} for e, n in singles.most_common(top)],
+            "pairs": [{"a": a, "b": b, "count": n} for (a, b), n in pairs.most_common(top)],
+        }
+
+    async def rebuild(self, request_id: str, *, write: bool = True) -> dict:
+        """Пересчитать сводку по сырым строкам и вернуть расхождения с сохранённой.
+
+        :return: {"count" / "unique_stories": (было, стало), "<измерение>": {корзина: (было, стало)}}
+            — только расходящиеся значения; пустой dict означает отсутствие дрейфа.
+        """
+        stored = await self.summary(request_id)
+        actual = await self.compute(request_id)
+        drift: dict = {}
+        if stored["count"] != actual["count"]:
+            drift["count"] = (stored["count"], actual["count"])
+        if stored["unique_stories"] != actual["unique_stories"]:
+            drift["unique_stories"] = (stored["unique_stories"], actual["unique_stories"])
+        for name in SUMMARY_DIMENSIONS:
+            keys = set(stored[name]) | set(actual[name])
+            diff = {k: (stored[name].get(k, 0), actual[name].get(k, 0)) for k in keys}
+            diff = {k: v for k, v in diff.items() if v[0] != v[1]}
+            if diff:
+                drift[name] = diff
+        if stored["period"] != actual["period"]:
+            drift["period"] = (stored["period"], actual["period"])
+
+        res = await self.session.execute(
+            select(
+                RequestTimeseriesDB.granularity,
+                RequestTimeseriesDB.bucket_start,
+                RequestTimeseriesDB.source,
+                RequestTimeseriesDB.sentiment,
+                RequestTimeseriesDB.count,
+            ).where(RequestTimeseriesDB.request_id == request_id)
+        )
+        stored_series = Counter({(g, truncate(t, g), src, snt): n for g, t, src, snt, n in res.all() if n})
+        actual_series = await self.compute_series(request_id)
+        if stored_series != actual_series:
+            drift["timeseries"] = sum(
+                1 for k in set(stored_series) | set(actual_series) if stored_series[k] != actual_series[k]
+            )
+
+        if write:
+            for table in (RequestStatBucketDB, RequestStatsDB, RequestTimeseriesDB):
+                await self.session.execute(delete(table).where(table.request_id == request_id))
+            await self._bump_series(request_id, actual_series)
+            if actual["count"]:
+                await self._bump_totals(
+                    request_id,
+                    actual["count"],
+                    actual["unique_stories"],
+                    actual["period"]["min_published_at"],
+                    actual["period"]["max_published_at"],
+                )
+                await self._bump_buckets(request_id, {name: Counter(actual[name]) for name in SUMMARY_DIMENSIONS})
+        return drift
+
+    @staticmethod
+    def _count(row: Any, deltas: dict[str, Counter], series: Counter, sign: int) -> None:
+        for name, (col, _) in SUMMARY_DIMENSIONS.items():
+            deltas[name][bucket_of(getattr(row, col.key))] += sign
+        sentiment = bucket_of(row.sentiment)
+        for granularity in TIMESERIES_GRANULARITIES:
+            series[(granularity, truncate(row.published_at, granularity), row.source, sentiment)] += sign
+
+    @staticmethod
+    def _shape_series(merged: Counter) -> list[dict]:
+        items: dict[datetime, dict] = {}
+        for (start, source, sentiment), n in merged.items():
+            if not n:
+                continue
+            item = items.get(start)
+            if item is None:
+                item = items[start] = {
+                    "ts": start.replace(tzinfo=timezone.utc),
+                    "count": 0,
+                    "sources": dict.fromkeys(SUMMARY_DIMENSIONS["sources"][1], 0),
+                    "sentiments": dict.fromkeys(SUMMARY_DIMENSIONS["sentiments"][1], 0),
+                }
+            item["count"] += n
+            item["sources"][source] = item["sources"].get(source, 0) + n
+            item["sentiments"][sentiment] = item["sentiments"].get(sentiment, 0) + n
+        return [items[k] for k in sorted(items)]
+
+    @staticmethod
+    def _shape(
+        *, total: int, stories: int, lo: Optional[datetime], hi: Optional[datetime], buckets: Iterable[tuple]
+    ) -> dict:
+        out: dict = {"count": total, "unique_stories": stories}
+        out.update({name: dict.fromkeys(defaults, 0) for name, (_, defaults) in SUMMARY_DIMENSIONS.items()})
+        for dimension, bucket, n in buckets:
+            if dimension in out:
+                out[dimension][bucket] = out[dimension].get(bucket, 0) + n
+        out["period"] = {"min_published_at": lo, "max_published_at": hi}
+        return out
+
+    async def _bump_totals(
+        self, request_id: str, total: int, stories: int, lo: Optional[datetime], hi: Optional[datetime]
+    ) -> None:
+        stmt = dialect_insert(self.session, RequestStatsDB).values(
+            request_id=request_id,
+            total=total,
+            stories=stories,
+            min_published_at=lo,
+            max_published_at=hi,
+            updated_at=utcnow(),
+        )
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RequestStatsDB.request_id],
+            set_={
+                "total": RequestStatsDB.total + new.total,
+                "stories": RequestStatsDB.stories + new.stories,
+                "min_published_at": case(
+                    (RequestStatsDB.min_published_at.is_(None), new.min_published_at),
+                    (new.min_published_at < RequestStatsDB.min_published_at, new.min_published_at),
+                    else_=RequestStatsDB.min_published_at,
+                ),
+                "max_published_at": case(
+                    (RequestStatsDB.max_published_at.is_(None), new.max_published_at),
+                    (new.max_published_at > RequestStatsDB.max_published_at, new.max_published_at),
+                    else_=RequestStatsDB.max_published_at,
+                ),
+                "updated_at": new.updated_at,
+            },
+        )
+        await self.session.execute(stmt)
+
+    async def _bump_buckets(self, request_id: str, deltas: dict[str, Counter]) -> None:
+        values = [
+            {"request_id": request_id, "dimension": dimension, "bucket": bucket, "count": n}
+            for dimension, counter in deltas.items()
+            for bucket, n in counter.items()
+            if n
+        ]
+        if not values:
+            return
+        stmt = dialect_insert(self.session, RequestStatBucketDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RequestStatBucketDB.request_id, RequestStatBucketDB.dimension, RequestStatBucketDB.bucket],
+            set_={"count": RequestStatBucketDB.count + stmt.excluded.count},
+        )
+        await self.session.execute(stmt)
+
+    async def _bump_series(self, request_id: str, series: Counter) -> None:
+        values = [
+            {
+                "request_id": request_id,
+                "granularity": granularity,
+                "bucket_start": start.replace(tzinfo=timezone.utc),
+                "source": source,
+                "sentiment": sentiment,
+                "count": n,
+            }
+            for (granularity, start, source, sentiment), n in series.items()
+            if n
+        ]
+        if not values:
+            return
+        stmt = dialect_insert(self.session, RequestTimeseriesDB).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                RequestTimeseriesDB.request_id,
+                RequestTimeseriesDB.granularity,
+                RequestTimeseriesDB.bucket_start,
+                RequestTimeseriesDB.source,
+                RequestTimeseriesDB.sentiment,
+            ],
+            set_={"count": RequestTimeseriesDB.count + stmt.excluded.count},
+        )
+        await self.session.execute(stmt)
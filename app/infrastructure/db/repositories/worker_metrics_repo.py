@@ -0,0 +1,60 @@
+"""Репозиторий снимков метрик воркеров (worker_metrics)."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Mapping
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.utctime import utcnow
+from app.infrastructure.db.tables import WorkerMetricsDB
+from app.infrastructure.db.upsert import dialect_insert
+
+
+class WorkerMetricsRepo:
+    """Последний снимок счётчиков каждого воркера по видам (sentiment / entities / crawl)."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+
+    async def publish(self, worker_id: str, snapshots: Mapping[str, dict]) -> None:
+        """Заменить снимки воркера новыми."""
+        if not snapshots:
+            return
+        now = utcnow()
+        stmt = dialect_insert(self.session, WorkerMetricsDB).values(
+            [{"worker_id": worker_id, "kind": kind, "snapshot": snap, "updated_at": now} for kind, snap in snapshots.items()]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkerMetricsDB.worker_id, WorkerMetricsDB.kind],
+            set_={"snapshot": stmt.excluded.snapshot, "updated_at": stmt.excluded.updated_at},
+        )
+        await self.session.execute(stmt)
+
+    async def fresh(self, kind: str, max_age_seconds: int) -> dict[str, dict]:
+        """{воркер: снимок} за последние ``max_age_seconds`` (остановленные воркеры выпадают)."""
+        res = await self.session.execute(
+            select(WorkerMetricsDB.worker_id, WorkerMetricsDB.snapshot)
+            .where(WorkerMetricsDB.kind == kind)
+            .where(WorkerMetricsDB.updated_at >= utcnow() - timedelta(seconds=max_age_seconds))
+            .order_by(WorkerMetricsDB.worker_id)
+        )
+        return dict(res.all())
+
+    async def live_workers(self, max_age_seconds: int) -> int:
+        """Сколько воркеров публиковало снимки за последние ``max_age_seconds``."""
+        res = await self.session.execute(
+            select(func.count(func.distinct(WorkerMetricsDB.worker_id))).where(
+                WorkerMetricsDB.updated_at >= utcnow() - timedelta(seconds=max_age_seconds)
+            )
+        )
+        return res.scalar_one()
+
+    async def purge_stale(self, max_age_seconds: int) -> int:
+        """Удалить снимки, не обновлявшиеся дольше ``max_age_seconds``; вернуть число строк."""
+        res = await self.session.execute(
+            delete(WorkerMetricsDB).where(WorkerMetricsDB.updated_at < utcnow() - timedelta(seconds=max_age_seconds))
+        )
+        return res.rowcount or 0
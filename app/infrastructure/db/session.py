@@ -1,7 +1,52 @@
-from typing import AsyncGenerator
+import logging
+from typing import AsyncGenerator, Awaitable, Callable, Hashable, Optional
+
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+_AFTER_COMMIT = "after_commit"
+
+
+class AppSession(AsyncSession):
+    """AsyncSession с действиями после коммита (см. ``after_commit``).
+
+    Сброс кэша ответов и события SSE должны видеть уже закоммиченные данные:
+    сброшенный до коммита кэш тут же заполнился бы старыми данными под новой
+    версией. Откат и закрытие сессии отменяют отложенные действия.
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        pending = self.info.pop(_AFTER_COMMIT, None) or {}
+        for action in pending.values():
+            try:
+                await action()
+            except Exception:  # noqa: BLE001 — данные уже закоммичены
+                logger.warning("Действие после коммита не выполнено", exc_info=True)
+
+    async def rollback(self) -> None:
+        self.info.pop(_AFTER_COMMIT, None)
+        await super().rollback()
+
+    async def close(self) -> None:
+        self.info.pop(_AFTER_COMMIT, None)
+        await super().close()
+
+
+def after_commit(
+    session: AsyncSession, action: Callable[[], Awaitable[None]], key: Optional[Hashable] = None
+) -> None:
+    """Выполнить ``action`` после ближайшего успешного коммита сессии.
+
+    Действия выполняются в порядке регистрации; с одинаковым ``key`` —
+    один раз (первое). Сессии приложения создаются фабриками этого модуля
+    (``AppSession``).
+    """
+    pending = session.info.setdefault(_AFTER_COMMIT, {})
+    pending.setdefault(object() if key is None else key, action)
+
 _engine: AsyncEngine | None = None
 _session_factory: async_sessionmaker[AsyncSession] | None = None
 
@@ -21,10 +66,20 @@ def get_session_factory() -> async_sessionmaker[AsyncSession]:
     """Вернуть фабрику асинхронных сессий."""
     global _session_factory  # noqa: PLW0603
     if _session_factory is None:
-        _session_factory = async_sessionmaker(bind=get_engine(), expire_on_commit=False)
+        _session_factory = async_sessionmaker(bind=get_engine(), class_=AppSession, expire_on_commit=False)
     return _session_factory
 
 
+def create_session_factory() -> tuple[AsyncEngine, async_sessionmaker[AsyncSession]]:
+    """Отдельный движок и фабрика сессий — для другого потока со своим циклом событий.
+
+    Общий движок привязан к циклу, в котором открыл соединения; поток-писатель
+    создаёт свой и сам закрывает его (``await engine.dispose()``).
+    """
+    engine = create_async_engine(settings.db_url, echo=settings.echo_sql)
+    return engine, async_sessionmaker(bind=engine, class_=AppSession, expire_on_commit=False)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency FastAPI — выдаёт асинхронную сессию и закрывает её."""
     async_session = get_session_factory()
@@ -1,10 +1,10 @@
 from datetime import datetime, date
 from app.core.utctime import utcnow
 from sqlalchemy import (
-    String, Integer, Text, DateTime, Date, Boolean, JSON,
-    ForeignKey, UniqueConstraint, Index, CheckConstraint
+    String, Integer, BigInteger, Text, DateTime, Date, Boolean, JSON,
+    ForeignKey, UniqueConstraint, Index, CheckConstraint, false
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, column_property, mapped_column, relationship
 from app.infrastructure.db.base import Base
 
 # ---- Users ----
@@ -30,6 +30,9 @@ class RequestDB(Base):
     progress: Mapped[int] = mapped_column(Integer, default=0)
     eta_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
     applied_promo: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    tariff_code: Mapped[str | None] = mapped_column(String(16), nullable=True)
+    # {источник: ISO-время самой свежей собранной публикации} — граница дозагрузки
+    watermarks: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
     __table_args__ = (
@@ -37,12 +40,11 @@ class RequestDB(Base):
         Index("ix_requests_period", "period_start", "period_end"),
     )
 
-# ---- Publications ----
-class PublicationDB(Base):
-    __tablename__ = "publications"
-    # Можно оставить дефолтный INTEGER PK из PreBase (id) ИЛИ явно переопределить:
-    # id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    request_id: Mapped[str] = mapped_column(String(32), ForeignKey("requests.id", ondelete="CASCADE"), index=True)
+# ---- Articles (глобальное хранилище, одна строка на канонический URL) ----
+class ArticleDB(Base):
+    __tablename__ = "articles"
+    # sha1 канонического URL (app.core.urls.url_hash) — ключ дедупликации
+    url_hash: Mapped[str] = mapped_column(String(40), unique=True)
     title: Mapped[str] = mapped_column(Text)
     url: Mapped[str] = mapped_column(Text)
     published_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
@@ -50,9 +52,171 @@ class PublicationDB(Base):
     lang: Mapped[str] = mapped_column(String(8), default="ru")
     sentiment: Mapped[str | None] = mapped_column(String(8), nullable=True)
     entities: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # сюжет: id первой статьи группы почти-дублей (у неё самой cluster_id = id);
+    # NULL — статья не кластеризована, сюжетом считается она сама
+    cluster_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    __table_args__ = (
+        Index("ix_articles_source_lang", "source", "lang"),
+    )
+
+# ---- Article bands (LSH-корзины MinHash заголовков для поиска почти-дублей) ----
+class ArticleBandDB(Base):
+    __tablename__ = "article_bands"
+    id = None  # PK — (band, article_id): поиск кандидатов идёт по band
+    band: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    article_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+# ---- Request publications (связь заявка -> статья) ----
+class RequestPublicationDB(Base):
+    __tablename__ = "request_publications"
+    id = None  # PK — (request_id, article_id)
+    request_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+    )
+    article_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    # копия articles.published_at: сортировка и keyset-пагинация идут по индексу связи
+    published_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    # сюжет статьи (cluster_id или id статьи) и флаг его представителя в заявке —
+    # самой ранней публикации сюжета; ведутся при привязке (PublicationsRepo.ingest)
+    story_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    story_head: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+    __table_args__ = (
+        # keyset-пагинация: WHERE request_id = ? AND (published_at, article_id) < (?, ?)
+        Index("ix_request_publications_request_published", "request_id", "published_at", "article_id"),
+        # выдача по сюжетам (collapse): те же ключи, но только представители
+        Index("ix_request_publications_story_heads", "request_id", "story_head", "published_at", "article_id"),
+        Index("ix_request_publications_request_story", "request_id", "story_id"),
+    )
+
+# ---- Publications (read-модель: связь заявки + статья) ----
+class PublicationDB(Base):
+    """Публикация заявки — строка JOIN request_publications + articles.
+
+    Только для чтения: запросы списка, выгрузки и аналитики пишутся как
+    раньше, а SQLAlchemy подставляет JOIN. Запись идёт в ArticleDB и
+    RequestPublicationDB (см. PublicationsRepo).
+    """
+
+    __table__ = RequestPublicationDB.__table__.join(
+        ArticleDB.__table__, RequestPublicationDB.__table__.c.article_id == ArticleDB.__table__.c.id
+    )
+    # id публикации = id статьи; первой идёт колонка связи — по ней индекс
+    id = column_property(RequestPublicationDB.__table__.c.article_id, ArticleDB.__table__.c.id)
+    published_at = column_property(RequestPublicationDB.__table__.c.published_at, ArticleDB.__table__.c.published_at)
+
+# ---- Request stats (инкрементальные агрегаты по публикациям заявки) ----
+class RequestStatsDB(Base):
+    __tablename__ = "request_stats"
+    id = None  # PK — request_id
+    request_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+    )
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    # уникальных сюжетов (почти-дубли считаются один раз)
+    stories: Mapped[int] = mapped_column(Integer, default=0)
+    min_published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    max_published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
+
+class RequestStatBucketDB(Base):
+    __tablename__ = "request_stat_buckets"
+    id = None  # PK — (request_id, dimension, bucket)
+    request_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+    )
+    dimension: Mapped[str] = mapped_column(String(16), primary_key=True)  # sources / langs / sentiments
+    bucket: Mapped[str] = mapped_column(String(16), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+class RequestTimeseriesDB(Base):
+    __tablename__ = "request_timeseries"
+    id = None  # PK — (request_id, granularity, bucket_start, source, sentiment)
+    request_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+    )
+    granularity: Mapped[str] = mapped_column(String(8), primary_key=True)  # hour / day
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    source: Mapped[str] = mapped_column(String(16), primary_key=True)
+    sentiment: Mapped[str] = mapped_column(String(16), primary_key=True)  # NULL -> 'unscored'
+    count: Mapped[int] = mapped_column(Integer, default=0)
+
+# ---- Collections (кэш результатов сбора по нормализованному запросу) ----
+class CollectionDB(Base):
+    __tablename__ = "collections"
+    # sha1(нормализованный query | language | sources) — одинаковые запросы дают один ключ
+    key: Mapped[str] = mapped_column(String(40))
+    period_start: Mapped[date] = mapped_column(Date)
+    period_end: Mapped[date] = mapped_column(Date)
+    # заявка, в которой лежат публикации этого отрезка
+    request_id: Mapped[str] = mapped_column(String(32), ForeignKey("requests.id", ondelete="CASCADE"), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    __table_args__ = (
+        Index("ix_collections_key_created", "key", "created_at"),
+    )
+
+# ---- Feed states (валидаторы условного GET для лент RSS/Atom) ----
+class FeedStateDB(Base):
+    __tablename__ = "feed_states"
+    id = None  # PK — (request_id, feed_url)
+    # валидаторы у каждой заявки свои: 304 значит «для этой заявки нового нет»
+    request_id: Mapped[str] = mapped_column(
+        String(32), ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True
+    )
+    feed_url: Mapped[str] = mapped_column(String(512), primary_key=True)
+    etag: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    last_modified: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+
+# ---- Inference cache (результаты моделей по хэшу нормализованного текста) ----
+class InferenceCacheDB(Base):
+    __tablename__ = "inference_cache"
+    id = None  # PK — (kind, text_hash)
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)  # sentiment / entities
+    # sha1(версия модели + нормализованный текст): смена версии — другие ключи
+    text_hash: Mapped[str] = mapped_column(String(40), primary_key=True)
+    model_version: Mapped[str] = mapped_column(String(128))
+    value: Mapped[dict | list | str | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    __table_args__ = (
+        Index("ix_inference_cache_kind_version", "kind", "model_version"),
+    )
+
+# ---- Worker metrics (снимки счётчиков воркеров для /metrics/*) ----
+class WorkerMetricsDB(Base):
+    __tablename__ = "worker_metrics"
+    id = None  # PK — (worker_id, kind)
+    worker_id: Mapped[str] = mapped_column(String(64), primary_key=True)  # host:pid, как jobs.locked_by
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)  # sentiment / entities / crawl
+    snapshot: Mapped[dict] = mapped_column(JSON)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, index=True)
+
+# ---- Jobs (очередь фоновых задач) ----
+class JobDB(Base):
+    __tablename__ = "jobs"
+    kind: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    status: Mapped[str] = mapped_column(String(16), default="queued")  # queued / running / done / failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=5)
+    run_after: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # планировщик: класс приоритета (тариф или 'guest'), владелец и заявка
+    priority_class: Mapped[str] = mapped_column(String(16), default="guest")
+    owner_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    request_id: Mapped[str | None] = mapped_column(String(32), nullable=True, index=True)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
     __table_args__ = (
-        Index("ix_publications_source_lang", "source", "lang"),
-        Index("ix_publications_published", "published_at"),
+        Index("ix_jobs_claim", "status", "run_after"),
+        Index("ix_jobs_class_claim", "priority_class", "status", "run_after"),
     )
 
 # ---- Promocodes ----
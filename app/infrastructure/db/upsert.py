@@ -0,0 +1,15 @@
+"""INSERT ... ON CONFLICT для поддерживаемых диалектов (SQLite / PostgreSQL)."""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(session: AsyncSession, table):
+    """Вернуть ``insert(table)`` диалекта сессии с поддержкой ``on_conflict_*``."""
+    name = session.bind.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - init_db поддерживает только эти два бэкенда
+        raise NotImplementedError(f"upsert is not supported for dialect {name!r}")
+    return insert(table)
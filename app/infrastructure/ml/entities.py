@@ -0,0 +1,420 @@
+"""Извлечение сущностей из заголовков публикаций пачками.
+
+Модель — ``EntityBackend``: ``GazetteerBackend`` ищет названия из справочника
+автоматом Ахо — Корасик (один проход по тексту на все названия, работает
+офлайн) или ``SpacyBackend`` (NER spaCy, пакет ставится отдельно). Результат
+приводится к каноническим названиям без повторов.
+
+``extract_request`` проходит публикации заявки без сущностей порциями:
+порция сверяется с ``inference_cache``, промахи уходят модели вне цикла
+событий, результат пишется одним ``PublicationsRepo.set_entities``. Пустой
+список — «сущностей нет», NULL — «ещё не обработано». Счётчики процесса
+(``metrics_snapshot``) воркер публикует в ``worker_metrics``,
+``/metrics/entities`` складывает их (``metrics_view``).
+
+Замер::
+
+    python -m app.infrastructure.ml.entities --bench 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator, Mapping, Optional, Protocol, Sequence
+
+from sqlalchemy import Text, cast, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import merge_counters
+from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.db.tables import PublicationDB
+from app.infrastructure.ml.inference_cache import CacheStats, get_inference_cache
+
+logger = logging.getLogger(__name__)
+
+# Вид результатов в inference_cache
+ENTITIES_KIND = "entities"
+# Сколько букв окончания допускается после основы из справочника («Сбербанк|а», «Росси|и»)
+MAX_SUFFIX = 3
+# Окончание допускается только после основы не короче этого: «опек», «кита» — целыми словами
+MIN_STEM = 5
+
+# Встроенный справочник: каноническое название -> основы/варианты написания.
+# Свой справочник (JSON того же вида) подключается через REPA_ENTITIES_GAZETTEER_PATH.
+DEFAULT_GAZETTEER: dict[str, list[str]] = {
+    "Банк России": ["банк росси", "центробанк", "цб рф", "цб", "bank of russia"],
+    "Сбербанк": ["сбербанк", "сбер", "сбера", "сберу", "сбером", "сбере", "sberbank"],
+    "ВТБ": ["втб", "vtb"],
+    "Газпром": ["газпром", "gazprom"],
+    "Газпром нефть": ["газпром нефт", "газпромнефт"],
+    "Роснефть": ["роснефт", "rosneft"],
+    "Лукойл": ["лукойл", "lukoil"],
+    "Норникель": ["норникел", "норильский никел", "nornickel"],
+    "Яндекс": ["яндекс", "yandex"],
+    "Ozon": ["ozon", "озон"],
+    "Wildberries": ["wildberries", "вайлдберриз"],
+    "Аэрофлот": ["аэрофлот", "aeroflot"],
+    "РЖД": ["ржд"],
+    "Минфин": ["минфин", "министерство финансов"],
+    "Мосбиржа": ["мосбирж", "московская бирж", "moex"],
+    "Правительство РФ": ["правительство рф", "правительства рф", "правительство росси", "правительства росси"],
+    "Госдума": ["госдум", "государственная дум"],
+    "ФРС": ["фрс", "federal reserve"],
+    "ЕЦБ": ["ецб", "ecb"],
+    "ОПЕК": ["опек", "opec"],
+    "Apple": ["apple"],
+    "Google": ["google", "гугл"],
+    "Microsoft": ["microsoft"],
+    "Tesla": ["tesla", "тесла"],
+    "Россия": ["росси", "рф", "russia"],
+    "США": ["сша", "usa", "united states"],
+    "Китай": ["китай", "китая", "китаю", "китаем", "китае", "китайск", "кнр", "china"],
+    "Европейский союз": ["евросоюз", "европейский союз", "ес", "european union"],
+    "Германия": ["германи", "germany"],
+    "Индия": ["индия", "индии", "индию", "индией", "индийск", "india"],
+    "Турция": ["турци", "turkey"],
+    "Москва": ["москв", "moscow"],
+    "Санкт-Петербург": ["санкт-петербург", "петербург", "спб"],
+}
+
+
+class EntityBackend(Protocol):
+    """Модель сущностей: пачка текстов -> списки канонических названий в том же порядке."""
+
+    name: str
+    version: str
+
+    def extract(self, texts: Sequence[str]) -> list[list[str]]: ...
+
+
+def normalize_entity(raw: str) -> str:
+    """Название сущности без кавычек и лишних пробелов."""
+    return " ".join(raw.strip(" \t\"'«»„“”()[].,;:!?").split())
+
+
+def dedupe(names: Iterable[str]) -> list[str]:
+    """Повторы (без учёта регистра) убираются, порядок первых вхождений сохраняется."""
+    seen: set[str] = set()
+    out = []
+    for name in names:
+        key = name.casefold()
+        if name and key not in seen:
+            seen.add(key)
+            out.append(name)
+    return out
+
+
+class AhoCorasick:
+    """Автомат Ахо — Корасик: все вхождения всех образцов за один проход по тексту."""
+
+    def __init__(self, patterns: Mapping[str, str]) -> None:
+        """:param patterns: {образец: значение}, значение возвращается при совпадении."""
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[tuple[int, str]]] = [[]]
+        for pattern, value in patterns.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(pattern), value))
+        # суффиксные ссылки — обход в ширину; выходы наследуются по ним
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[tuple[int, int, str]]:
+        """(начало, конец, значение) каждого вхождения."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, value in out[node]:
+                yield i + 1 - length, i + 1, value
+
+
+class GazetteerBackend:
+    """Справочник названий + Ахо — Корасик.
+
+    Совпадение засчитывается с начала слова; после основы допускается до
+    ``MAX_SUFFIX`` букв окончания (если основа не короче ``MIN_STEM`` букв),
+    так что падежные формы находятся без морфологии; короткие основы
+    («опек», «сбер») совпадают только целым словом, а слова из ``STOP``
+    («германий», «москвич») не совпадают вовсе. Из пересекающихся
+    совпадений берётся самое длинное.
+    """
+
+    name = "gazetteer"
+    # Слова, начинающиеся с основы из справочника, но означающие другое
+    STOP = ("германий", "москвич")
+
+    def __init__(self, gazetteer: Optional[Mapping[str, Sequence[str]]] = None) -> None:
+        if gazetteer is None:
+            gazetteer = _load_gazetteer(settings.entities_gazetteer_path)
+        patterns = {}
+        for canonical, aliases in gazetteer.items():
+            for alias in (canonical, *aliases):
+                patterns.setdefault(_fold(alias), normalize_entity(canonical))
+        # версия зависит от справочника: правка справочника сбрасывает кэш результатов
+        self.version = gazetteer_version(gazetteer)
+        self._automaton = AhoCorasick(patterns)
+
+    def extract(self, texts: Sequence[str]) -> list[list[str]]:
+        return [self._entities(text) for text in texts]
+
+    def _entities(self, text: str) -> list[str]:
+        folded = _fold(text)
+        size = len(folded)
+        matches = []
+        for start, end, value in self._automaton.iter(folded):
+            if start and folded[start - 1].isalnum():
+                continue
+            stop = end
+            while stop < size and folded[stop].isalnum():
+                stop += 1
+            if stop != end and (stop - end > MAX_SUFFIX or end - start < MIN_STEM):
+                continue
+            if folded.startswith(self.STOP, start, stop):
+                continue
+            matches.append((start, stop, value))
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        names = []
+        covered = 0
+        for start, stop, value in matches:
+            if start >= covered:
+                names.append(value)
+                covered = stop
+        return dedupe(names)
+
+
+class SpacyBackend:
+    """NER spaCy (персоны, организации, места); названия нормализуются и дедуплицируются."""
+
+    name = "spacy"
+    LABELS = frozenset({"PER", "PERSON", "ORG", "LOC", "GPE"})
+
+    def __init__(self, model: Optional[str] = None) -> None:
+        import spacy
+
+        self.model = model or settings.entities_spacy_model
+        self.version = f"spacy:{self.model}"
+        self._nlp = spacy.load(self.model, disable=["parser", "lemmatizer", "tagger"])
+
+    def extract(self, texts: Sequence[str]) -> list[list[str]]:
+        return [
+            dedupe(normalize_entity(ent.text) for ent in doc.ents if ent.label_ in self.LABELS)
+            for doc in self._nlp.pipe(texts, batch_size=len(texts))
+        ]
+
+
+def _fold(text: str) -> str:
+    return text.lower().replace("ё", "е")
+
+
+def _load_gazetteer(path: Optional[str]) -> dict[str, list[str]]:
+    if not path:
+        return DEFAULT_GAZETTEER
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def gazetteer_version(gazetteer: Mapping[str, Sequence[str]]) -> str:
+    # правила совпадения входят в версию: их правка тоже сбрасывает кэш результатов
+    rules = {"max_suffix": MAX_SUFFIX, "min_stem": MIN_STEM, "stop": GazetteerBackend.STOP}
+    payload = json.dumps([gazetteer, rules], ensure_ascii=False, sort_keys=True)
+    digest = hashlib.sha1(payload.encode()).hexdigest()[:12]
+    return f"gazetteer:{digest}"
+
+
+def entity_backend_version(name: Optional[str] = None) -> str:
+    """Версия модели ``make_entity_backend(name)`` без её загрузки."""
+    name = name or settings.entities_backend
+    if name == "spacy":
+        return f"spacy:{settings.entities_spacy_model}"
+    return gazetteer_version(_load_gazetteer(settings.entities_gazetteer_path))
+
+
+def make_entity_backend(name: Optional[str] = None) -> EntityBackend:
+    """Модель по имени из ``entities_backend``: gazetteer | spacy."""
+    name = name or settings.entities_backend
+    if name == "gazetteer":
+        return GazetteerBackend()
+    if name == "spacy":
+        return SpacyBackend()
+    raise ValueError(f"unknown entities backend: {name!r}")
+
+
+@dataclass
+class ExtractStats:
+    """Счётчики извлечения: тексты, найденные сущности, скорость модели."""
+
+    texts: int = 0
+    entities: int = 0
+    model_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "texts": self.texts,
+            "entities": self.entities,
+            "texts_per_second": round(self.texts / self.model_seconds, 1) if self.model_seconds else 0.0,
+            "model_seconds": round(self.model_seconds, 3),
+        }
+
+
+class EntityExtractor:
+    """Модель процесса (загружается при первом обращении) и её счётчики."""
+
+    def __init__(self, backend: Optional[EntityBackend] = None) -> None:
+        self._backend = backend
+        self.stats = ExtractStats()
+
+    @property
+    def backend(self) -> EntityBackend:
+        if self._backend is None:
+            self._backend = make_entity_backend()
+        return self._backend
+
+    @property
+    def loaded(self) -> bool:
+        return self._backend is not None
+
+    @property
+    def version(self) -> str:
+        """Версия модели (без её загрузки)."""
+        return self._backend.version if self._backend is not None else entity_backend_version()
+
+    async def extract(self, texts: Sequence[str]) -> list[list[str]]:
+        """Сущности пачки текстов; модель работает в потоке, а не в цикле событий."""
+        started = time.perf_counter()
+        found = await asyncio.to_thread(self.backend.extract, list(texts))
+        self.stats.model_seconds += time.perf_counter() - started
+        self.stats.texts += len(texts)
+        self.stats.entities += sum(map(len, found))
+        return found
+
+
+async def extract_request(
+    session: AsyncSession, request_id: str, *, extractor: Optional[EntityExtractor] = None, chunk: int = 1000
+) -> int:
+    """Извлечь сущности публикаций заявки, ещё не обработанных, и записать их пачками.
+
+    Коммит — на вызывающей стороне.
+
+    :return: число обработанных публикаций.
+    """
+    extractor = extractor or get_entity_extractor()
+    cache = get_inference_cache(ENTITIES_KIND, extractor.version)
+    publications = PublicationsRepo(session)
+    done = 0
+    last_id = 0
+    while True:
+        res = await session.execute(
+            select(PublicationDB.id, PublicationDB.title)
+            .where(PublicationDB.request_id == request_id)
+            # JSON null (так пишется None) и SQL NULL — «не обработано»
+            .where(or_(PublicationDB.entities.is_(None), cast(PublicationDB.entities, Text) == "null"))
+            .where(PublicationDB.id > last_id)
+            .order_by(PublicationDB.id)
+            .limit(chunk)
+        )
+        rows = res.all()
+        if not rows:
+            return done
+        texts = [title or "" for _, title in rows]
+        keys = cache.keys(texts)
+        found = await cache.lookup(session, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            fresh = dict(zip(missing, await extractor.extract(list(missing.values()))))
+            await cache.store(session, fresh)
+            found.update(fresh)
+        await publications.set_entities({aid: found[key] for (aid, _), key in zip(rows, keys)})
+        done += len(rows)
+        last_id = rows[-1][0]
+
+
+_extractor: EntityExtractor | None = None
+
+
+def get_entity_extractor() -> EntityExtractor:
+    """Вернуть (или создать) извлекатель сущностей процесса."""
+    global _extractor  # noqa: PLW0603
+    if _extractor is None:
+        _extractor = EntityExtractor()
+    return _extractor
+
+
+def metrics_snapshot() -> dict:
+    """Сырые счётчики извлечения процесса и его кэша результатов (публикует воркер)."""
+    extractor = get_entity_extractor()
+    return {"stats": asdict(extractor.stats), "cache": asdict(get_inference_cache(ENTITIES_KIND, extractor.version).stats)}
+
+
+def metrics_view(snapshots: Sequence[dict]) -> dict:
+    """Снимки одного или нескольких процессов в виде ``/metrics/entities`` (счётчики складываются)."""
+    stats = merge_counters(ExtractStats, [snap["stats"] for snap in snapshots])
+    cache = merge_counters(CacheStats, [snap["cache"] for snap in snapshots])
+    return {**stats.as_dict(), "cache": cache.as_dict()}
+
+
+async def warm_up_entities() -> None:
+    """Загрузить модель сущностей процесса заранее (прогрев при старте воркера)."""
+    extractor = get_entity_extractor()
+    await asyncio.to_thread(lambda: extractor.backend)
+
+
+def _bench(texts: int) -> None:
+    started = time.perf_counter()
+    backend = GazetteerBackend()
+    built = time.perf_counter() - started
+    names = list(DEFAULT_GAZETTEER)
+    corpus = [
+        f"{names[i % len(names)]} и {names[(i * 7) % len(names)]}: новость дня №{i} о рынке и ставках"
+        for i in range(texts)
+    ]
+    started = time.perf_counter()
+    found = backend.extract(corpus)
+    elapsed = time.perf_counter() - started
+    print(
+        {
+            "backend": backend.version,
+            "build_ms": round(built * 1000, 1),
+            "texts_per_second": round(texts / elapsed, 1),
+            "entities_per_text": round(sum(map(len, found)) / texts, 2),
+        }
+    )
+
+
+def main() -> None:
+    """CLI: замер текстов/с справочника на синтетических заголовках."""
+    parser = argparse.ArgumentParser(description="REPA entity extraction benchmark")
+    parser.add_argument("--bench", type=int, default=50000, help="число заголовков")
+    args = parser.parse_args()
+    _bench(args.bench)
+
+
+if __name__ == "__main__":
+    main()
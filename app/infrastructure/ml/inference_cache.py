@@ -0,0 +1,125 @@
+"""Кэш результатов моделей: LRU в памяти перед таблицей ``inference_cache``.
+
+Ключ — sha1 версии модели и нормализованного текста (NFKC, пробелы
+схлопнуты), поэтому один заголовок, пришедший в разные заявки или при
+повторном обходе, уходит в модель один раз. Пачка текстов проверяется
+целиком: сначала память процесса, промахи — одним ``IN (...)`` в БД.
+Смена версии модели меняет все ключи, так что строки прошлых версий не
+мешают (во время выкатки или при разных моделях у воркеров они ещё нужны);
+старые удаляет обслуживающая команда ``python -m app.tasks.purge_inference_cache``.
+
+Счётчики — ``get_inference_cache(kind, version).stats.as_dict()``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.infrastructure.db.repositories.inference_cache_repo import InferenceCacheRepo
+
+
+def normalize(text: str) -> str:
+    """Текст, по которому считается ключ: NFKC и схлопнутые пробелы."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def cache_key(version: str, text: str) -> str:
+    return hashlib.sha1(f"{version}\0{normalize(text)}".encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Попадания по уровням (в текстах); ``hit_rate`` — доля текстов, найденных в кэше."""
+
+    lookups: int = 0
+    memory_hits: int = 0
+    db_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.memory_hits + self.db_hits) / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "lookups": self.lookups,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+class InferenceCache:
+    """Кэш одного вида результатов (``kind``) одной версии модели."""
+
+    def __init__(self, kind: str, version: str, max_entries: Optional[int] = None) -> None:
+        self.kind = kind
+        self.version = version
+        self.max_entries = max_entries or settings.inference_cache_memory_entries
+        self.enabled = settings.inference_cache_enabled
+        self.stats = CacheStats()
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+
+    def keys(self, texts: Sequence[str]) -> list[str]:
+        return [cache_key(self.version, text) for text in texts]
+
+    async def lookup(self, session: AsyncSession, keys: Sequence[str]) -> dict[str, Any]:
+        """Найденные результаты {ключ: значение} для пачки ключей (повторы ключей — один поиск)."""
+        self.stats.lookups += len(keys)
+        if not self.enabled:
+            self.stats.misses += len(keys)
+            return {}
+        found: dict[str, Any] = {}
+        wanted = []
+        for key in dict.fromkeys(keys):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                wanted.append(key)
+        in_memory = set(found)
+        if wanted:
+            stored = await InferenceCacheRepo(session).get_many(self.kind, wanted)
+            self._remember(stored)
+            found.update(stored)
+        for key in keys:
+            if key in in_memory:
+                self.stats.memory_hits += 1
+            elif key in found:
+                self.stats.db_hits += 1
+            else:
+                self.stats.misses += 1
+        return found
+
+    async def store(self, session: AsyncSession, values: Mapping[str, Any]) -> None:
+        """Сохранить свежие результаты модели (коммит — на вызывающей стороне)."""
+        if not self.enabled or not values:
+            return
+        await InferenceCacheRepo(session).put_many(self.kind, self.version, values)
+        self._remember(values)
+
+    def _remember(self, values: Mapping[str, Any]) -> None:
+        self._memory.update(values)
+        for key in values:
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+_caches: dict[str, InferenceCache] = {}
+
+
+def get_inference_cache(kind: str, version: str) -> InferenceCache:
+    """Кэш процесса для вида результатов; новая версия модели — новый (пустой) кэш."""
+    cache = _caches.get(kind)
+    if cache is None or cache.version != version:
+        cache = _caches[kind] = InferenceCache(kind, version)
+    return cache
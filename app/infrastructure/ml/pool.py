@@ -0,0 +1,106 @@
+"""Пул процессов модели тональности: модель загружается один раз на процесс.
+
+Процессы стартуют через ``spawn`` (родитель держит цикл событий, потоки
+aiosqlite и соединения — их нельзя наследовать ``fork``-ом), инициализатор
+ограничивает число потоков BLAS/torch (``sentiment_threads_per_worker``) и
+строит модель. Пачка едет в процесс не списком строк, а одним UTF-8 блоком
+и массивом смещений ``uint32``; обратно приходит по байту-коду метки на
+текст — сериализация стоит два memcpy, а не pickle каждого объекта.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Optional, Sequence
+
+from app.core.config import settings
+from app.infrastructure.ml.sentiment_transformers import LABELS, make_backend
+
+_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TOKENIZERS_PARALLELISM")
+
+_CODES = {label: i for i, label in enumerate(LABELS)}
+# модель процесса-исполнителя (заполняет _init_worker)
+_backend = None
+
+
+def pack(texts: Sequence[str]) -> tuple[bytes, bytes]:
+    """Тексты -> (UTF-8 блок, смещения концов ``uint32``)."""
+    encoded = [text.encode() for text in texts]
+    return b"".join(encoded), array("I", accumulate(map(len, encoded))).tobytes()
+
+
+def unpack(blob: bytes, ends: bytes) -> list[str]:
+    """Обратное к ``pack``."""
+    offsets = array("I")
+    offsets.frombytes(ends)
+    texts = []
+    start = 0
+    for end in offsets:
+        texts.append(blob[start:end].decode())
+        start = end
+    return texts
+
+
+def _init_worker(backend: str, threads: int) -> None:
+    for name in _THREAD_VARS:
+        os.environ[name] = "false" if name == "TOKENIZERS_PARALLELISM" else str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    global _backend  # noqa: PLW0603
+    _backend = make_backend(backend)
+
+
+def _predict_packed(blob: bytes, ends: bytes) -> bytes:
+    return bytes(_CODES[label] for label in _backend.predict(unpack(blob, ends)))
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+class SentimentPool:
+    """``workers`` процессов с одной моделью в каждом; пачка целиком уходит одному процессу."""
+
+    def __init__(self, workers: int, threads: int, backend: str) -> None:
+        self.workers = workers
+        self.backend = backend
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, threads),
+        )
+
+    async def predict(self, texts: Sequence[str]) -> list[str]:
+        blob, ends = pack(texts)
+        codes = await asyncio.get_running_loop().run_in_executor(self._executor, _predict_packed, blob, ends)
+        return [LABELS[code] for code in codes]
+
+    async def warm_up(self) -> int:
+        """Запустить процессы и загрузить в них модель заранее; вернуть число процессов."""
+        loop = asyncio.get_running_loop()
+        pids = await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        return len(set(pids))
+
+    def close(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def make_pool(
+    workers: Optional[int] = None, threads: Optional[int] = None, backend: Optional[str] = None
+) -> SentimentPool:
+    """Пул по настройкам ``sentiment_workers`` / ``sentiment_threads_per_worker`` / ``sentiment_backend``."""
+    return SentimentPool(
+        workers or settings.sentiment_workers,
+        threads or settings.sentiment_threads_per_worker,
+        backend or settings.sentiment_backend,
+    )
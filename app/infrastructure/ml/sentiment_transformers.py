@@ -0,0 +1,493 @@
+"""Тональность публикаций: микро-пачки поверх подключаемой модели.
+
+Тексты от всех задач процесса попадают в одну очередь ``SentimentService``;
+фоновый цикл собирает из неё пачку до ``sentiment_batch_size`` текстов, но
+ждёт добора не дольше ``sentiment_max_wait_ms`` после первого текста, и
+отдаёт пачку модели целиком. Модель — ``SentimentBackend``: словарная
+``LexiconBackend`` (без зависимостей, работает офлайн) или
+``TransformersBackend`` (пакет ``transformers`` ставится отдельно).
+Модель вызывается вне цикла событий: в потоке (``sentiment_workers=0``) или
+в пуле процессов ``app.infrastructure.ml.pool``, где каждый процесс
+загружает модель один раз, а пачки расходятся по процессам параллельно.
+
+``score_request`` оценивает публикации заявки без тональности и пишет
+оценки пачками через ``PublicationsRepo.set_sentiments``; тексты, уже
+оценённые этой версией модели, берутся из ``inference_cache`` и в модель
+не уходят. Счётчики процесса (``metrics_snapshot``) воркер публикует в
+``worker_metrics``, ``/metrics/sentiment`` складывает их (``metrics_view``).
+
+Замер::
+
+    python -m app.infrastructure.ml.sentiment_transformers --bench 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional, Protocol, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import merge_counters
+from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.db.tables import PublicationDB
+from app.infrastructure.ml.inference_cache import CacheStats, get_inference_cache
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("neg", "neu", "pos")
+# Вид результатов в inference_cache
+SENTIMENT_KIND = "sentiment"
+_WORD = re.compile(r"\w+")
+
+
+class SentimentBackend(Protocol):
+    """Модель тональности: пачка текстов -> метки ``LABELS`` в том же порядке."""
+
+    name: str
+    version: str
+
+    def predict(self, texts: Sequence[str]) -> list[str]: ...
+
+
+class LexiconBackend:
+    """Словарная модель: основы слов с весом ±1, отрицание переворачивает следующее слово.
+
+    Слово совпадает с основой по префиксу («упал», «упала», «упали» — одна
+    основа); короткие основы, которые цепляют чужие слова («рост» —
+    «Ростелеком», «win» — «Windows»), сравниваются только целыми словами, а
+    имена собственные из ``STOP`` не оцениваются. Точность ниже, чем у трансформера, зато пачка из тысяч
+    заголовков считается за миллисекунды — для офлайн-проверок и замеров.
+    """
+
+    name = "lexicon"
+    version = "lexicon-2"
+
+    POSITIVE = (
+        "вырос", "выросл", "увелич", "прибыл", "рекорд", "успе", "побед", "улучш", "одобр",
+        "укреп", "восстанов", "достиг", "выигр", "позитив", "подорож", "расшир", "поддерж", "награ",
+        "growth", "grow", "rise", "record", "profit", "gain", "surge", "improv",
+        "approv", "strong", "success", "recover", "boost", "award",
+    )
+    NEGATIVE = (
+        "паден", "упал", "снизил", "сниж", "убыт", "кризис", "санкц", "штраф", "авар", "погиб",
+        "сокращ", "банкрот", "арест", "обыск", "скандал", "увольн", "уволи", "дефолт", "угроз",
+        "протест", "атак", "взрыв", "пожар", "ущерб", "потер", "обвал", "подешев", "провал", "мошенн",
+        "fall", "drop", "loss", "lose", "crisis", "sanction", "fine", "crash", "kill",
+        "bankrupt", "arrest", "scandal", "layoff", "default", "threat", "protest", "attack", "damage",
+        "plunge", "fail", "fraud",
+    )
+    # Слова, которые считаются только целиком (как префиксы они слишком короткие)
+    POSITIVE_WORDS = (
+        "рост", "роста", "росту", "ростом", "росте", "win", "wins", "winning", "winner", "beat", "beats", "rose",
+    )
+    NEGATIVE_WORDS = ("dead", "fell")
+    # Имена собственные и слова, начинающиеся с основы из словаря, но не несущие оценки
+    STOP = ("ростелеком", "ростех", "ростов", "windows", "deadline", "dropbox", "успенск")
+    NEGATORS = frozenset({"не", "нет", "без", "no", "not", "without"})
+
+    def __init__(self) -> None:
+        self._weights = {stem: 1 for stem in self.POSITIVE} | {stem: -1 for stem in self.NEGATIVE}
+        self._lengths = sorted({len(stem) for stem in self._weights}, reverse=True)
+        self._words = {word: 1 for word in self.POSITIVE_WORDS} | {word: -1 for word in self.NEGATIVE_WORDS}
+
+    def predict(self, texts: Sequence[str]) -> list[str]:
+        return [self._label(text) for text in texts]
+
+    def _label(self, text: str) -> str:
+        score = 0
+        sign = 1
+        for word in _WORD.findall(text.lower().replace("ё", "е")):
+            if word in self.NEGATORS:
+                sign = -1
+                continue
+            weight = self._weight(word)
+            if weight is not None:
+                score += sign * weight
+            sign = 1
+        return "pos" if score > 0 else "neg" if score < 0 else "neu"
+
+    def _weight(self, word: str) -> Optional[int]:
+        if word in self._words:
+            return self._words[word]
+        if word.startswith(self.STOP):
+            return None
+        for n in self._lengths:
+            if len(word) >= n and word[:n] in self._weights:
+                return self._weights[word[:n]]
+        return None
+
+
+class TransformersBackend:
+    """Классификатор Hugging Face (``pipeline("text-classification")``).
+
+    Метки модели сводятся к ``LABELS`` по началу имени (positive -> pos,
+    NEGATIVE -> neg); незнакомые считаются нейтральными.
+    """
+
+    name = "transformers"
+
+    def __init__(self, model: Optional[str] = None) -> None:
+        from transformers import pipeline
+
+        self.model = model or settings.sentiment_model
+        self.version = f"transformers:{self.model}"
+        self._pipe = pipeline("text-classification", model=self.model, truncation=True)
+
+    def predict(self, texts: Sequence[str]) -> list[str]:
+        out = self._pipe(list(texts), batch_size=len(texts))
+        return [_label_of(item["label"]) for item in out]
+
+
+def _label_of(raw: str) -> str:
+    label = raw.lower()[:3]
+    return label if label in LABELS else "neu"
+
+
+def make_backend(name: Optional[str] = None) -> SentimentBackend:
+    """Модель по имени из ``sentiment_backend``: lexicon | transformers."""
+    name = name or settings.sentiment_backend
+    if name == "lexicon":
+        return LexiconBackend()
+    if name == "transformers":
+        return TransformersBackend()
+    raise ValueError(f"unknown sentiment backend: {name!r}")
+
+
+def backend_version(name: Optional[str] = None) -> str:
+    """Версия модели ``make_backend(name)`` без её загрузки."""
+    name = name or settings.sentiment_backend
+    return LexiconBackend.version if name == "lexicon" else f"transformers:{settings.sentiment_model}"
+
+
+@dataclass
+class BatchStats:
+    """Счётчики микро-пачек: объём, заполненность, скорость модели."""
+
+    max_batch: int
+    texts: int = 0
+    batches: int = 0
+    errors: int = 0
+    model_seconds: float = 0.0  # сумма по пачкам (при пуле — процессо-секунды)
+    busy_seconds: float = 0.0  # время, когда хоть одна пачка в работе
+    wait_seconds: float = 0.0  # сумма ожидания добора пачки
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def fill_ratio(self) -> float:
+        """Средняя заполненность пачки (1.0 — все пачки полные)."""
+        return self.texts / (self.batches * self.max_batch) if self.batches else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "texts": self.texts,
+            "batches": self.batches,
+            "errors": self.errors,
+            "max_batch": self.max_batch,
+            "avg_batch": round(self.texts / self.batches, 1) if self.batches else 0.0,
+            "fill_ratio": round(self.fill_ratio, 3),
+            "texts_per_second": round(self.texts_per_second, 1),
+            "model_seconds": round(self.model_seconds, 3),
+            "busy_seconds": round(self.busy_seconds, 3),
+            "avg_wait_ms": round(self.wait_seconds * 1000 / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class SentimentService:
+    """Общая на процесс очередь текстов и цикл, отдающий модели микро-пачки (см. модуль)."""
+
+    def __init__(
+        self,
+        backend: Optional[SentimentBackend] = None,
+        *,
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        workers: Optional[int] = None,
+        pool=None,
+    ) -> None:
+        self._backend = backend
+        self.max_batch = max_batch or settings.sentiment_batch_size
+        self.max_wait = (settings.sentiment_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000
+        self.workers = pool.workers if pool is not None else settings.sentiment_workers if workers is None else workers
+        self.stats = BatchStats(max_batch=self.max_batch)
+        self._pool = pool  # SentimentPool при workers > 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._runner: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: set[asyncio.Task] = set()
+        self._active = 0
+        self._busy_since = 0.0
+
+    @property
+    def backend(self) -> SentimentBackend:
+        """Модель в этом процессе (режим без пула); загружается при первой пачке, а не при импорте."""
+        if self._backend is None:
+            self._backend = make_backend()
+        return self._backend
+
+    @property
+    def loaded(self) -> bool:
+        """Модель загружена в этом процессе или запущен пул процессов с ней."""
+        return self._backend is not None or self._pool is not None
+
+    @property
+    def version(self) -> str:
+        """Версия модели (без её загрузки)."""
+        if self._backend is not None:
+            return self._backend.version
+        return backend_version(self._pool.backend if self._pool is not None else None)
+
+    @property
+    def pool(self):
+        """Пул процессов (режим ``workers > 0``); процессы стартуют при первой пачке или ``warm_up``."""
+        if self._pool is None:
+            from app.infrastructure.ml.pool import make_pool
+
+            self._pool = make_pool(self.workers, backend=None if self._backend is None else self._backend.name)
+        return self._pool
+
+    async def warm_up(self) -> None:
+        """Загрузить модель заранее (в пуле — во всех процессах)."""
+        if self.workers:
+            await self.pool.warm_up()
+        else:
+            await asyncio.to_thread(lambda: self.backend)
+
+    async def score(self, texts: Sequence[str]) -> list[str]:
+        """Метки для текстов; тексты уходят модели вместе с текстами других задач."""
+        queue = self._ensure_running()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            queue.put_nowait((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def close(self) -> None:
+        """Остановить цикл и пул (тексты в очереди получат CancelledError)."""
+        if self._runner is not None and not self._runner.done():
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+        self._runner = None
+        if self._queue is not None:
+            _cancel_all(self._queue.get_nowait()[1] for _ in range(self._queue.qsize()))
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.close)
+            self._pool = None
+
+    def _ensure_running(self) -> asyncio.Queue:
+        # очередь и задача привязаны к циклу; бенчмарк и тесты создают новые циклы
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._runner is None or self._runner.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            # одновременно в работе — по пачке на процесс пула (без пула — одна)
+            self._slots = asyncio.Semaphore(max(1, self.workers))
+            self._runner = loop.create_task(self._run(self._queue), name="repa-sentiment-batcher")
+        return self._queue
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[tuple[str, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await queue.get()]
+                started = loop.time()
+                deadline = started + self.max_wait
+                while len(batch) < self.max_batch:
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                self.stats.wait_seconds += loop.time() - started
+                # пока пачка в модели, цикл собирает следующую
+                await self._slots.acquire()
+                task = loop.create_task(self._dispatch(batch))
+                batch = []
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+        except asyncio.CancelledError:
+            # недособранная пачка (или ждущая слота) в модель уже не уйдёт
+            _cancel_all(future for _, future in batch)
+            raise
+
+    async def _dispatch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        started = time.perf_counter()
+        self._active += 1
+        if self._active == 1:
+            self._busy_since = started
+        try:
+            if self.workers:
+                labels = await self.pool.predict(texts)
+            else:
+                labels = await asyncio.to_thread(self.backend.predict, texts)
+        except Exception as exc:  # noqa: BLE001 - ошибка уходит ожидающим задачам
+            logger.exception("Пачка из %s текстов не оценена", len(texts))
+            self.stats.errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            self._slots.release()
+            self._active -= 1
+            if not self._active:
+                self.stats.busy_seconds += time.perf_counter() - self._busy_since
+        self.stats.model_seconds += time.perf_counter() - started
+        self.stats.texts += len(texts)
+        self.stats.batches += 1
+        for (_, future), label in zip(batch, labels):
+            if not future.done():
+                future.set_result(label)
+
+
+def _cancel_all(futures: Iterable[asyncio.Future]) -> None:
+    for future in futures:
+        if not future.done():
+            future.cancel()
+
+
+async def score_request(
+    session: AsyncSession, request_id: str, *, service: Optional[SentimentService] = None, chunk: int = 1000
+) -> int:
+    """Оценить публикации заявки без тональности и записать оценки пачками.
+
+    Строки берутся keyset-проходом по id. Порция сначала целиком проверяется
+    в кэше результатов, в модель уходят только промахи (одинаковые тексты —
+    один раз); оценки пишутся одним ``set_sentiments`` (агрегаты всех заявок
+    со статьёй правятся там же). Коммит — на вызывающей стороне.
+
+    :return: число оценённых публикаций.
+    """
+    service = service or get_sentiment_service()
+    cache = get_inference_cache(SENTIMENT_KIND, service.version)
+    publications = PublicationsRepo(session)
+    scored = 0
+    last_id = 0
+    while True:
+        res = await session.execute(
+            select(PublicationDB.id, PublicationDB.title)
+            .where(PublicationDB.request_id == request_id)
+            .where(PublicationDB.sentiment.is_(None))
+            .where(PublicationDB.id > last_id)
+            .order_by(PublicationDB.id)
+            .limit(chunk)
+        )
+        rows = res.all()
+        if not rows:
+            return scored
+        texts = [title or "" for _, title in rows]
+        keys = cache.keys(texts)
+        labels = await cache.lookup(session, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in labels}
+        if missing:
+            fresh = dict(zip(missing, await service.score(list(missing.values()))))
+            await cache.store(session, fresh)
+            labels.update(fresh)
+        await publications.set_sentiments({aid: labels[key] for (aid, _), key in zip(rows, keys)})
+        scored += len(rows)
+        last_id = rows[-1][0]
+
+
+_service: SentimentService | None = None
+
+
+def get_sentiment_service() -> SentimentService:
+    """Вернуть (или создать) сервис тональности процесса."""
+    global _service  # noqa: PLW0603
+    if _service is None:
+        _service = SentimentService()
+    return _service
+
+
+def metrics_snapshot() -> dict:
+    """Сырые счётчики сервиса процесса и его кэша результатов (публикует воркер)."""
+    service = get_sentiment_service()
+    return {"stats": asdict(service.stats), "cache": asdict(get_inference_cache(SENTIMENT_KIND, service.version).stats)}
+
+
+def metrics_view(snapshots: Sequence[dict]) -> dict:
+    """Снимки одного или нескольких процессов в виде ``/metrics/sentiment`` (счётчики складываются)."""
+    stats = merge_counters(BatchStats, [snap["stats"] for snap in snapshots], maximum=("max_batch",))
+    cache = merge_counters(CacheStats, [snap["cache"] for snap in snapshots])
+    return {**stats.as_dict(), "cache": cache.as_dict()}
+
+
+async def warm_up_sentiment() -> None:
+    """Загрузить модель сервиса процесса заранее (прогрев при старте воркера)."""
+    await get_sentiment_service().warm_up()
+
+
+async def close_sentiment_service() -> None:
+    """Остановить сервис процесса и его пул (shutdown приложения или воркера)."""
+    global _service  # noqa: PLW0603
+    if _service is not None:
+        await _service.close()
+        _service = None
+
+
+async def _bench(texts: int, tasks: int, backend: Optional[str], workers: int, batch: Optional[int]) -> None:
+    words = ["Компания", "сообщила", "о", "рекордной", "прибыли", "акции", "упали", "после", "санкций", "рынок"]
+    corpus = [" ".join(words[(i + k) % len(words)] for k in range(7)) + f" #{i}" for i in range(texts)]
+    if workers:
+        from app.infrastructure.ml.pool import make_pool
+
+        service = SentimentService(max_batch=batch, pool=make_pool(workers, backend=backend))
+        await service.warm_up()  # старт процессов и загрузка модели — не в замере
+    else:
+        service = SentimentService(make_backend(backend), max_batch=batch, workers=0)
+    per_task = -(-texts // tasks)
+    started = time.perf_counter()
+    # несколько задач подают тексты порциями, как параллельные заявки воркера
+    await asyncio.gather(
+        *(
+            service.score(corpus[i : i + 50])
+            for t in range(tasks)
+            for i in range(t * per_task, min(texts, (t + 1) * per_task), 50)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await service.close()
+    print({"backend": service.version, "workers": service.workers, "wall_texts_per_second": round(texts / elapsed, 1)})
+    print(service.stats.as_dict())
+
+
+def main() -> None:
+    """CLI: замер текстов/с и заполненности пачек."""
+    parser = argparse.ArgumentParser(description="REPA sentiment micro-batching benchmark")
+    parser.add_argument("--bench", type=int, default=10000, help="число текстов")
+    parser.add_argument("--tasks", type=int, default=8, help="сколько задач подают тексты одновременно")
+    parser.add_argument("--backend", choices=("lexicon", "transformers"), help="модель (по умолчанию из настроек)")
+    parser.add_argument("--workers", type=int, default=0, help="процессов пула (0 — модель в потоке)")
+    parser.add_argument("--batch", type=int, help="размер микро-пачки (по умолчанию из настроек)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(_bench(args.bench, max(1, args.tasks), args.backend, args.workers, args.batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Адаптивная конкурентность и вежливость обхода по доменам.
+
+Окно домена (сколько запросов к нему одновременно) настраивается по AIMD,
+как окно TCP: каждый успешный быстрый ответ прибавляет ``1/окно`` (около +1
+за «круг»), а ошибка, 429/503 или задержка выше ``базовая × порог`` режет
+окно в ``crawl_decrease_factor`` раз — не чаще раза за круг (до первого
+сокращения окно растёт на 1 за ответ — медленный старт). Между стартами
+запросов к домену выдерживается Crawl-delay из robots.txt. Контроллер один
+на процесс: все заявки, идущие на один домен, делят его окно, а все домены
+вместе — общий бюджет ``crawl_max_in_flight``.
+
+Между процессами окна не согласуются. Чтобы N воркеров не нагружали домен в
+N раз сильнее, каждый берёт долю ``1/processes``: окно домена и бюджет
+делятся на число живых воркеров, Crawl-delay — умножается (число задаёт
+воркер через ``set_processes``). Доля статична: домен, который обходит
+один воркер, получает лишь его долю. Пауки Scrapy в отдельном процессе в
+это число не входят.
+
+Снимок состояния — ``get_crawl_controller().snapshot()``; воркеры публикуют его,
+а ``/metrics/crawl`` сводит снимки всех воркеров (``metrics_view``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, Sequence
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from app.core.config import settings
+
+# Ответы, означающие «сервер перегружен / просит притормозить»
+_BACKOFF_STATUSES = {429, 503}
+_EWMA = 0.2
+# Колебания быстрых ответов меньше этого не считаются перегрузкой
+_LATENCY_SLACK = 0.05
+
+
+@dataclass
+class DomainState:
+    """Состояние домена: окно, замеры, вежливость."""
+
+    window: float
+    in_flight: int = 0
+    latency: Optional[float] = None  # EWMA, сек
+    base_latency: Optional[float] = None  # лучшая наблюдаемая задержка
+    crawl_delay: float = 0.0
+    next_start: float = 0.0  # не раньше (monotonic) — Crawl-delay
+    paused_until: float = 0.0  # Retry-After / 429
+    last_decrease: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    decreases: int = 0
+    robots: Optional[RobotFileParser] = None
+    robots_at: float = -1.0
+
+    def limit(self, processes: int = 1) -> int:
+        return max(1, int(self.window / processes))
+
+
+class CrawlSlot:
+    """Место под один запрос; ``observe`` фиксирует задержку до заголовков."""
+
+    def __init__(self, controller: "CrawlController", domain: str) -> None:
+        self.controller = controller
+        self.domain = domain
+        self.started = time.monotonic()
+        self._done = False
+
+    def observe(self, status: int, retry_after: Optional[str] = None) -> None:
+        if not self._done:
+            self._done = True
+            self.controller.record(self.domain, time.monotonic() - self.started, status, retry_after)
+
+
+class CrawlController:
+    """Общий на процесс регулятор обхода (см. модуль)."""
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: Optional[int] = None,
+        initial: Optional[float] = None,
+        minimum: Optional[float] = None,
+        maximum: Optional[float] = None,
+        latency_factor: Optional[float] = None,
+        decrease: Optional[float] = None,
+        user_agent: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_in_flight = max_in_flight or settings.crawl_max_in_flight
+        self.initial = initial or settings.crawl_domain_initial
+        self.minimum = minimum or settings.crawl_domain_min
+        self.maximum = maximum or settings.crawl_domain_max
+        self.latency_factor = latency_factor or settings.crawl_latency_factor
+        self.decrease = decrease or settings.crawl_decrease_factor
+        self.user_agent = user_agent or settings.rss_user_agent
+        self.domains: dict[str, DomainState] = {}
+        self.in_flight = 0
+        # процессов, делящих нагрузку на домены (живые воркеры); у процесса — их доля
+        self.processes = 1
+        self._clock = clock
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._conditions: dict[str, asyncio.Condition] = {}
+        self._budget = asyncio.Condition()
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def set_processes(self, processes: int) -> None:
+        """Число процессов, между которыми делятся окна доменов и бюджет."""
+        self.processes = max(1, processes)
+
+    @property
+    def budget(self) -> int:
+        """Запросов в полёте у процесса: его доля ``max_in_flight``."""
+        return max(1, self.max_in_flight // self.processes)
+
+    def limit(self, domain: str) -> int:
+        """Запросов к домену одновременно у процесса: его доля окна."""
+        return self.state(domain).limit(self.processes)
+
+    def state(self, domain: str) -> DomainState:
+        st = self.domains.get(domain)
+        if st is None:
+            st = self.domains[domain] = DomainState(window=self.initial)
+        return st
+
+    def slot(self, url: str) -> "_SlotContext":
+        """``async with controller.slot(url) as slot: ...; slot.observe(resp.status_code)``.
+
+        Ждёт окна домена, общего бюджета и Crawl-delay. Исключение внутри
+        блока (таймаут, обрыв) считается ошибкой домена.
+        """
+        return _SlotContext(self, self.domain_of(url))
+
+    async def ensure_robots(self, url: str, fetch: Callable[[str], Awaitable[Optional[str]]]) -> None:
+        """Загрузить robots.txt домена (раз в ``crawl_robots_ttl_seconds``).
+
+        ``fetch(robots_url)`` возвращает текст или None (нет файла / ошибка —
+        ограничений нет).
+        """
+        domain = self.domain_of(url)
+        st = self.state(domain)
+        now = self._clock()
+        if st.robots_at >= 0 and now - st.robots_at < settings.crawl_robots_ttl_seconds:
+            return
+        st.robots_at = now  # параллельные запросы к домену не качают robots.txt повторно
+        parts = urlsplit(url)
+        text = await fetch(f"{parts.scheme}://{parts.netloc}/robots.txt")
+        self.load_robots(domain, text or "")
+
+    def load_robots(self, domain: str, text: str) -> None:
+        """Разобрать robots.txt домена и применить Crawl-delay / Request-rate."""
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        st = self.state(domain)
+        st.robots = parser
+        st.robots_at = self._clock()
+        delay = parser.crawl_delay(self.user_agent)
+        rate = parser.request_rate(self.user_agent)
+        if rate is not None and rate.requests:
+            delay = max(float(delay or 0), rate.seconds / rate.requests)
+        st.crawl_delay = float(delay or 0)
+        if st.crawl_delay:
+            # с паузой между стартами параллельность домену не нужна
+            st.window = self.minimum
+
+    def delay_for(self, domain: str) -> float:
+        """Пауза перед следующим запросом к домену: Crawl-delay или остаток Retry-After."""
+        st = self.state(domain)
+        return max(st.crawl_delay * self.processes, st.paused_until - self._clock())
+
+    def allowed(self, url: str) -> bool:
+        st = self.domains.get(self.domain_of(url))
+        return st is None or st.robots is None or st.robots.can_fetch(self.user_agent, url)
+
+    def record(
+        self, domain: str, latency: Optional[float], status: Optional[int], retry_after: Optional[str] = None
+    ) -> None:
+        """Учесть ответ домена (``status=None`` — ошибка без ответа)."""
+        st = self.state(domain)
+        now = self._clock()
+        st.requests += 1
+        failed = status is None or status in _BACKOFF_STATUSES or status >= 500
+        if latency is not None and not failed:
+            st.latency = latency if st.latency is None else (1 - _EWMA) * st.latency + _EWMA * latency
+            st.base_latency = latency if st.base_latency is None else min(st.base_latency, latency)
+        if status in _BACKOFF_STATUSES:
+            st.paused_until = max(st.paused_until, now + _retry_after(retry_after, st.crawl_delay))
+        congested = (
+            latency is not None
+            and st.base_latency is not None
+            and latency > max(st.base_latency * self.latency_factor, st.base_latency + _LATENCY_SLACK)
+        )
+        if failed or congested:
+            st.errors += failed
+            # не чаще раза за круг: пачка ответов одного окна режет его однократно
+            if now - st.last_decrease >= (st.latency or 0.0):
+                st.window = max(self.minimum, st.window * self.decrease)
+                st.last_decrease = now
+                st.decreases += 1
+                if st.base_latency is not None:
+                    # сайт мог стать медленнее насовсем — база понемногу подтягивается
+                    st.base_latency *= 1.02
+        elif not st.crawl_delay:
+            # до первого сокращения — медленный старт (+1 за ответ), потом +1 за круг
+            st.window = min(self.maximum, st.window + (1 if not st.decreases else 1 / st.window))
+
+    def snapshot(self) -> dict:
+        """Состояние для метрик: бюджет и по доменам окно, в полёте, задержка, торможение."""
+        now = self._clock()
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "processes": self.processes,
+            "budget": self.budget,
+            "domains": {
+                domain: {
+                    "in_flight": st.in_flight,
+                    "window": round(st.window, 2),
+                    "limit": st.limit(self.processes),
+                    "latency_ms": None if st.latency is None else round(st.latency * 1000, 1),
+                    "base_latency_ms": None if st.base_latency is None else round(st.base_latency * 1000, 1),
+                    "crawl_delay": st.crawl_delay,
+                    "throttled": st.paused_until > now or (st.decreases > 0 and st.window <= self.minimum),
+                    "paused_for": max(0.0, round(st.paused_until - now, 1)),
+                    "requests": st.requests,
+                    "errors": st.errors,
+                    "decreases": st.decreases,
+                }
+                for domain, st in sorted(self.domains.items())
+            },
+        }
+
+    async def _acquire(self, domain: str) -> None:
+        st = self.state(domain)
+        cond = self._domain_condition(domain)
+        async with cond:
+            while True:
+                now = self._clock()
+                wait = max(st.next_start, st.paused_until) - now
+                if wait <= 0 and st.in_flight < st.limit(self.processes):
+                    break
+                try:
+                    # ждём освобождения места в окне; паузы по времени досыпаем с таймаутом
+                    await asyncio.wait_for(cond.wait(), timeout=wait if wait > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            st.in_flight += 1
+            st.next_start = now + st.crawl_delay * self.processes
+        budget = self._budget
+        try:
+            async with budget:
+                await budget.wait_for(lambda: self.in_flight < self.budget)
+                self.in_flight += 1
+        except BaseException:
+            await self._leave(domain)
+            raise
+
+    async def _release(self, domain: str) -> None:
+        async with self._budget:
+            self.in_flight -= 1
+            self._budget.notify()
+        await self._leave(domain)
+
+    async def _leave(self, domain: str) -> None:
+        cond = self._domain_condition(domain)
+        async with cond:
+            self.state(domain).in_flight -= 1
+            cond.notify_all()
+
+    def _domain_condition(self, domain: str) -> asyncio.Condition:
+        # примитивы asyncio привязаны к циклу; бенчмарк и тесты создают новые циклы
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._conditions = {}
+            self._budget = asyncio.Condition()
+        cond = self._conditions.get(domain)
+        if cond is None:
+            cond = self._conditions[domain] = asyncio.Condition()
+        return cond
+
+
+class _SlotContext:
+    def __init__(self, controller: CrawlController, domain: str) -> None:
+        self.controller = controller
+        self.domain = domain
+        self.slot: Optional[CrawlSlot] = None
+
+    async def __aenter__(self) -> CrawlSlot:
+        await self.controller._acquire(self.domain)
+        self.slot = CrawlSlot(self.controller, self.domain)
+        return self.slot
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is not None and not self.slot._done and not issubclass(exc_type, asyncio.CancelledError):
+                self.slot._done = True
+                self.controller.record(self.domain, None, None)
+        finally:
+            await self.controller._release(self.domain)
+
+
+def _retry_after(raw: Optional[str], default: float) -> float:
+    try:
+        return min(float(raw), settings.crawl_max_pause_seconds) if raw else max(default, 1.0)
+    except ValueError:
+        return max(default, 1.0)
+
+
+_controller: CrawlController | None = None
+
+
+def get_crawl_controller() -> CrawlController:
+    """Вернуть (или создать) регулятор обхода процесса."""
+    global _controller  # noqa: PLW0603
+    if _controller is None:
+        _controller = CrawlController()
+    return _controller
+
+
+def metrics_snapshot() -> dict:
+    """Состояние регулятора процесса для публикации воркером (см. ``metrics_view``)."""
+    return get_crawl_controller().snapshot()
+
+
+def metrics_view(snapshots: Sequence[dict]) -> dict:
+    """Снимки нескольких процессов в виде ``/metrics/crawl``.
+
+    У каждого процесса свой регулятор, поэтому нагрузка на домен — сумма долей
+    (``limit``) и запросов в полёте; окно — наибольшее из выученных, задержка —
+    худшая, базовая — лучшая из наблюдаемых.
+    """
+    domains: dict[str, dict] = {}
+    for snap in snapshots:
+        for domain, st in snap["domains"].items():
+            acc = domains.get(domain)
+            if acc is None:
+                domains[domain] = {"limit": int(st["window"]), **st}
+                continue
+            for key in ("in_flight", "requests", "errors", "decreases"):
+                acc[key] += st[key]
+            # снимки воркеров прошлой версии — без долей
+            acc["limit"] += st.get("limit", int(st["window"]))
+            acc["window"] = max(acc["window"], st["window"])
+            acc["latency_ms"] = _pick(max, acc["latency_ms"], st["latency_ms"])
+            acc["base_latency_ms"] = _pick(min, acc["base_latency_ms"], st["base_latency_ms"])
+            acc["crawl_delay"] = _pick(max, acc["crawl_delay"], st["crawl_delay"])
+            acc["throttled"] = acc["throttled"] or st["throttled"]
+            acc["paused_for"] = max(acc["paused_for"], st["paused_for"])
+    return {
+        "in_flight": sum(snap["in_flight"] for snap in snapshots),
+        "max_in_flight": max((snap["max_in_flight"] for snap in snapshots), default=0),
+        "processes": max((snap.get("processes", 1) for snap in snapshots), default=0),
+        "budget": sum(snap.get("budget", snap["max_in_flight"]) for snap in snapshots),
+        "domains": dict(sorted(domains.items())),
+    }
+
+
+def _pick(func: Callable, a, b):
+    return b if a is None else a if b is None else func(a, b)
@@ -0,0 +1,165 @@
+"""Локальный HTTP-стенд с лентами RSS/Atom для проверки и замеров сборщика.
+
+Минимальный HTTP/1.1 поверх ``asyncio.start_server``: keep-alive, ETag и
+Last-Modified, ответ 304 на совпавший условный GET. Ленты генерируются
+детерминированно: ``/feed/<n>.xml`` — RSS 2.0 для чётных n, Atom для нечётных.
+Медленный сайт моделируется ``delay`` и ``capacity``: сверх ``capacity``
+одновременных запросов задержка растёт пропорционально нагрузке;
+``crawl_delay`` попадает в ``/robots.txt``.
+
+Пример::
+
+    async with FixtureServer(feeds=100) as server:
+        urls = server.urls()
+        server.touch(3)  # лента 3 «обновилась»: новый ETag, новая запись
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
+from xml.sax.saxutils import escape
+
+
+class FixtureServer:
+    """Стенд на 127.0.0.1; порт выбирается системой, если не задан."""
+
+    def __init__(
+        self,
+        feeds: int = 10,
+        items: int = 20,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        now: Optional[datetime] = None,
+        delay: float = 0.0,
+        capacity: Optional[int] = None,
+        crawl_delay: Optional[float] = None,
+    ) -> None:
+        self.feeds = feeds
+        self.items = items
+        # даты записей отсчитываются назад от этого момента (по умолчанию — час назад)
+        self.now = (now or datetime.now(timezone.utc) - timedelta(hours=1)).replace(microsecond=0)
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.capacity = capacity
+        self.crawl_delay = crawl_delay
+        self.requests = 0
+        self.not_modified = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._versions: dict[int, int] = {}
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def __aenter__(self) -> "FixtureServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def urls(self) -> list[str]:
+        return [f"http://{self.host}:{self.port}/feed/{n}.xml" for n in range(self.feeds)]
+
+    def touch(self, n: int) -> None:
+        """Обновить ленту: записи сдвигаются на минуту вперёд, меняются валидаторы."""
+        self._versions[n] = self._versions.get(n, 0) + 1
+
+    def body(self, n: int) -> tuple[bytes, str, str]:
+        """(тело, ETag, Last-Modified) ленты ``n`` в текущей версии."""
+        version = self._versions.get(n, 0)
+        updated = self.now - timedelta(days=n % 7) + timedelta(minutes=version)
+        entries = [
+            (
+                f"Новость {n}-{version}-{i} о рынке",
+                f"https://news{n % 7}.example/{n}/{version}/{i}",
+                updated - timedelta(hours=i),
+            )
+            for i in range(self.items)
+        ]
+        body = (_rss if n % 2 == 0 else _atom)(n, entries).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        return body, etag, format_datetime(updated, usegmt=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *lines = head.decode("latin-1").split("\r\n")
+                headers = {k.strip().lower(): v.strip() for k, _, v in (h.partition(":") for h in lines if h)}
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    if self.delay:
+                        load = self.in_flight / self.capacity if self.capacity else 1.0
+                        await asyncio.sleep(self.delay * max(1.0, load))
+                    writer.write(self._respond(request_line.split(" ")[1], headers))
+                    await writer.drain()
+                finally:
+                    self.in_flight -= 1
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, path: str, headers: dict[str, str]) -> bytes:
+        if path == "/robots.txt":
+            if self.crawl_delay is None:
+                return _response("404 Not Found", b"")
+            return _response("200 OK", f"User-agent: *\nCrawl-delay: {self.crawl_delay}\n".encode())
+        try:
+            n = int(path.removeprefix("/feed/").removesuffix(".xml"))
+        except ValueError:
+            n = -1
+        if not 0 <= n < self.feeds:
+            return _response("404 Not Found", b"")
+        body, etag, modified = self.body(n)
+        if headers.get("if-none-match") == etag or (
+            "if-none-match" not in headers and headers.get("if-modified-since") == modified
+        ):
+            self.not_modified += 1
+            return _response("304 Not Modified", b"", etag=etag, modified=modified)
+        return _response("200 OK", body, etag=etag, modified=modified)
+
+
+def _response(status: str, body: bytes, *, etag: str = "", modified: str = "") -> bytes:
+    head = [f"HTTP/1.1 {status}", f"Content-Length: {len(body)}", "Connection: keep-alive"]
+    if body:
+        head.append("Content-Type: application/xml; charset=utf-8")
+    if etag:
+        head += [f"ETag: {etag}", f"Last-Modified: {modified}"]
+    return ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+
+def _rss(n: int, entries: list) -> str:
+    items = "".join(
+        f"<item><title>{escape(title)}</title><link>{link}</link>"
+        f"<pubDate>{format_datetime(ts, usegmt=True)}</pubDate>"
+        f"<description>Лента {n}</description></item>"
+        for title, link, ts in entries
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+        f"<title>Feed {n}</title><language>ru</language>{items}</channel></rss>"
+    )
+
+
+def _atom(n: int, entries: list) -> str:
+    items = "".join(
+        f'<entry><title>{escape(title)}</title><link rel="alternate" href="{link}"/>'
+        f"<updated>{ts.isoformat()}</updated><summary>Лента {n}</summary></entry>"
+        for title, link, ts in entries
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru"><title>Feed {n}</title>{items}</feed>'
+    )
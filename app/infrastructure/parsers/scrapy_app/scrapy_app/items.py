@@ -0,0 +1,19 @@
+"""Элементы, которые пауки отдают в пайплайн."""
+
+import scrapy
+
+
+class PublicationItem(scrapy.Item):
+    """Публикация для заявки; поля — как у строки ``PublicationsRepo.ingest``.
+
+    ``published_at`` — datetime (наивное UTC) или строка ISO 8601.
+    """
+
+    request_id = scrapy.Field()
+    title = scrapy.Field()
+    url = scrapy.Field()
+    published_at = scrapy.Field()
+    source = scrapy.Field()
+    lang = scrapy.Field()
+    sentiment = scrapy.Field()
+    entities = scrapy.Field()
@@ -0,0 +1,59 @@
+"""Downloader-middleware Scrapy: окна доменов из общего регулятора обхода."""
+
+from __future__ import annotations
+
+from urllib.parse import urlsplit
+
+from app.infrastructure.parsers.crawl_control import get_crawl_controller
+
+
+class CrawlControlMiddleware:
+    """Подстраивает слоты загрузчика Scrapy под регулятор обхода процесса.
+
+    Каждый ответ (задержка ``download_latency``, статус, Retry-After) и
+    каждая сетевая ошибка уходят в ``CrawlController``, а окно и пауза
+    домена переносятся в ``concurrency`` и ``delay`` его слота. robots.txt,
+    который качает ``RobotsTxtMiddleware``, проходит здесь же — из него
+    берётся Crawl-delay (сам Scrapy его не соблюдает).
+    """
+
+    def __init__(self, crawler) -> None:
+        self.crawler = crawler
+        self.controller = get_crawl_controller()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def process_request(self, request, spider):
+        # слот Scrapy = домен регулятора (хост с портом)
+        request.meta.setdefault("download_slot", self.controller.domain_of(request.url))
+        return None
+
+    def process_response(self, request, response, spider):
+        domain = self.controller.domain_of(request.url)
+        if urlsplit(request.url).path == "/robots.txt":
+            if response.status == 200:
+                self.controller.load_robots(domain, response.body.decode("utf-8", "ignore"))
+        else:
+            retry_after = response.headers.get("Retry-After")
+            self.controller.record(
+                domain,
+                request.meta.get("download_latency"),
+                response.status,
+                retry_after.decode("latin-1") if retry_after else None,
+            )
+        self._apply(request, domain)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        domain = self.controller.domain_of(request.url)
+        self.controller.record(domain, None, None)
+        self._apply(request, domain)
+        return None
+
+    def _apply(self, request, domain: str) -> None:
+        slot = self.crawler.engine.downloader.slots.get(request.meta.get("download_slot"))
+        if slot is not None:
+            slot.concurrency = self.controller.limit(domain)
+            slot.delay = self.controller.delay_for(domain)
@@ -0,0 +1,210 @@
+"""Пайплайн Scrapy: пачечная запись публикаций в БД из отдельного потока."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Mapping, Optional
+
+from scrapy.exceptions import DropItem
+from twisted.internet import task
+from twisted.internet.defer import Deferred, DeferredLock, succeed
+from twisted.internet.threads import deferToThread
+
+from app.core.config import settings
+from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.db.repositories.requests_repo import RequestsRepo
+from app.infrastructure.db.session import create_session_factory
+
+from .items import PublicationItem
+
+logger = logging.getLogger(__name__)
+
+
+class PublicationWriter(threading.Thread):
+    """Поток-писатель: свой цикл событий и свой движок БД.
+
+    Пачки приходят через ограниченную очередь; каждая пишется одной
+    транзакцией через ``PublicationsRepo.ingest`` вместе с прогрессом заявок.
+    После первой ошибки БД пачки только вычитываются (чтобы не заблокировать
+    реактор), а ошибка доступна в ``error``.
+    """
+
+    def __init__(self, max_pending: int, expected: Mapping[str, int]) -> None:
+        super().__init__(name="repa-publication-writer", daemon=True)
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.expected = dict(expected)
+        self.received: Counter = Counter()  # элементов по заявке
+        self.ingested: Counter = Counter()  # новых публикаций по заявке
+        self.batches = 0
+        self.write_seconds = 0.0
+        self.error: Optional[BaseException] = None
+
+    def close(self) -> None:
+        """Дописать очередь и остановить поток (блокирующий вызов)."""
+        self.queue.put(None)
+        self.join()
+
+    def run(self) -> None:
+        loop = asyncio.new_event_loop()
+        engine, factory = create_session_factory()
+        try:
+            while (batch := self.queue.get()) is not None:
+                if self.error is not None:
+                    continue
+                started = time.perf_counter()
+                try:
+                    loop.run_until_complete(self._write(factory, batch))
+                except Exception as exc:  # noqa: BLE001 - ошибка уходит в пайплайн
+                    logger.exception("Пачка из %s публикаций не записана", len(batch))
+                    self.error = exc
+                self.write_seconds += time.perf_counter() - started
+        finally:
+            loop.run_until_complete(engine.dispose())
+            loop.close()
+
+    async def _write(self, factory, batch: list[dict]) -> None:
+        by_request: dict[str, list[dict]] = defaultdict(list)
+        for row in batch:
+            by_request[row.pop("request_id")].append(row)
+        async with factory() as session:
+            publications = PublicationsRepo(session)
+            requests = RequestsRepo(session)
+            ingested = Counter()
+            for request_id, rows in by_request.items():
+                ingested[request_id] = await publications.ingest(request_id, rows)
+                expected = self.expected.get(request_id)
+                if expected:
+                    # 100% и READY ставит задача сбора после завершения обхода
+                    done = self.received[request_id] + len(rows)
+                    await requests.update_progress(request_id, min(99, done * 100 // expected), None)
+            await session.commit()
+        for request_id, rows in by_request.items():
+            self.received[request_id] += len(rows)
+        self.ingested.update(ingested)
+        self.batches += 1
+
+
+class PublicationBatchPipeline:
+    """Копит ``PublicationItem`` и отдаёт их писателю пачками.
+
+    Пачка уходит при ``PUBLICATION_BATCH_SIZE`` элементах или если неполная
+    пачка копится дольше ``PUBLICATION_FLUSH_SECONDS``. Реактор в БД не
+    ходит. Если писатель отстал и очередь из ``PUBLICATION_MAX_PENDING_BATCHES``
+    пачек полна, ``process_item`` возвращает Deferred, который ждёт места в
+    очереди: элементы остаются «в обработке», и Scrapy перестаёт планировать
+    загрузки — медленная БД приостанавливает обход, а не раздувает память.
+
+    Ожидаемое число элементов для прогресса паук задаёт атрибутом
+    ``expected_items`` ({request_id: n}).
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_pending: int) -> None:
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.crawler = None
+        self.writer: Optional[PublicationWriter] = None
+        self._buffer: list[dict] = []
+        self._first_at = 0.0
+        self._timer: Optional[task.LoopingCall] = None
+        self._waiting = DeferredLock()  # ждать места в очереди — по одному
+        self._stopping = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s = crawler.settings
+        pipeline = cls(
+            batch_size=s.getint("PUBLICATION_BATCH_SIZE", settings.scrapy_batch_size),
+            flush_seconds=s.getfloat("PUBLICATION_FLUSH_SECONDS", settings.scrapy_flush_seconds),
+            max_pending=s.getint("PUBLICATION_MAX_PENDING_BATCHES", settings.scrapy_max_pending_batches),
+        )
+        pipeline.crawler = crawler
+        return pipeline
+
+    def open_spider(self, spider) -> None:
+        self.writer = PublicationWriter(self.max_pending, getattr(spider, "expected_items", None) or {})
+        self.writer.start()
+        self._timer = task.LoopingCall(self._flush_stale)
+        self._timer.start(max(0.1, self.flush_seconds / 2), now=False)
+
+    def process_item(self, item, spider):
+        if not isinstance(item, PublicationItem):
+            return item
+        if self.writer.error is not None:
+            self._stop(spider)
+            raise DropItem(f"publication writer failed: {self.writer.error!r}")
+        if not self._buffer:
+            self._first_at = time.monotonic()
+        self._buffer.append(_row(item))
+        if len(self._buffer) >= self.batch_size:
+            return self._flush().addCallback(lambda _: item)
+        return item
+
+    def close_spider(self, spider) -> Deferred:
+        if self._timer is not None and self._timer.running:
+            self._timer.stop()
+        d = self._flush()
+        # за ждущими пачками (в т.ч. от таймера), чтобы ни одна не осталась после стоп-сигнала
+        d.addCallback(lambda _: self._waiting.run(deferToThread, self.writer.close))
+        d.addCallback(lambda _: self._report(spider))
+        return d
+
+    def _flush(self) -> Deferred:
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return succeed(None)
+        if not self._waiting.locked:
+            try:
+                self.writer.queue.put_nowait(batch)
+                return succeed(None)
+            except queue.Full:
+                pass
+        self.crawler.stats.inc_value("publications/backpressure_waits")
+        # место ждёт один поток пула реактора (пул нужен и для DNS), остальные
+        # пачки стоят за ним в порядке поступления
+        return self._waiting.run(deferToThread, self.writer.queue.put, batch)
+
+    def _flush_stale(self) -> Optional[Deferred]:
+        if self._buffer and time.monotonic() - self._first_at >= self.flush_seconds:
+            return self._flush()
+        return None
+
+    def _stop(self, spider) -> None:
+        if not self._stopping:
+            self._stopping = True
+            self.crawler.engine.close_spider(spider, "publication_writer_failed")
+
+    def _report(self, spider) -> None:
+        writer = self.writer
+        stats = self.crawler.stats
+        stats.set_value("publications/received", sum(writer.received.values()))
+        stats.set_value("publications/ingested", sum(writer.ingested.values()))
+        stats.set_value("publications/batches", writer.batches)
+        stats.set_value("publications/write_seconds", round(writer.write_seconds, 3))
+        if writer.error is not None:
+            logger.error("Паук %s: запись публикаций прервана: %r", spider.name, writer.error)
+
+
+def _row(item: PublicationItem) -> dict:
+    """Элемент -> строка ``PublicationsRepo.ingest`` (с request_id для группировки)."""
+    published = item["published_at"]
+    if isinstance(published, str):
+        published = datetime.fromisoformat(published.replace("Z", "+00:00"))
+    if published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "request_id": item["request_id"],
+        "title": item["title"],
+        "url": item["url"],
+        "published_at": published,
+        "source": item.get("source") or "web",
+        "lang": item.get("lang") or "ru",
+        "sentiment": item.get("sentiment"),
+        "entities": item.get("entities"),
+    }
@@ -0,0 +1,43 @@
+"""Настройки Scrapy-проекта сбора публикаций (источник «web»).
+
+Размеры пачек и очереди записи берутся из настроек приложения
+(``REPA_SCRAPY_*``), чтобы API, воркеры и обход настраивались из одного .env.
+"""
+
+from app.core.config import settings
+
+BOT_NAME = "repa"
+
+SPIDER_MODULES = ["app.infrastructure.parsers.scrapy_app.scrapy_app.spiders"]
+NEWSPIDER_MODULE = "app.infrastructure.parsers.scrapy_app.scrapy_app.spiders"
+
+USER_AGENT = f"{settings.app_name}/{settings.app_version} (+web)"
+ROBOTSTXT_OBEY = True
+
+CONCURRENT_REQUESTS = settings.crawl_max_in_flight
+CONCURRENT_REQUESTS_PER_DOMAIN = int(settings.crawl_domain_initial)
+DOWNLOAD_TIMEOUT = 20
+RETRY_TIMES = 2
+
+# Окно и паузы домена задаёт общий регулятор обхода (crawl_control): он
+# учитывает задержки, ошибки и Crawl-delay; CONCURRENT_REQUESTS_PER_DOMAIN —
+# только стартовое значение слота
+DOWNLOADER_MIDDLEWARES = {
+    "app.infrastructure.parsers.scrapy_app.scrapy_app.middlewares.CrawlControlMiddleware": 580,
+}
+AUTOTHROTTLE_ENABLED = False
+
+# Сколько элементов одного ответа обрабатывается параллельно; ждущие места
+# в очереди записи элементы тоже считаются — это и есть предел обхода
+CONCURRENT_ITEMS = 100
+
+ITEM_PIPELINES = {
+    "app.infrastructure.parsers.scrapy_app.scrapy_app.pipelines.PublicationBatchPipeline": 300,
+}
+PUBLICATION_BATCH_SIZE = settings.scrapy_batch_size
+PUBLICATION_FLUSH_SECONDS = settings.scrapy_flush_seconds
+PUBLICATION_MAX_PENDING_BATCHES = settings.scrapy_max_pending_batches
+
+REQUEST_FINGERPRINTER_IMPLEMENTATION = "2.7"
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+FEED_EXPORT_ENCODING = "utf-8"
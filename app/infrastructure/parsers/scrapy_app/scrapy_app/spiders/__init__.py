@@ -0,0 +1 @@
+"""Пауки источника «web»."""
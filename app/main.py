@@ -1,11 +1,41 @@
 """Точка входа FastAPI для проекта REPA (MVP)."""
 
+import asyncio
+import sys
+from typing import Callable, Sequence
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from app.api.v1.routers import router as v1_router
 from app.core.config import settings
+from app.core.lazy import import_report
+from app.infrastructure.cache.pubsub import close_broker
+from app.infrastructure.cache.redis_client import close_cache, get_cache
 from app.infrastructure.db.init_db import init_db
+from app.infrastructure.db.repositories.jobs_repo import JobsRepo
+from app.infrastructure.db.repositories.worker_metrics_repo import WorkerMetricsRepo
+from app.infrastructure.db.session import get_session_factory
+
+def _models_loaded() -> dict[str, bool]:
+    """Загружены ли модели процесса; незагруженные модули ради ответа не импортируются."""
+    sentiment = sys.modules.get("app.infrastructure.ml.sentiment_transformers")
+    entities = sys.modules.get("app.infrastructure.ml.entities")
+    return {
+        "sentiment": sentiment is not None and sentiment.get_sentiment_service().loaded,
+        "entities": entities is not None and entities.get_entity_extractor().loaded,
+    }
+
+
+async def _worker_metrics(kind: str, view: Callable[[Sequence[dict]], dict]) -> dict:
+    """Снимки счётчиков живых воркеров (модели и обход работают там, а не в API)."""
+    async with get_session_factory()() as session:
+        snapshots = await WorkerMetricsRepo(session).fresh(kind, settings.worker_metrics_max_age_seconds)
+    return {
+        "workers": {worker_id: view([snap]) for worker_id, snap in snapshots.items()},
+        "total": view(list(snapshots.values())),
+    }
 
 
 def create_app() -> FastAPI:
@@ -26,16 +56,79 @@ def create_app() -> FastAPI:
 
     # Подключаем единый router для всех endpoints v1
     app.include_router(v1_router)
+    app.state.started = False
 
     @app.get("/health", tags=["meta"])
     async def health() -> dict[str, str]:
-        """Проверка состояния приложения."""
+        """Проверка состояния приложения (процесс жив; модели не нужны)."""
         return {"status": "ok"}
 
+    @app.get("/ready", tags=["meta"])
+    async def ready() -> JSONResponse:
+        """Готовность принимать трафик: старт завершён (503, пока он идёт).
+
+        Модели API не нужны (их прогревают воркеры), поэтому готовность от них
+        не зависит; в ответе — что из моделей и тяжёлых пакетов уже загружено.
+        """
+        status = "ready" if app.state.started else "starting"
+        body = {"status": status, "models": _models_loaded(), **import_report()}
+        return JSONResponse(body, status_code=200 if app.state.started else 503)
+
+    @app.get("/metrics/cache", tags=["meta"])
+    async def cache_metrics() -> dict:
+        """Счётчики попаданий/промахов кэша ответов."""
+        return get_cache().stats()
+
+    @app.get("/metrics/queue", tags=["meta"])
+    async def queue_metrics() -> dict:
+        """Глубина очереди задач и время ожидания по классам приоритета."""
+        async with get_session_factory()() as session:
+            return await JobsRepo(session).queue_stats()
+
+    @app.get("/metrics/crawl", tags=["meta"])
+    async def crawl_metrics() -> dict:
+        """Окна доменов, запросы в полёте, задержки и торможение регулятора обхода — по воркерам и в сумме."""
+        from app.infrastructure.parsers.crawl_control import metrics_view
+
+        return await _worker_metrics("crawl", metrics_view)
+
+    @app.get("/metrics/sentiment", tags=["meta"])
+    async def sentiment_metrics() -> dict:
+        """Микро-пачки тональности и попадания в кэш результатов модели — по воркерам и в сумме."""
+        from app.infrastructure.ml.sentiment_transformers import metrics_view
+
+        return await _worker_metrics("sentiment", metrics_view)
+
+    @app.get("/metrics/entities", tags=["meta"])
+    async def entities_metrics() -> dict:
+        """Извлечение сущностей и попадания в кэш результатов модели — по воркерам и в сумме."""
+        from app.infrastructure.ml.entities import metrics_view
+
+        return await _worker_metrics("entities", metrics_view)
+
     @app.on_event("startup")
     async def on_startup() -> None:
         """Создание таблиц или применение миграций при старте."""
         await init_db()
+        if settings.embedded_worker:
+            from app.workers.worker import Worker
+
+            app.state.worker_stop = asyncio.Event()
+            app.state.worker_task = asyncio.create_task(Worker().run(app.state.worker_stop))
+        app.state.started = True
+
+    @app.on_event("shutdown")
+    async def on_shutdown() -> None:
+        """Остановить встроенный воркер, закрыть соединения кэша и событий."""
+        if getattr(app.state, "worker_task", None) is not None:
+            app.state.worker_stop.set()
+            await app.state.worker_task
+        # модуль тональности не импортируется ради закрытия, если им не пользовались
+        sentiment = sys.modules.get("app.infrastructure.ml.sentiment_transformers")
+        if sentiment is not None:
+            await sentiment.close_sentiment_service()
+        await close_broker()
+        await close_cache()
 
     return app
 
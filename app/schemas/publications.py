@@ -3,12 +3,14 @@
 from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 
 
 class Publication(BaseModel):
     """Нормализованная единица публикации (результат парсинга)."""
 
+    model_config = ConfigDict(from_attributes=True, coerce_numbers_to_str=True)
+
     id: str
     title: str
     url: str
@@ -18,12 +20,22 @@ class Publication(BaseModel):
     sentiment: Literal["neg", "neu", "pos"] | None = None
     request_id: str
     entities: list[str] = []
+    # сюжет: id первой публикации группы почти-дублей (None — не кластеризована)
+    cluster_id: str | None = None
+
+    @field_validator("entities", mode="before")
+    @classmethod
+    def _entities_default(cls, v: list[str] | None) -> list[str]:
+        """В БД entities может быть NULL — отдаём пустой список."""
+        return v or []
 
 
 class PublicationsResponse(BaseModel):
     """Пагинированный список публикаций."""
 
     total: int
+    total_kind: Literal["exact", "cached", "estimated"] = "exact"
     items: list[Publication]
     offset: int = 0
     limit: int = 50
+    next_cursor: str | None = None
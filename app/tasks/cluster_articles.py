@@ -0,0 +1,76 @@
+"""Кластеризация почти-дублей у статей, загруженных до появления сюжетов.
+
+Запуск::
+
+    python -m app.tasks.cluster_articles               # все статьи без сюжета
+    python -m app.tasks.cluster_articles --batch 5000
+
+Статьи обходятся по времени публикации, поэтому сюжетом становится самая
+ранняя статья группы — так же, как при обычной загрузке. Сюжет переносится в
+связи заявок (``request_publications.story_id``), и у затронутых заявок
+заново выбираются представители сюжетов. После прогона счётчики сюжетов
+заявок пересобираются: ``python -m app.tasks.rebuild_stats``.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import bindparam, select, update
+
+from app.infrastructure.db.repositories.clusters_repo import ClustersRepo
+from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.db.session import get_session_factory
+from app.infrastructure.db.tables import ArticleDB, RequestPublicationDB
+
+logger = logging.getLogger(__name__)
+
+
+async def cluster_articles(batch: int = 2000) -> int:
+    """Назначить сюжеты всем статьям с ``cluster_id IS NULL``; вернуть их число."""
+    done = 0
+    requests: set[str] = set()
+    async with get_session_factory()() as session:
+        repo = ClustersRepo(session)
+        links = RequestPublicationDB.__table__
+        while True:
+            res = await session.execute(
+                select(ArticleDB.id, ArticleDB.title, ArticleDB.published_at)
+                .where(ArticleDB.cluster_id.is_(None))
+                .order_by(ArticleDB.published_at, ArticleDB.id)
+                .limit(batch)
+            )
+            rows = [tuple(row) for row in res.all()]
+            if not rows:
+                break
+            assigned = await repo.assign(rows)
+            await session.execute(
+                update(links).where(links.c.article_id == bindparam("aid")).values(story_id=bindparam("story")),
+                [{"aid": aid, "story": story} for aid, story in assigned.items()],
+            )
+            res = await session.execute(
+                select(links.c.request_id).where(links.c.article_id.in_(list(assigned))).distinct()
+            )
+            requests.update(res.scalars())
+            await session.commit()
+            done += len(rows)
+            logger.info("Кластеризовано статей: %s", done)
+        publications = PublicationsRepo(session)
+        for request_id in sorted(requests):
+            await publications.mark_story_heads(request_id)
+            await session.commit()
+    return done
+
+
+def main() -> None:
+    """CLI-обёртка над cluster_articles."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=2000, help="Статей за транзакцию")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"clustered: {asyncio.run(cluster_articles(args.batch))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Задача сбора публикаций по заявке."""
+
+from asyncio import sleep
+from datetime import date, datetime, time, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.lazy import lazy_module
+from app.core.utctime import utcnow
+from app.infrastructure.db.repositories.collections_repo import CollectionsRepo
+from app.infrastructure.db.repositories.jobs_repo import GUEST_CLASS, JobsRepo
+from app.infrastructure.db.repositories.publications_repo import PublicationsRepo
+from app.infrastructure.db.repositories.requests_repo import RequestsRepo
+from app.infrastructure.db.repositories.stats_repo import StatsRepo
+from app.infrastructure.db.session import get_session_factory
+from app.infrastructure.db.tables import RequestDB
+from app.tasks.progress import ProgressTracker
+
+# Парсер и модели нужны только воркеру; API импортирует этот модуль ради enqueue_collect
+entities = lazy_module("app.infrastructure.ml.entities")
+rss = lazy_module("app.infrastructure.parsers.rss")
+sentiment = lazy_module("app.infrastructure.ml.sentiment_transformers")
+
+COLLECT_TASK = "collect_request"
+REFRESH_TASK = "refresh_request"
+FAKE_ITEMS_PER_REQUEST = 16  # объём эмулируемого сбора на весь период заявки
+
+
+async def enqueue_collect(session: AsyncSession, request: RequestDB, kind: str = COLLECT_TASK) -> None:
+    """Поставить сбор (или дозагрузку) заявки в очередь в той же транзакции.
+
+    Класс приоритета — тариф заявки; заявки без владельца идут гостевым классом.
+    """
+    await JobsRepo(session).enqueue(
+        kind,
+        {"request_id": request.id},
+        priority_class=request.tariff_code if request.owner_id and request.tariff_code else GUEST_CLASS,
+        owner_id=request.owner_id,
+        request_id=request.id,
+    )
+
+
+async def collect_request(request_id: str) -> None:
+    """Сбор публикаций заявки. Идемпотентна: готовую заявку не трогает.
+
+    Свежие результаты такой же заявки (тот же нормализованный запрос, язык
+    и источники) копируются из БД; собираются только недостающие дни.
+    Если период уже покрыт целиком — заявка готова без сбора.
+    """
+    async with get_session_factory()() as session:
+        req = await RequestsRepo(session).get(request_id)
+        if req is None or req.status == "READY":
+            return
+        tracker = ProgressTracker(request_id)
+        await tracker.set_status("RUNNING")
+
+        collections = CollectionsRepo(session)
+        publications = PublicationsRepo(session)
+        key = CollectionsRepo.key_for(req.query, req.language, req.sources)
+        fresh_since = utcnow() - timedelta(hours=settings.collection_reuse_hours)
+        segments = await collections.covering(key, req.period_start, req.period_end, fresh_since)
+        segments = [seg for seg in segments if seg.request_id != request_id]
+        reuse, gaps = CollectionsRepo.plan(req.period_start, req.period_end, segments)
+
+        # Повторный запуск после сбоя: начинаем с чистого листа
+        leftovers = await publications.delete_for_request(request_id)
+        await collections.forget(request_id)
+        for seg, start, end in reuse:
+            await publications.copy_from(seg.request_id, request_id, start, end)
+        if reuse:
+            await publications.mark_story_heads(request_id)
+        if reuse or leftovers:
+            await StatsRepo(session).rebuild(request_id)
+            await session.commit()
+
+        total_days = (req.period_end - req.period_start).days + 1
+        done_days = total_days - sum((end - start).days + 1 for start, end in gaps)
+        for start, end in gaps:
+            days = (end - start).days + 1
+            # Прогресс (эмуляция): тики копятся в трекере, в БД — пачками
+            for p in (10, 25, 40, 65, 85):
+                await tracker.update(int((done_days + days * p / 100) * 100 / total_days))
+                await sleep(0.25)
+            done_days += days
+
+            # После «сбора» — публикации за недостающий отрезок: ленты RSS, если
+            # они настроены, по остальным источникам — демо-данные
+            count = max(1, round(FAKE_ITEMS_PER_REQUEST * days / total_days))
+            if _use_feeds(req):
+                await rss.collect_feeds(
+                    session,
+                    request_id,
+                    query=req.query,
+                    language=req.language or "ru",
+                    since=datetime.combine(start, time.min) - timedelta(microseconds=1),
+                    until=None if end >= date.today() else datetime.combine(end, time.max),
+                    conditional=False,
+                )
+                others = [source for source in _sources(req) if source != "rss"]
+                if others:
+                    await publications.seed_fake(
+                        request_id, count=count, period_start=start, period_end=end, sources=others
+                    )
+            else:
+                await publications.seed_fake(request_id, count=count, period_start=start, period_end=end)
+            await collections.record(key, start, end, request_id)
+            await session.commit()
+        # тональность и сущности новых статей; скопированные из других заявок уже обработаны
+        await sentiment.score_request(session, request_id)
+        await session.commit()
+        await entities.extract_request(session, request_id)
+        await session.commit()
+        marks = _with_horizon(await publications.watermarks(request_id), req)
+        await RequestsRepo(session).set_watermarks(request_id, marks)
+        await session.commit()
+        await tracker.set_status("READY")
+
+
+async def refresh_request(request_id: str) -> None:
+    """Дозагрузка готовой заявки: только публикации новее границ по источникам.
+
+    Новые строки идут через ``PublicationsRepo.ingest`` (дубли отсекаются,
+    агрегаты обновляются инкрементально), поэтому стоимость пропорциональна
+    времени с прошлого сбора, а не длине периода. Конец периода заявки
+    сдвигается на сегодня.
+    """
+    async with get_session_factory()() as session:
+        requests = RequestsRepo(session)
+        req = await requests.get(request_id)
+        if req is None or req.status not in ("PENDING", "RUNNING"):
+            return
+        tracker = ProgressTracker(request_id)
+        await tracker.set_status("RUNNING")
+
+        publications = PublicationsRepo(session)
+        marks = RequestsRepo.watermarks(req) or _with_horizon(await publications.watermarks(request_id), req)
+        period_days = (req.period_end - req.period_start).days + 1
+        now = datetime.utcnow()
+        sources = _sources(req)
+        for i, source in enumerate(sources):
+            since = _naive_utc(marks[source])
+            # Прогресс (эмуляция): сбор одного источника
+            await tracker.update(int((i + 0.5) * 100 / len(sources)))
+            await sleep(0.25)
+            if source == "rss" and _use_feeds(req):
+                await rss.collect_feeds(session, request_id, query=req.query, language=req.language or "ru", since=since)
+                continue
+            days = (now - since).total_seconds() / 86400
+            count = round(FAKE_ITEMS_PER_REQUEST * days / period_days)
+            if count:
+                await publications.seed_fake(request_id, count=count, since=since, sources=[source])
+        await session.commit()
+        await sentiment.score_request(session, request_id)
+        await session.commit()
+        await entities.extract_request(session, request_id)
+        await session.commit()
+
+        tail_from = min((_naive_utc(dt) for dt in marks.values()), default=None)
+        marks = {**marks, **await publications.watermarks(request_id, since=tail_from)}
+        await requests.set_watermarks(request_id, marks, period_end=max(req.period_end, now.date()))
+        await session.commit()
+        await tracker.set_status("READY")
+
+
+async def refresh_failed(request_id: str) -> None:
+    """Дозагрузка не удалась — собранные ранее данные остаются, заявка снова READY."""
+    async with get_session_factory()() as session:
+        await RequestsRepo(session).mark_status(request_id, "READY")
+        await session.commit()
+
+
+def _sources(req: RequestDB) -> list[str]:
+    return [s for s in (req.sources or "rss,web").split(",") if s]
+
+
+def _use_feeds(req: RequestDB) -> bool:
+    return bool(settings.rss_feeds) and "rss" in _sources(req)
+
+
+def _with_horizon(marks: dict[str, datetime], req: RequestDB) -> dict[str, datetime]:
+    """Источникам без публикаций ставится граница «период собран до конца»."""
+    horizon = min(datetime.utcnow(), datetime.combine(req.period_end, time.min) + timedelta(days=1))
+    return {source: marks.get(source, horizon) for source in _sources(req)}
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    """Наивное UTC: так хранятся и генерируются даты публикаций."""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+
+async def collect_failed(request_id: str) -> None:
+    """Попытки исчерпаны — заявка переводится в FAILED."""
+    async with get_session_factory()() as session:
+        await RequestsRepo(session).mark_status(request_id, "FAILED")
+        await session.commit()
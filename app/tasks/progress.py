@@ -0,0 +1,104 @@
+"""Трекер прогресса задачи сбора с объединением записей в БД."""
+
+from __future__ import annotations
+
+import math
+import time
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.infrastructure.cache.pubsub import get_broker
+from app.infrastructure.cache.redis_client import get_cache
+from app.infrastructure.db.repositories.requests_repo import RequestsRepo
+from app.infrastructure.db.session import get_session_factory
+
+
+class ProgressTracker:
+    """Живой прогресс и ETA заявки.
+
+    Каждый тик обновляет состояние в кэше и рассылает SSE-событие, но в
+    таблицу ``requests`` пишет не чаще раза в ``flush_interval`` секунд.
+    Смена статуса записывается сразу, вместе с накопленным прогрессом.
+    ETA считается по замеренной скорости: проценты, пройденные с момента
+    запуска трекера, делённые на прошедшее время.
+    """
+
+    def __init__(
+        self,
+        request_id: str,
+        status: str = "PENDING",
+        *,
+        flush_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.request_id = request_id
+        self.status = status
+        self.progress = 0
+        self.eta_seconds: Optional[int] = None
+        self.flush_interval = settings.progress_flush_interval_seconds if flush_interval is None else flush_interval
+        self.flushes = 0
+        self._clock = clock
+        self._started = clock()
+        self._last_flush = self._started
+        self._dirty = False
+
+    async def update(self, progress: int) -> None:
+        """Зафиксировать новый прогресс (0..100)."""
+        now = self._clock()
+        self.progress = max(self.progress, min(100, progress))
+        self.eta_seconds = self._eta(now)
+        self._dirty = True
+
+        await self._publish()
+        if now - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def set_status(self, status: str) -> None:
+        """Сменить статус: пишется в БД сразу, вместе с прогрессом."""
+        self.status = status
+        if status == "READY":
+            self.progress, self.eta_seconds = 100, 0
+        async with get_session_factory()() as session:
+            repo = RequestsRepo(session)
+            await repo.update_progress(self.request_id, self.progress, self.eta_seconds)
+            await repo.mark_status(self.request_id, status)
+            await session.commit()
+        self._mark_flushed()
+        await self._publish()
+
+    async def flush(self) -> None:
+        """Записать накопленный прогресс в БД, если он менялся."""
+        if not self._dirty:
+            return
+        async with get_session_factory()() as session:
+            await RequestsRepo(session).update_progress(self.request_id, self.progress, self.eta_seconds)
+            await session.commit()
+        self._mark_flushed()
+
+    def state(self) -> dict:
+        """Текущее состояние в формате RequestStatusOut."""
+        return {
+            "request_id": self.request_id,
+            "status": self.status,
+            "progress": self.progress,
+            "eta_seconds": self.eta_seconds,
+        }
+
+    def _eta(self, now: float) -> Optional[int]:
+        if self.progress >= 100:
+            return 0
+        elapsed = now - self._started
+        if self.progress <= 0 or elapsed <= 0:
+            return None
+        rate = self.progress / elapsed  # процентов в секунду
+        return math.ceil((100 - self.progress) / rate)
+
+    def _mark_flushed(self) -> None:
+        self._last_flush = self._clock()
+        self._dirty = False
+        self.flushes += 1
+
+    async def _publish(self) -> None:
+        state = self.state()
+        await get_cache().set_live(self.request_id, state, settings.progress_live_ttl_seconds)
+        await get_broker().publish(self.request_id, state)
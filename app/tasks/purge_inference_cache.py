@@ -0,0 +1,59 @@
+"""Удаление результатов прошлых версий моделей из inference_cache.
+
+Запуск (по cron, не из задач сбора)::
+
+    python -m app.tasks.purge_inference_cache                  # старше REPA_INFERENCE_CACHE_STALE_DAYS
+    python -m app.tasks.purge_inference_cache --older-than-days 30 --batch 5000
+
+Текущие версии берутся из настроек (как у воркеров); строки других версий
+удаляются пачками по ``--batch``, каждая пачка — своя транзакция. Строки
+моложе ``--older-than-days`` не трогаются: во время выкатки воркеры с
+прошлой версией ещё ими пользуются.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from app.core.config import settings
+from app.infrastructure.db.repositories.inference_cache_repo import InferenceCacheRepo
+from app.infrastructure.db.session import get_session_factory
+from app.infrastructure.ml.entities import ENTITIES_KIND, entity_backend_version
+from app.infrastructure.ml.sentiment_transformers import SENTIMENT_KIND, backend_version
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_inference_cache(older_than_days: Optional[int] = None, batch: int = 5000) -> dict[str, int]:
+    """Удалить устаревшие результаты всех видов; вернуть {вид: удалено строк}."""
+    days = settings.inference_cache_stale_days if older_than_days is None else older_than_days
+    current = {SENTIMENT_KIND: backend_version(), ENTITIES_KIND: entity_backend_version()}
+    purged: dict[str, int] = {}
+    async with get_session_factory()() as session:
+        repo = InferenceCacheRepo(session)
+        for kind, version in current.items():
+            purged[kind] = 0
+            while True:
+                n = await repo.purge_stale(kind, version, days, batch)
+                await session.commit()
+                purged[kind] += n
+                if n < batch:
+                    break
+            logger.info("inference_cache %s: удалено %s (текущая версия %s)", kind, purged[kind], version)
+    return purged
+
+
+def main() -> None:
+    """CLI-обёртка над purge_inference_cache."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--older-than-days", type=int, help="Не трогать строки моложе (по умолчанию из настроек)")
+    parser.add_argument("--batch", type=int, default=5000, help="Строк за транзакцию")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"purged: {asyncio.run(purge_inference_cache(args.older_than_days, args.batch))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Пересборка сводок request_stats по сырым публикациям с проверкой дрейфа.
+
+Запуск::
+
+    python -m app.tasks.rebuild_stats                 # все заявки
+    python -m app.tasks.rebuild_stats --request-id req_1a2b3c4d
+    python -m app.tasks.rebuild_stats --check         # только проверить, ничего не писать
+
+Код возврата 1, если найден дрейф (удобно для cron / CI).
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.infrastructure.db.repositories.stats_repo import StatsRepo
+from app.infrastructure.db.session import get_session_factory
+from app.infrastructure.db.tables import RequestDB
+
+logger = logging.getLogger(__name__)
+
+
+async def rebuild_stats(request_id: Optional[str] = None, *, check_only: bool = False) -> dict[str, dict]:
+    """Пересчитать сводки и вернуть расхождения {request_id: drift}."""
+    async with get_session_factory()() as session:
+        if request_id:
+            ids = [request_id]
+        else:
+            ids = list((await session.execute(select(RequestDB.id).order_by(RequestDB.id))).scalars())
+
+        drifts: dict[str, dict] = {}
+        repo = StatsRepo(session)
+        for rid in ids:
+            drift = await repo.rebuild(rid, write=not check_only)
+            if drift:
+                drifts[rid] = drift
+                logger.warning("Дрейф сводки %s: %s", rid, drift)
+            if not check_only:
+                await session.commit()
+        return drifts
+
+
+def main() -> None:
+    """CLI-обёртка над rebuild_stats."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--request-id", help="Пересобрать только одну заявку")
+    parser.add_argument("--check", action="store_true", help="Только проверить дрейф, не перезаписывать")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    drifts = asyncio.run(rebuild_stats(args.request_id, check_only=args.check))
+    for rid, drift in drifts.items():
+        print(f"{rid}: {drift}")
+    print(f"drifted: {len(drifts)}")
+    sys.exit(1 if drifts else 0)
+
+
+if __name__ == "__main__":
+    main()
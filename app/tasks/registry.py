@@ -0,0 +1,30 @@
+"""Реестр фоновых задач: имя задачи в очереди -> обработчики."""
+
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from app.tasks.collect import (
+    COLLECT_TASK,
+    REFRESH_TASK,
+    collect_failed,
+    collect_request,
+    refresh_failed,
+    refresh_request,
+)
+
+
+@dataclass(frozen=True)
+class TaskSpec:
+    """Обработчик задачи и (опционально) реакция на окончательный провал.
+
+    Оба вызываются с payload задачи в виде именованных аргументов.
+    """
+
+    handler: Callable[..., Awaitable[None]]
+    on_failure: Optional[Callable[..., Awaitable[None]]] = None
+
+
+TASKS: dict[str, TaskSpec] = {
+    COLLECT_TASK: TaskSpec(handler=collect_request, on_failure=collect_failed),
+    REFRESH_TASK: TaskSpec(handler=refresh_request, on_failure=refresh_failed),
+}
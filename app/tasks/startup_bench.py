@@ -0,0 +1,108 @@
+"""Замер стоимости старта API: время импорта ``app.main`` по модулям.
+
+Каждый прогон — чистый интерпретатор с ``-X importtime``; из нескольких
+прогонов по каждому модулю берётся минимум (меньше шума). Время модуля —
+накопленное, с импортами, которые он потянул первым.
+
+Запуск::
+
+    python -m app.tasks.startup_bench                      # отчёт
+    python -m app.tasks.startup_bench --save startup.json  # запомнить базу
+    python -m app.tasks.startup_bench --baseline startup.json --budget-ms 2500
+
+Код возврата 1, если при старте импортирован тяжёлый пакет
+(``app.core.lazy.HEAVY_PACKAGES``), превышен бюджет или модуль подорожал
+относительно базы больше допуска (удобно для CI).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from app.core.lazy import HEAVY_PACKAGES
+
+ENTRY = "app.main"
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+# Подорожание модуля меньше этого не считается регрессией (шум замера)
+MIN_REGRESSION_MS = 20.0
+
+
+def measure(runs: int = 3) -> dict[str, float]:
+    """{модуль: накопленное время импорта, мс} — минимум по ``runs`` прогонам."""
+    best: dict[str, float] = {}
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.environ.get("PYTHONPATH")]))}
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {ENTRY}"],
+            cwd=PROJECT_ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            name = name.strip()
+            ms = int(cumulative) / 1000
+            best[name] = min(ms, best.get(name, ms))
+    return best
+
+
+def report(times: dict[str, float], top: int) -> dict:
+    """Итог, самые дорогие модули приложения и пакеты, тяжёлые пакеты в памяти."""
+    packages = {name: round(ms, 1) for name, ms in times.items() if "." not in name and not name.startswith("_")}
+    own = {name: round(ms, 1) for name, ms in times.items() if name.startswith("app.")}
+    return {
+        "total_ms": round(times.get(ENTRY, 0.0), 1),
+        "app_modules": dict(sorted(own.items(), key=lambda kv: -kv[1])[:top]),
+        "packages": dict(sorted(packages.items(), key=lambda kv: -kv[1])[:top]),
+        "heavy_imported": sorted(name for name in HEAVY_PACKAGES if name in times),
+    }
+
+
+def regressions(times: dict[str, float], baseline: dict[str, float], tolerance: float) -> dict[str, tuple]:
+    """Модули, подорожавшие больше чем на ``tolerance`` (доля) и ``MIN_REGRESSION_MS``: {модуль: (было, стало)}."""
+    out = {}
+    for name, ms in times.items():
+        was = baseline.get(name, 0.0)
+        if ms - was > MIN_REGRESSION_MS and ms > was * (1 + tolerance):
+            out[name] = (round(was, 1), round(ms, 1))
+    return out
+
+
+def main() -> None:
+    """CLI: отчёт о стоимости импорта и проверка регрессий."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Прогонов (берётся минимум)")
+    parser.add_argument("--top", type=int, default=15, help="Сколько модулей показать")
+    parser.add_argument("--budget-ms", type=float, help="Предельное время импорта app.main")
+    parser.add_argument("--baseline", type=Path, help="JSON прошлого замера (--save) для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Допустимое подорожание модуля (доля)")
+    parser.add_argument("--save", type=Path, help="Сохранить замер как базу")
+    args = parser.parse_args()
+
+    times = measure(args.runs)
+    summary = report(times, args.top)
+    found: Optional[dict] = None
+    if args.baseline is not None:
+        found = regressions(times, json.loads(args.baseline.read_text()), args.tolerance)
+        summary["regressions"] = found
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.save is not None:
+        args.save.write_text(json.dumps({name: round(ms, 1) for name, ms in sorted(times.items())}, indent=0))
+
+    failed = bool(summary["heavy_imported"]) or bool(found)
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"over budget: {summary['total_ms']} ms > {args.budget_ms} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
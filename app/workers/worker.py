@@ -0,0 +1,218 @@
+"""Воркер очереди задач (jobs).
+
+Запуск (масштабируется числом процессов независимо от API)::
+
+    python -m app.workers.worker --concurrency 8
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import sys
+import traceback
+from typing import Optional
+
+from app.core.config import settings
+from app.core.lazy import Warmup
+from app.infrastructure.db.repositories.jobs_repo import JobsRepo
+from app.infrastructure.db.repositories.worker_metrics_repo import WorkerMetricsRepo
+from app.infrastructure.db.session import get_session_factory
+from app.infrastructure.db.tables import JobDB
+from app.infrastructure.ml.sentiment_transformers import close_sentiment_service
+from app.infrastructure.parsers.crawl_control import get_crawl_controller
+from app.tasks.registry import TASKS
+
+logger = logging.getLogger(__name__)
+
+# Счётчики процесса, которые воркер публикует для /metrics/*: вид -> "модуль:функция снимка".
+# Незагруженные модули пропускаются (ими ещё не пользовались — счётчики нулевые).
+METRICS_SOURCES = {
+    "sentiment": "app.infrastructure.ml.sentiment_transformers:metrics_snapshot",
+    "entities": "app.infrastructure.ml.entities:metrics_snapshot",
+    "crawl": "app.infrastructure.parsers.crawl_control:metrics_snapshot",
+}
+
+# Компоненты для REPA_WARMUP_COMPONENTS: имя -> "модуль:корутина прогрева"
+WARMUP_TARGETS = {
+    "sentiment": "app.infrastructure.ml.sentiment_transformers:warm_up_sentiment",
+    "entities": "app.infrastructure.ml.entities:warm_up_entities",
+}
+# Пауза перед повтором продления аренды после ошибки БД
+_HEARTBEAT_RETRY_SECONDS = 5.0
+
+
+class Worker:
+    """Забирает задачи из БД и выполняет до ``concurrency`` штук одновременно."""
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        *,
+        poll_interval: Optional[float] = None,
+        visibility_timeout: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ) -> None:
+        self.concurrency = concurrency or settings.worker_concurrency
+        self.poll_interval = poll_interval or settings.worker_poll_interval_seconds
+        self.visibility_timeout = visibility_timeout or settings.job_visibility_timeout_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.warmup = Warmup(WARMUP_TARGETS, settings.warmup_components)
+        self._running: set[asyncio.Task] = set()
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Основной цикл; завершается по ``stop`` после окончания текущих задач."""
+        stop = stop or asyncio.Event()
+        logger.info("Воркер %s запущен, concurrency=%s", self.worker_id, self.concurrency)
+        metrics = asyncio.create_task(self._publish_metrics_loop(stop))
+        await self._warm_up(stop)
+        while not stop.is_set():
+            free = self.concurrency - len(self._running)
+            jobs = await self._claim(free) if free > 0 else []
+            for job in jobs:
+                task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            if not jobs:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        await metrics
+        await self.publish_metrics()
+        await close_sentiment_service()
+        logger.info("Воркер %s остановлен", self.worker_id)
+
+    async def _warm_up(self, stop: asyncio.Event) -> None:
+        """Загрузить модели до первых задач (чтобы первая заявка не ждала загрузки)."""
+        if not self.warmup.components:
+            return
+        warmup = asyncio.create_task(self.warmup.run())
+        stopping = asyncio.create_task(stop.wait())
+        await asyncio.wait({warmup, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not warmup.done():
+            warmup.cancel()
+            return
+        logger.info("Воркер %s: прогрев %s", self.worker_id, self.warmup.snapshot())
+
+    async def publish_metrics(self) -> None:
+        """Записать снимки счётчиков процесса в worker_metrics (их читает API).
+
+        Заодно по этой же таблице считаются живые воркеры: между ними делится
+        нагрузка на домены (``CrawlController.set_processes``).
+        """
+        snapshots = {}
+        for kind, target in METRICS_SOURCES.items():
+            module_name, func = target.split(":")
+            module = sys.modules.get(module_name)
+            if module is not None:
+                snapshots[kind] = getattr(module, func)()
+        try:
+            async with get_session_factory()() as session:
+                repo = WorkerMetricsRepo(session)
+                await repo.publish(self.worker_id, snapshots)
+                await session.commit()
+                get_crawl_controller().set_processes(await repo.live_workers(settings.worker_metrics_max_age_seconds))
+        except Exception:  # noqa: BLE001 - метрики не должны останавливать воркер
+            logger.warning("Не удалось опубликовать метрики воркера", exc_info=True)
+
+    async def _publish_metrics_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await self.publish_metrics()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.worker_metrics_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, limit: int) -> list[JobDB]:
+        try:
+            async with get_session_factory()() as session:
+                return await JobsRepo(session).claim(self.worker_id, limit, self.visibility_timeout)
+        except Exception:  # noqa: BLE001 - БД недоступна: попробуем на следующем круге
+            logger.exception("Не удалось забрать задачи")
+            return []
+
+    async def _execute(self, job: JobDB) -> None:
+        spec = TASKS.get(job.kind)
+        handler = asyncio.create_task(self._handle(spec, job))
+        heartbeat = asyncio.create_task(self._heartbeat(job.id, handler))
+        try:
+            error = await handler
+        except asyncio.CancelledError:
+            if not heartbeat.done():  # остановили сам воркер, а не потерянная аренда
+                raise
+            logger.warning("Задача %s (%s) прервана: аренду перехватил другой воркер", job.id, job.kind)
+            return
+        finally:
+            heartbeat.cancel()
+        async with get_session_factory()() as session:
+            repo = JobsRepo(session)
+            if error is None:
+                dead = False
+                if not await repo.complete(job.id, self.worker_id):
+                    logger.warning("Задача %s выполнена, но её аренду уже перехватил другой воркер", job.id)
+            else:
+                logger.warning("Задача %s (%s), попытка %s: ошибка", job.id, job.kind, job.attempts)
+                dead = await repo.fail(job, error, self.worker_id)
+            await session.commit()
+        if dead and spec is not None and spec.on_failure is not None:
+            await spec.on_failure(**job.payload)
+
+    @staticmethod
+    async def _handle(spec, job: JobDB) -> Optional[str]:
+        """Выполнить обработчик задачи; вернуть трассировку ошибки или None."""
+        try:
+            if spec is None:
+                raise LookupError(f"unknown task kind: {job.kind}")
+            await spec.handler(**job.payload)
+        except Exception:  # noqa: BLE001
+            return traceback.format_exc()
+        return None
+
+    async def _heartbeat(self, job_id: int, handler: asyncio.Task) -> None:
+        """Продлевать аренду, пока задача выполняется; потеряна — отменить обработчик.
+
+        Ошибки БД не останавливают продление: следующая попытка — через несколько секунд.
+        """
+        delay = self.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                async with get_session_factory()() as session:
+                    alive = await JobsRepo(session).heartbeat(job_id, self.worker_id, self.visibility_timeout)
+                    await session.commit()
+            except Exception:  # noqa: BLE001 - БД недоступна: аренда ещё действует, повторим
+                logger.warning("Не удалось продлить аренду задачи %s", job_id, exc_info=True)
+                delay = min(self.visibility_timeout / 3, _HEARTBEAT_RETRY_SECONDS)
+                continue
+            delay = self.visibility_timeout / 3
+            if not alive:
+                logger.warning("Задача %s перехвачена другим воркером, выполнение прервано", job_id)
+                handler.cancel()
+                return
+
+
+def main() -> None:
+    """CLI-точка входа воркера."""
+    parser = argparse.ArgumentParser(description="REPA job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await Worker(args.concurrency).run(stop)
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()